@@ -0,0 +1,78 @@
+"""
+Configuración de gunicorn para producción.
+
+Uso: gunicorn -c python:config.gunicorn
+
+Por defecto sirve la app WSGI con workers gthread. Con ASGI=True sirve
+config.asgi con workers de uvicorn: la conexión SSE del tablero queda
+abierta en lugar de reintentar cada TABLERO_REINTENTO_MS.
+
+Todos los valores se pueden ajustar con variables de entorno.
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# Workers derivados de las CPUs disponibles; cada uno atiende varios hilos,
+# así una ráfaga de ventas no queda esperando detrás de un request lento.
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+if os.getenv("ASGI", "False") == "True":
+    wsgi_app = "config.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    wsgi_app = "config.wsgi:application"
+    worker_class = "gthread"
+    threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+# Reciclar workers periódicamente acota el crecimiento de memoria
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+# Carga Django una vez en el master; los workers nacen con la app importada
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    # Con preload_app la app ya está importada: URLs y plantillas compiladas
+    # aquí las heredan todos los workers (ver mercapp/arranque.py)
+    from mercapp import arranque
+
+    arranque.calentar(arranque.PASOS_MASTER)
+
+
+def post_fork(server, worker):
+    # Ninguna conexión abierta en el master debe compartirse con los hijos
+    from django.db import connections
+
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    # Catálogo y roles antes de aceptar el primer request
+    from django.db import connections
+
+    from mercapp import arranque, auditoria
+
+    arranque.calentar(arranque.PASOS_WORKER)
+    # Los requests corren en los hilos de gthread, con sus propias conexiones:
+    # la de este hilo se cierra (con DB_POOL vuelve al pool)
+    connections.close_all()
+
+    # Auditoría: un hilo junta los eventos de varios requests en cada INSERT
+    auditoria.iniciar_escritor()
+
+
+def worker_exit(server, worker):
+    # Eventos de auditoría aún en el buffer del worker
+    from mercapp import auditoria
+
+    auditoria.detener_escritor()
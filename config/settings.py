@@ -1,6 +1,8 @@
 from pathlib import Path
 import os
+import time
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 # Cargar variables desde .env
@@ -42,7 +44,22 @@ INSTALLED_APPS = [
 # MIDDLEWARE
 # ----------------------------
 
+# AUTH_CACHE=True resuelve el usuario y sus roles desde la caché (sin
+# consultas por request en un acierto); False vuelve al middleware de Django.
+# Sólo con caché compartida (REDIS_URL): con una LocMemCache por proceso,
+# desactivar un usuario o cambiarle la contraseña invalidaría su entrada en
+# un solo worker y los demás lo seguirían atendiendo hasta el vencimiento.
+AUTH_CACHE = os.getenv("AUTH_CACHE", "True" if os.getenv("REDIS_URL") else "False") == "True"
+if AUTH_CACHE and not os.getenv("REDIS_URL"):
+    raise ImproperlyConfigured("AUTH_CACHE=True requiere una caché compartida (REDIS_URL)")
+AUTH_MIDDLEWARE = (
+    'mercapp.middleware.CachedAuthenticationMiddleware' if AUTH_CACHE
+    else 'django.contrib.auth.middleware.AuthenticationMiddleware'
+)
+
 MIDDLEWARE = [
+    'mercapp.middleware.SaludMiddleware',
+    'mercapp.middleware.RequestIdMiddleware',
     'django.middleware.security.SecurityMiddleware',
 
     # WhiteNoise para archivos estáticos en Railway
@@ -51,8 +68,10 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    AUTH_MIDDLEWARE,
+    'mercapp.middleware.PerfiladorMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'mercapp.middleware.PrimariaTrasEscrituraMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -62,12 +81,21 @@ ROOT_URLCONF = 'config.urls'
 # TEMPLATES
 # ----------------------------
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+# En producción las plantillas se compilan una sola vez por proceso
+if not DEBUG:
+    TEMPLATE_LOADERS = [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
@@ -86,21 +114,197 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# DB_POOL=True usa el pool de psycopg 3 integrado en Django (>= 5.1): cada
+# worker comparte un pool entre sus hilos en lugar de una conexión por hilo.
+# Con pool, Django exige conn_max_age=0 (el pool gestiona la persistencia).
+DB_POOL = os.getenv("DB_POOL", "False") == "True"
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "600"))
+
+# PGBOUNCER=True para conectarse a través de PgBouncer en modo transacción
+PGBOUNCER = os.getenv("PGBOUNCER", "False") == "True"
+
 if DATABASE_URL:
     DATABASES = {
         'default': dj_database_url.parse(
             DATABASE_URL,
-            conn_max_age=600,
+            conn_max_age=0 if DB_POOL else DB_CONN_MAX_AGE,
+            conn_health_checks=True,
             ssl_require=False
         )
     }
+    if DB_POOL:
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            'max_size': int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            'timeout': int(os.getenv("DB_POOL_TIMEOUT", "10")),
+        }
+    if PGBOUNCER:
+        # Los cursores del lado del servidor no sobreviven entre transacciones
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
 else:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': BASE_DIR / 'db.sqlite3',
+            'NAME': os.getenv("SQLITE_PATH", BASE_DIR / 'db.sqlite3'),
         }
     }
+    # SQLITE_TUNED=True: modo para tiendas con varias cajas sobre SQLite.
+    # WAL deja leer mientras otro escribe, busy timeout espera el lock en vez
+    # de fallar con "database is locked", y las transacciones IMMEDIATE toman
+    # el lock de escritura al empezar (evita el fallo al promover un lock de
+    # lectura a escritura). Los PRAGMA se aplican en cada conexión nueva.
+    if os.getenv("SQLITE_TUNED", "False") == "True":
+        DATABASES['default']['OPTIONS'] = {
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=268435456;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': int(os.getenv("SQLITE_TIMEOUT", "20")),
+        }
+
+# Réplica de sólo lectura opcional: reportes, dashboard y catálogo leen de
+# ella (ver mercapp/db_routers.py). Tras una escritura el usuario queda unos
+# segundos en la primaria para ver sus propios cambios.
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "10"))
+
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        DATABASE_REPLICA_URL,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=True,
+        ssl_require=False
+    )
+    # En tests la réplica espeja a la primaria, salvo que se pida probar con
+    # dos bases separadas (DATABASE_REPLICA_TEST_MIRROR=False).
+    if os.getenv("DATABASE_REPLICA_TEST_MIRROR", "True") == "True":
+        DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['mercapp.db_routers.ReplicaRouter']
+
+# ----------------------------
+# CACHÉ
+# ----------------------------
+
+# Con varios workers conviene una caché compartida (REDIS_URL, requiere el
+# paquete `redis`) para que las invalidaciones lleguen a todos los procesos.
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'mercapp',
+        }
+    }
+
+# Los contadores de versión de datos (mercapp/versiones.py) deben ser los
+# mismos en todos los procesos: sin caché compartida se guardan en la base.
+VERSIONES_EN_BASE = not REDIS_URL
+
+# Segundos que se conservan los fragmentos de tablas ({% cache %}); la
+# clave incluye la versión de datos, así que un cambio los invalida antes.
+FRAGMENT_CACHE_TIMEOUT = int(os.getenv("FRAGMENT_CACHE_TIMEOUT", "3600"))
+
+# Parte del ETag de las páginas (mercapp/condicional.py): cambia con cada
+# despliegue para que una plantilla nueva no se tape con un 304. Sin commit
+# conocido se usa el arranque del proceso (compartido por los workers con
+# preload_app).
+VERSION_DESPLIEGUE = os.getenv("RAILWAY_GIT_COMMIT_SHA") or str(time.time_ns())
+
+# Catálogo en memoria de cada worker para el escaneo en caja
+# (mercapp/catalogo.py): máximo de códigos, cada cuántos segundos se
+# comprueba la versión compartida de productos y cuánto vive una entrada
+# aunque la versión no cambie.
+CATALOGO_CACHE_MAX = int(os.getenv("CATALOGO_CACHE_MAX", "20000"))
+CATALOGO_VERIFICAR_SEGUNDOS = float(os.getenv("CATALOGO_VERIFICAR_SEGUNDOS", "1"))
+CATALOGO_MAX_EDAD_SEGUNDOS = float(os.getenv("CATALOGO_MAX_EDAD_SEGUNDOS", "300"))
+
+# Tablero de inicio en vivo (mercapp/tablero.py): cada cuántos segundos una
+# conexión SSE revisa las versiones, cuánto dura antes de que el navegador
+# se reconecte, la espera de reconexión (también el sondeo bajo WSGI) y la
+# vida del resumen cacheado.
+TABLERO_INTERVALO = float(os.getenv("TABLERO_INTERVALO", "1"))
+TABLERO_DURACION = int(os.getenv("TABLERO_DURACION", "300"))
+TABLERO_REINTENTO_MS = int(os.getenv("TABLERO_REINTENTO_MS", "5000"))
+TABLERO_CACHE_TIMEOUT = int(os.getenv("TABLERO_CACHE_TIMEOUT", "600"))
+
+# Tickets de venta renderizados (ver mercapp/recibos.py). No cambian salvo al
+# anular la venta, y eso cambia su clave; el límite sólo libera memoria.
+RECIBO_CACHE_TIMEOUT = int(os.getenv("RECIBO_CACHE_TIMEOUT", str(30 * 24 * 3600)))
+
+# Auditoría (mercapp/auditoria.py): filas por INSERT (y eventos que despiertan
+# al escritor), cada cuántos segundos se vuelca igual y tope de eventos que se
+# retienen en memoria si la base no está disponible.
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_VOLCADO_SEGUNDOS = float(os.getenv("AUDIT_VOLCADO_SEGUNDOS", "2"))
+AUDIT_MAX_PENDIENTES = int(os.getenv("AUDIT_MAX_PENDIENTES", "10000"))
+
+# Pronóstico de reposición: días que tarda en llegar un pedido y días de
+# venta que debe cubrir lo que se pide por encima de ese plazo.
+REPOSICION_PLAZO_DIAS = int(os.getenv("REPOSICION_PLAZO_DIAS", "7"))
+REPOSICION_COBERTURA_DIAS = int(os.getenv("REPOSICION_COBERTURA_DIAS", "14"))
+
+# Clasificación ABC: ventana de ingresos en días y cortes acumulados de A y B
+ABC_VENTANA_DIAS = int(os.getenv("ABC_VENTANA_DIAS", "90"))
+ABC_UMBRAL_A = float(os.getenv("ABC_UMBRAL_A", "0.80"))
+ABC_UMBRAL_B = float(os.getenv("ABC_UMBRAL_B", "0.95"))
+
+# Carpeta donde las tareas en segundo plano dejan los CSV exportados
+EXPORTS_DIR = os.getenv("EXPORTS_DIR", str(BASE_DIR / 'exports'))
+
+# Respaldos automáticos (comando respaldos_automaticos): cadencia y cuántos
+# se conservan por día, semana ISO y mes.
+RESPALDO_INTERVALO_MINUTOS = int(os.getenv("RESPALDO_INTERVALO_MINUTOS", str(24 * 60)))
+RESPALDO_USUARIO = os.getenv("RESPALDO_USUARIO", "")
+RESPALDO_DIARIOS = int(os.getenv("RESPALDO_DIARIOS", "7"))
+RESPALDO_SEMANALES = int(os.getenv("RESPALDO_SEMANALES", "4"))
+RESPALDO_MENSUALES = int(os.getenv("RESPALDO_MENSUALES", "12"))
+RESPALDO_MODO = os.getenv("RESPALDO_MODO", "json")  # 'json' o 'snapshot' (sólo SQLite)
+
+# ----------------------------
+# SESIONES
+# ----------------------------
+
+# SESSION_MODE: 'db' (por defecto de Django), 'cached_db' (lee de la caché y
+# escribe también en la base) o 'signed_cookies' (sin almacenamiento en el
+# servidor; la sesión viaja firmada en la cookie).
+SESSION_MODE = os.getenv("SESSION_MODE", "db")
+
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_MODE]
+
+# Perfilado de requests (mercapp/perfilador.py). Apagado no cuesta nada; con
+# PERFILADOR=True se perfila esa fracción de requests y, siempre, los de un
+# administrador que envíe la cabecera (p. ej. `X-Perfilar: 1`).
+PERFILADOR = os.getenv("PERFILADOR", "False") == "True"
+PERFILADOR_MUESTREO = float(os.getenv("PERFILADOR_MUESTREO", "0.01"))
+PERFILADOR_CABECERA = os.getenv("PERFILADOR_CABECERA", "X-Perfilar")
+PERFILADOR_FUNCIONES = int(os.getenv("PERFILADOR_FUNCIONES", "40"))
+PERFILADOR_RETENCION_DIAS = int(os.getenv("PERFILADOR_RETENCION_DIAS", "7"))
+
+# Health check sin login ni base de datos (mercapp.middleware.SaludMiddleware)
+SALUD_RUTA = os.getenv("SALUD_RUTA", "/healthz")
+
+# Usuarios (los de login más reciente) que cada worker deja en la caché de
+# autenticación al arrancar (mercapp/arranque.py); 0 lo desactiva.
+ARRANQUE_USUARIOS = int(os.getenv("ARRANQUE_USUARIOS", "50"))
+
+# Red de seguridad para cachés por proceso (LocMem): un usuario cacheado en
+# otro worker caduca a los pocos minutos aunque no le llegue la invalidación.
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv("AUTH_USER_CACHE_TIMEOUT", "300"))
 
 # ----------------------------
 # VALIDACIÓN DE CONTRASEÑAS
@@ -139,12 +343,23 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-# 🔥 Carpeta correcta de estáticos
-STATICFILES_DIRS = [
-    BASE_DIR / 'mercapp' / 'static'
-]
-
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Los estáticos de mercapp/static los encuentra AppDirectoriesFinder; no van
+# en STATICFILES_DIRS o collectstatic los ve dos veces.
+
+# En producción collectstatic guarda cada archivo con su hash en el nombre
+# (venta.3f2a….js) y lo precomprime en gzip y, con el paquete Brotli
+# instalado, en brotli. WhiteNoise sirve esos nombres con caché de un año e
+# `immutable`: cambiar el archivo cambia la URL. En desarrollo se sirven tal
+# cual, sin necesidad de correr collectstatic.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage" if DEBUG
+            else "whitenoise.storage.CompressedManifestStaticFilesStorage"
+        ),
+    },
+}
 
 # ----------------------------
 # LOGIN / LOGOUT
@@ -153,4 +368,40 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
 
+# ----------------------------
+# LOGGING
+# ----------------------------
+
+# Líneas JSON con request_id y usuario (ver mercapp/logs.py). Los requests
+# sólo encolan; un hilo aparte escribe en stderr.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'contexto_request': {'()': 'mercapp.logs.ContextoRequestFilter'},
+    },
+    'handlers': {
+        'cola_json': {
+            'class': 'mercapp.logs.ColaJSONHandler',
+            'filters': ['contexto_request'],
+        },
+    },
+    'root': {
+        'handlers': ['cola_json'],
+        'level': 'WARNING',
+    },
+    'loggers': {
+        'mercapp': {
+            'handlers': ['cola_json'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
+
+# manage.py test: sin salida de logs (ver config/test_runner.py)
+TEST_RUNNER = 'config.test_runner.TestRunner'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
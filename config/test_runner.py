@@ -0,0 +1,15 @@
+"""Runner de `manage.py test` (TEST_RUNNER en settings)."""
+import copy
+import logging.config
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # Los tests no escriben logs en stderr (test_logs crea su propio handler)
+        configuracion = copy.deepcopy(settings.LOGGING)
+        configuracion['handlers']['cola_json'] = {'class': 'logging.NullHandler'}
+        logging.config.dictConfig(configuracion)
@@ -1,13 +1,39 @@
 
 from django.contrib import admin
-from .models import Producto, Venta, DetalleVenta, Respaldo
+from .models import (
+    PerfilRequest, Producto, Venta, DetalleVenta, Respaldo, StockSucursal, Sucursal, Tarea, Transferencia, VentaArchivada,
+    DetalleVentaArchivada,
+)
 
 
 @admin.register(Producto)
 class ProductoAdmin(admin.ModelAdmin):
-    list_display = ("id", "nombre", "categoria", "precio", "stock", "stock_minimo", "activo")
+    list_display = ("id", "nombre", "categoria", "precio", "stock", "stock_minimo", "activo", "clase_abc")
     search_fields = ("nombre", "categoria")
-    list_filter = ("activo", "categoria")
+    list_filter = ("activo", "clase_abc", "categoria")
+
+
+@admin.register(Sucursal)
+class SucursalAdmin(admin.ModelAdmin):
+    list_display = ("id", "nombre", "direccion", "activa")
+    list_filter = ("activa",)
+
+
+@admin.register(StockSucursal)
+class StockSucursalAdmin(admin.ModelAdmin):
+    list_display = ("producto", "sucursal", "cantidad", "stock_minimo")
+    list_filter = ("sucursal",)
+    search_fields = ("producto__nombre", "producto__codigo")
+    raw_id_fields = ("producto",)
+    list_select_related = ("producto", "sucursal")
+
+
+@admin.register(Transferencia)
+class TransferenciaAdmin(admin.ModelAdmin):
+    list_display = ("fecha", "producto", "cantidad", "origen", "destino", "usuario")
+    list_filter = ("origen", "destino")
+    raw_id_fields = ("producto",)
+    date_hierarchy = "fecha"
 
 
 class DetalleVentaInline(admin.TabularInline):
@@ -17,12 +43,54 @@ class DetalleVentaInline(admin.TabularInline):
 
 @admin.register(Venta)
 class VentaAdmin(admin.ModelAdmin):
-    list_display = ("id", "fecha", "total", "metodo_pago", "usuario")
-    list_filter = ("metodo_pago", "fecha")
+    list_display = ("id", "fecha", "total", "metodo_pago", "usuario", "sucursal")
+    list_filter = ("metodo_pago", "sucursal", "anulada", "fecha")
+    search_fields = ("=id", "=detalles__producto__codigo", "usuario__username")
     inlines = [DetalleVentaInline]
 
 
+class SoloLecturaMixin:
+    """Sin alta, edición ni borrado, tampoco para superusuarios."""
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class DetalleVentaArchivadaInline(SoloLecturaMixin, admin.TabularInline):
+    model = DetalleVentaArchivada
+    extra = 0
+
+
+@admin.register(VentaArchivada)
+class VentaArchivadaAdmin(SoloLecturaMixin, admin.ModelAdmin):
+    list_display = ("id", "fecha", "total", "metodo_pago", "usuario", "anulada")
+    list_filter = ("metodo_pago", "anulada")
+    date_hierarchy = "fecha"
+    inlines = [DetalleVentaArchivadaInline]
+
+
 @admin.register(Respaldo)
 class RespaldoAdmin(admin.ModelAdmin):
     list_display = ("id", "fecha", "tipo", "ubicacion", "usuario")
     list_filter = ("tipo", "fecha")
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ("id", "tipo", "estado", "progreso", "creada_por", "creada_en", "terminada_en", "worker")
+    list_filter = ("estado", "tipo")
+    readonly_fields = ("iniciada_en", "actualizada_en", "terminada_en", "worker")
+
+
+@admin.register(PerfilRequest)
+class PerfilRequestAdmin(admin.ModelAdmin):
+    list_display = ("id", "fecha", "metodo", "vista", "estado", "duracion_ms", "usuario", "forzado")
+    list_filter = ("vista", "forzado")
+    date_hierarchy = "fecha"
+    readonly_fields = [f.name for f in PerfilRequest._meta.fields]
@@ -6,3 +6,4 @@ class MercappConfig(AppConfig):
 
     def ready(self):
         import mercapp.signals  # noqa
+        import mercapp.auditoria  # noqa
@@ -0,0 +1,106 @@
+"""Archivo de ventas antiguas.
+
+Mueve ventas cerradas a VentaArchivada / DetalleVentaArchivada por lotes y
+ofrece helpers para que los reportes sumen ambas tablas.
+"""
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import DecimalField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import DetalleVenta, DetalleVentaArchivada, Producto, Venta, VentaArchivada
+from .versiones import incrementar_version
+
+CAMPOS_VENTA = (
+    'id', 'fecha', 'total', 'metodo_pago', 'usuario_id', 'sucursal_id', 'anulada',
+    'motivo_anulacion', 'anulada_por_id', 'fecha_anulacion', 'created_at', 'updated_at',
+)
+CAMPOS_DETALLE = ('id', 'venta_id', 'producto_id', 'cantidad', 'precio_unitario', 'subtotal')
+
+
+def archivar_lote(corte, lote=1000):
+    """Archiva hasta `lote` ventas anteriores a `corte`. Devuelve cuántas movió.
+
+    Cada lote es una transacción corta: copia filas con bulk_create y borra
+    las originales sin pasar por las señales de DetalleVenta (que devolverían
+    stock y recalcularían totales de ventas que ya no cambian).
+    """
+    with transaction.atomic():
+        ids = list(
+            Venta.objects.filter(fecha__lt=corte)
+            .order_by('id')
+            .values_list('id', flat=True)[:lote]
+        )
+        if not ids:
+            return 0
+        ventas = Venta.objects.filter(id__in=ids).order_by().values(*CAMPOS_VENTA)
+        detalles = DetalleVenta.objects.filter(venta_id__in=ids).order_by().values(*CAMPOS_DETALLE)
+        VentaArchivada.objects.bulk_create(VentaArchivada(**v) for v in ventas)
+        DetalleVentaArchivada.objects.bulk_create(DetalleVentaArchivada(**d) for d in detalles)
+
+        # DELETE directo: QuerySet.delete() dispararía las señales de
+        # DetalleVenta, que devolverían el stock de ventas ya cerradas
+        marcas = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {DetalleVenta._meta.db_table} WHERE venta_id IN ({marcas})", ids)
+            cursor.execute(f"DELETE FROM {Venta._meta.db_table} WHERE id IN ({marcas})", ids)
+        transaction.on_commit(lambda: incrementar_version('ventas'))
+    return len(ids)
+
+
+def filtrar_ventas(qs, fecha_desde=None, fecha_hasta=None, usuario=None, sucursal=None):
+    """Aplica los filtros de reporte a Venta o VentaArchivada por igual."""
+    if sucursal is not None:
+        qs = qs.filter(sucursal=sucursal)
+    if fecha_desde:
+        qs = qs.filter(fecha__date__gte=fecha_desde)
+    if fecha_hasta:
+        qs = qs.filter(fecha__date__lte=fecha_hasta)
+    if usuario is not None:
+        qs = qs.filter(usuario=usuario)
+    return qs
+
+
+def total_con_archivo(ventas, archivadas):
+    total = ventas.aggregate(total=Sum('total'))['total'] or 0
+    return total + (archivadas.aggregate(total=Sum('total'))['total'] or 0)
+
+
+def listado_con_archivo(ventas, archivadas):
+    """Filas de ventas vivas y archivadas en una sola consulta (UNION ALL)."""
+    campos = ('id', 'fecha', 'total', 'metodo_pago', 'anulada')
+    vivas = ventas.order_by().values(*campos).annotate(archivada=Value(False))
+    viejas = archivadas.order_by().values(*campos).annotate(archivada=Value(True))
+    return vivas.union(viejas, all=True).order_by('-fecha')
+
+
+def _suma_por_producto(modelo, campo, output_field):
+    suma = (
+        modelo.objects.filter(producto=OuterRef('pk')).order_by()
+        .values('producto').annotate(suma=Sum(campo)).values('suma')
+    )
+    return Coalesce(Subquery(suma), Value(0), output_field=output_field)
+
+
+def top_productos_con_archivo(limite=10):
+    """Top de productos por cantidad vendida sumando ventas vivas y archivadas.
+
+    La suma y el orden se resuelven en la base: sólo vuelven `limite` filas.
+    """
+    cantidad, importe = IntegerField(), DecimalField(max_digits=14, decimal_places=2)
+    return list(
+        Producto.objects.annotate(
+            cantidad_total=(
+                _suma_por_producto(DetalleVenta, 'cantidad', cantidad)
+                + _suma_por_producto(DetalleVentaArchivada, 'cantidad', cantidad)
+            ),
+            ventas_total=(
+                _suma_por_producto(DetalleVenta, 'subtotal', importe)
+                + _suma_por_producto(DetalleVentaArchivada, 'subtotal', importe)
+            ),
+        )
+        .filter(cantidad_total__gt=0)
+        .order_by('-cantidad_total', 'nombre')
+        .values('nombre', 'cantidad_total', 'ventas_total')[:limite]
+    )
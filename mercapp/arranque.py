@@ -0,0 +1,96 @@
+"""Arranque en caliente: deja cargado lo que el primer request pagaría.
+
+Con `preload_app` gunicorn importa Django en el master y los workers nacen
+con la aplicación ya cargada (fork). Sobre eso:
+
+- en el master (`when_ready`), antes de crear workers: resolver las URLs y
+  compilar las plantillas propias, que los workers heredan ya en memoria;
+- en cada worker (`post_worker_init`), antes de aceptar tráfico: precargar
+  el catálogo de la caja (productos clase A) y los usuarios con sus roles
+  en la caché de autenticación.
+
+No se abren conexiones a la base por adelantado: las conexiones de Django
+son por hilo y los workers `gthread` atienden en otros hilos, así que una
+conexión abierta aquí no la usaría ningún request. Al terminar,
+config/gunicorn.py cierra la que abrieron las consultas del calentamiento.
+Con DB_POOL el pool es del proceso y esa conexión vuelve a él, lista para
+el primer request; sin pool cada hilo abre la suya en su primer request.
+
+Cada paso es independiente: si falla se registra y el arranque sigue, un
+worker frío es mejor que un worker que no arranca.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+
+logger = logging.getLogger('mercapp')
+
+PASOS_MASTER = ('urls', 'plantillas')
+PASOS_WORKER = ('catalogo', 'roles')
+
+
+def _urls():
+    resolver = get_resolver()
+    # reverse_dict fuerza la compilación de todos los patrones
+    return len(resolver.reverse_dict)
+
+
+def _plantillas():
+    """Compila las plantillas del proyecto (no las del admin)."""
+    motor = engines['django']
+    cargadas = 0
+    for carpeta in (*motor.dirs, *get_app_template_dirs('templates')):
+        carpeta = str(carpeta)
+        if not carpeta.startswith(str(settings.BASE_DIR)) or 'site-packages' in carpeta:
+            continue
+        for raiz, _, archivos in os.walk(carpeta):
+            for nombre in archivos:
+                if nombre.endswith(('.html', '.txt')):
+                    motor.get_template(os.path.relpath(os.path.join(raiz, nombre), carpeta))
+                    cargadas += 1
+    return cargadas
+
+
+def _catalogo():
+    from .catalogo import catalogo
+
+    return catalogo.calentar()
+
+
+def _roles():
+    if not settings.AUTH_CACHE:
+        return 0
+    from .auth_cache import precargar
+
+    return precargar(settings.ARRANQUE_USUARIOS)
+
+
+PASOS = {
+    'urls': _urls,
+    'plantillas': _plantillas,
+    'catalogo': _catalogo,
+    'roles': _roles,
+}
+
+
+def calentar(pasos=PASOS_MASTER + PASOS_WORKER):
+    """Ejecuta los pasos indicados. Devuelve {paso: (resultado, segundos)}."""
+    tiempos = {}
+    for paso in pasos:
+        inicio = time.perf_counter()
+        try:
+            resultado = PASOS[paso]()
+        except Exception:
+            logger.exception("Falló el paso de calentamiento %s", paso)
+            resultado = None
+        tiempos[paso] = (resultado, time.perf_counter() - inicio)
+    logger.info(
+        "Calentamiento: %s",
+        ", ".join(f"{paso}={resultado} ({segundos * 1000:.0f} ms)" for paso, (resultado, segundos) in tiempos.items()),
+    )
+    return tiempos
@@ -0,0 +1,129 @@
+"""Registro de auditoría con escritura por lotes.
+
+`registrar()` sólo agrega el evento a un buffer en memoria del proceso. En
+los workers de gunicorn (post_worker_init) un hilo escritor vuelca el buffer
+con un único bulk_create cada AUDIT_VOLCADO_SEGUNDOS, o antes si se juntan
+AUDIT_BATCH_SIZE eventos: un lote reúne los eventos de todos los requests de
+ese intervalo y ningún request espera el INSERT. Al apagar el proceso se
+vuelca lo que quede (atexit y el hook worker_exit de gunicorn).
+
+Donde no corre el escritor (runserver, comandos, tests) el buffer se vuelca
+al terminar cada request (señal `request_finished`, que llega cuando la
+respuesta ya se envió); si otro hilo ya está escribiendo, el request no
+espera y sus eventos salen en el próximo lote. Django cierra las conexiones
+en `request_finished` antes de este volcado, así que la conexión que abre se
+cierra (o vuelve al pool) enseguida con el mismo criterio.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from .models import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+_buffer = []
+_buffer_lock = threading.Lock()
+_escritura_lock = threading.Lock()
+_despertar = threading.Event()
+_detener = threading.Event()
+_escritor = None
+
+
+def registrar(accion, usuario=None, objeto=None, descripcion=""):
+    """Encola un evento de auditoría; no toca la base de datos."""
+    evento = AuditEvent(
+        fecha=timezone.now(),
+        accion=accion,
+        usuario=getattr(usuario, "username", "") or "",
+        objeto_tipo=objeto._meta.model_name if objeto is not None else "",
+        objeto_id=str(objeto.pk) if objeto is not None else "",
+        descripcion=descripcion,
+    )
+    with _buffer_lock:
+        _buffer.append(evento)
+        lleno = len(_buffer) >= settings.AUDIT_BATCH_SIZE
+    if lleno:
+        _despertar.set()
+
+
+def pendientes():
+    with _buffer_lock:
+        return len(_buffer)
+
+
+def vaciar(esperar=True):
+    """Escribe los eventos pendientes. Devuelve cuántos se guardaron.
+
+    Con esperar=False no hace nada si otro hilo ya está escribiendo.
+    """
+    if not _escritura_lock.acquire(blocking=esperar):
+        return 0
+    try:
+        with _buffer_lock:
+            lote = _buffer[:]
+            del _buffer[:]
+        if not lote:
+            return 0
+        try:
+            AuditEvent.objects.bulk_create(lote, batch_size=settings.AUDIT_BATCH_SIZE)
+        except DatabaseError:
+            logger.exception("No se pudieron guardar %d eventos de auditoría", len(lote))
+            with _buffer_lock:
+                # Se reintentan en el próximo volcado, sin crecer sin límite
+                _buffer[:0] = lote[-settings.AUDIT_MAX_PENDIENTES:]
+            return 0
+        return len(lote)
+    finally:
+        _escritura_lock.release()
+
+
+def _escribir():
+    while not _detener.is_set():
+        _despertar.wait(settings.AUDIT_VOLCADO_SEGUNDOS)
+        _despertar.clear()
+        try:
+            vaciar()
+        except Exception:
+            # El hilo no puede morir: los eventos quedarían en memoria
+            logger.exception("Falló el volcado de auditoría")
+        finally:
+            close_old_connections()
+
+
+def iniciar_escritor():
+    """Arranca el hilo escritor del proceso (una vez por worker)."""
+    global _escritor
+    if _escritor is None or not _escritor.is_alive():
+        _detener.clear()
+        _escritor = threading.Thread(target=_escribir, name="auditoria", daemon=True)
+        _escritor.start()
+    return _escritor
+
+
+def detener_escritor():
+    """Detiene el hilo escritor y vuelca lo pendiente (worker_exit)."""
+    global _escritor
+    if _escritor is not None:
+        _detener.set()
+        _despertar.set()
+        _escritor.join()
+        _escritor = None
+    return vaciar()
+
+
+def _al_terminar_request(sender, **kwargs):
+    if _escritor is not None and _escritor.is_alive():
+        return
+    if pendientes():
+        vaciar(esperar=False)
+        close_old_connections()
+
+
+request_finished.connect(_al_terminar_request, dispatch_uid="mercapp_auditoria")
+atexit.register(vaciar)
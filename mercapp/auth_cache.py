@@ -0,0 +1,76 @@
+"""Usuario autenticado y sus roles guardados en la caché.
+
+`AuthenticationMiddleware` carga la fila del usuario en cada request y luego
+es_admin/es_vendedor consultan `auth_group`. Aquí se guarda el usuario ya
+resuelto (con sus grupos y permisos) en la caché, de modo que un acierto no
+toca la base de datos. Las señales de `mercapp.signals` lo invalidan cuando
+cambian la contraseña, el flag `is_active` o los grupos del usuario.
+"""
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db.models import F
+from django.utils.crypto import constant_time_compare
+
+from .permissions import nombres_grupos
+from .versiones import obtener_version
+
+
+def _clave(user_id):
+    # La versión 'auth' cambia al modificar permisos de grupos: invalida a todos
+    return f"mercapp:auth:{obtener_version('auth')}:{user_id}"
+
+
+def guardar_usuario(user):
+    """Guarda `user` con sus grupos y permisos ya resueltos."""
+    nombres_grupos(user)
+    # Llena _perm_cache / _user_perm_cache / _group_perm_cache del backend
+    user.get_all_permissions()
+    cache.set(_clave(user.pk), user, settings.AUTH_USER_CACHE_TIMEOUT)
+
+
+def invalidar_usuario(user_id):
+    cache.delete(_clave(user_id))
+
+
+def precargar(limite):
+    """Cachea los `limite` usuarios activos de login más reciente que aún no
+    estén en la caché (al arrancar un worker). Devuelve cuántos guardó."""
+    usuarios = auth.get_user_model().objects.filter(is_active=True).order_by(F('last_login').desc(nulls_last=True))
+    guardados = 0
+    for user in usuarios[:limite]:
+        if cache.get(_clave(user.pk)) is None:
+            guardar_usuario(user)
+            guardados += 1
+    return guardados
+
+
+def obtener_usuario(request):
+    """Equivalente a `django.contrib.auth.get_user` que consulta antes la caché."""
+    try:
+        user_id = auth.get_user_model()._meta.pk.to_python(request.session[SESSION_KEY])
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+
+    user = cache.get(_clave(user_id))
+    if user is not None:
+        session_hash = request.session.get(HASH_SESSION_KEY)
+        if (
+            user.is_active
+            and session_hash
+            and constant_time_compare(session_hash, user.get_session_auth_hash())
+        ):
+            user.backend = backend_path
+            return user
+
+    # Fallo de caché (o hash distinto): la verificación completa de Django
+    # decide, incluido el flush de la sesión si la contraseña cambió.
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        guardar_usuario(user)
+    return user
@@ -0,0 +1,122 @@
+"""Búsqueda de ventas por producto, código, vendedor, método de pago,
+importe y estado, sobre ventas vivas y archivadas.
+
+Pagina por clave (fecha, id) descendente en lugar de OFFSET: cada página es
+un recorrido de índice desde el cursor, así que la página 500 cuesta lo
+mismo que la primera y una venta nueva no desplaza filas entre páginas.
+
+Índices que la sostienen (migración 0017):
+
+- Venta (fecha, id): orden y cursor. Los filtros poco selectivos (método de
+  pago, rango de importe) se evalúan durante el recorrido y el LIMIT corta
+  apenas junta una página.
+- Venta (usuario, fecha, id): ventas de un vendedor, ya ordenadas.
+- Venta (fecha, id) parcial sobre anuladas: son pocas y se listan sin
+  recorrer las demás.
+- DetalleVenta (producto, venta), y lo mismo en el archivo: las ventas de
+  un producto poco vendido salen del índice sin leer las líneas. Para uno
+  común se recorre por fecha y se prueba cada venta (ver _filtrar).
+"""
+import heapq
+from datetime import datetime, time, timedelta
+
+from django.db.models import Exists, OuterRef, Q, Value
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import DetalleVenta, DetalleVentaArchivada, Producto, Venta, VentaArchivada
+
+CAMPOS = ('id', 'fecha', 'total', 'metodo_pago', 'anulada', 'usuario__username')
+# Con al menos estas líneas un producto se considera común (ver _filtrar)
+LINEAS_PRODUCTO_COMUN = 5000
+
+
+def _inicio_del_dia(fecha):
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+def productos_buscados(producto='', codigo=''):
+    """Ids de los productos por nombre (contiene) y/o código exacto, o None
+    si no se filtra por producto."""
+    if not producto and not codigo:
+        return None
+    productos = Producto.objects.all()
+    if codigo:
+        productos = productos.filter(codigo=codigo)
+    if producto:
+        productos = productos.filter(nombre__icontains=producto)
+    return productos.values('id')
+
+
+def _filtrar(qs, detalles, filtros, productos, usuario, cursor):
+    if productos is not None:
+        lineas = detalles.objects.filter(producto_id__in=productos)
+        if lineas[:LINEAS_PRODUCTO_COMUN].count() < LINEAS_PRODUCTO_COMUN:
+            # Producto poco vendido: sus ventas salen del índice (producto, venta)
+            qs = qs.filter(id__in=lineas.values('venta_id'))
+        else:
+            # Producto común: conviene recorrer por fecha y probar cada venta,
+            # la página se llena mucho antes de leer todas sus líneas
+            qs = qs.filter(Exists(lineas.filter(venta_id=OuterRef('id'))))
+    if usuario is not None:
+        qs = qs.filter(usuario=usuario)
+    if filtros.get('metodo_pago'):
+        qs = qs.filter(metodo_pago=filtros['metodo_pago'])
+    if filtros.get('total_desde') is not None:
+        qs = qs.filter(total__gte=filtros['total_desde'])
+    if filtros.get('total_hasta') is not None:
+        qs = qs.filter(total__lte=filtros['total_hasta'])
+    if filtros.get('anulada') in ('si', 'no'):
+        qs = qs.filter(anulada=filtros['anulada'] == 'si')
+    # Rangos sobre la columna (no fecha__date) para que sirva el índice
+    if filtros.get('fecha_desde'):
+        qs = qs.filter(fecha__gte=_inicio_del_dia(filtros['fecha_desde']))
+    if filtros.get('fecha_hasta'):
+        qs = qs.filter(fecha__lt=_inicio_del_dia(filtros['fecha_hasta'] + timedelta(days=1)))
+    if cursor is not None:
+        fecha, venta_id = cursor
+        # fecha__lte acota el recorrido del índice; el OR desempata
+        qs = qs.filter(Q(fecha__lte=fecha) & (Q(fecha__lt=fecha) | Q(id__lt=venta_id)))
+    return qs
+
+
+def buscar(filtros, usuario=None, cursor=None, limite=50):
+    """Una página de ventas que cumplen `filtros` (cleaned_data de
+    BusquedaVentasForm), de la más reciente a la más antigua.
+
+    `usuario` restringe a sus ventas (si no, vale filtros['usuario']).
+    Devuelve (filas, cursor de la página siguiente o None).
+    """
+    usuario = usuario if usuario is not None else filtros.get('usuario')
+    productos = productos_buscados(filtros.get('producto', ''), filtros.get('codigo', ''))
+    partes = []
+    for modelo, detalles, archivada in ((Venta, DetalleVenta, False), (VentaArchivada, DetalleVentaArchivada, True)):
+        qs = _filtrar(modelo.objects.all(), detalles, filtros, productos, usuario, cursor)
+        partes.append(
+            qs.order_by('-fecha', '-id').values(*CAMPOS).annotate(archivada=Value(archivada))[:limite + 1]
+        )
+    # Cada parte ya viene ordenada: se mezclan y se corta la página
+    clave = lambda fila: (fila['fecha'], fila['id'])  # noqa: E731
+    filas = list(heapq.merge(*(list(p) for p in partes), key=clave, reverse=True))[:limite + 1]
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor(filas[-1])
+    return filas, siguiente
+
+
+def codificar_cursor(fila):
+    return f"{fila['fecha'].isoformat()}_{fila['id']}"
+
+
+def decodificar_cursor(texto):
+    """(fecha, id) del cursor, o None si no es válido."""
+    fecha, _, venta_id = (texto or '').rpartition('_')
+    try:
+        fecha = parse_datetime(fecha)
+        venta_id = int(venta_id)
+    except ValueError:
+        return None
+    if fecha is None:
+        return None
+    return fecha, venta_id
@@ -0,0 +1,135 @@
+"""Catálogo de productos en memoria de cada worker para el escaneo en caja.
+
+Cada lectura de código de barras resuelve codigo -> (id, nombre, precio)
+contra un LRU del proceso, sin ir a la base ni a Redis. La validez se
+comprueba con la versión 'catalogo' (mercapp/versiones.py), que las señales
+incrementan sólo al guardar o borrar un Producto: como mucho una vez cada
+CATALOGO_VERIFICAR_SEGUNDOS se lee la versión compartida y, si cambió, el LRU
+se vacía y se vuelve a llenar bajo demanda.
+
+El stock no se guarda: cambia con cada venta, y si estuviera en la entrada
+cada venta vaciaría el LRU justo mientras se cobra. El endpoint lo lee
+aparte por clave primaria (el formset de la venta lo valida igual).
+
+La versión vive en Redis o, sin Redis, en la base (VersionDatos), así que
+todos los workers ven el mismo número. Igual cada entrada vence a los
+CATALOGO_MAX_EDAD_SEGUNDOS: cubre los cambios que no pasan por las señales
+(un queryset.update, una carga por SQL) y acota cuánto puede vivir un dato
+viejo si la versión no se pudiera leer.
+
+También se recuerdan los códigos inexistentes, para que un código mal leído
+repetido no consulte la base en cada intento.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+
+from .models import Producto
+from .versiones import obtener_version
+
+ProductoCacheado = namedtuple('ProductoCacheado', 'id codigo nombre precio')
+
+_CAMPOS = ('id', 'codigo', 'nombre', 'precio')
+_NO_EXISTE = object()
+
+
+class CatalogoLRU:
+    def __init__(self):
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._verificado = float('-inf')
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def _vigente(self):
+        ahora = time.monotonic()
+        if ahora - self._verificado < settings.CATALOGO_VERIFICAR_SEGUNDOS:
+            return
+        version = obtener_version('catalogo')
+        with self._lock:
+            self._verificado = ahora
+            if version != self._version:
+                if self._entradas:
+                    self.invalidaciones += 1
+                self._entradas.clear()
+                self._version = version
+
+    def _guardar(self, clave, entrada):
+        # Llamar con el lock tomado
+        self._entradas[clave] = (entrada, time.monotonic())
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > settings.CATALOGO_CACHE_MAX:
+            self._entradas.popitem(last=False)
+
+    def _obtener(self, clave, filtro):
+        self._vigente()
+        with self._lock:
+            entrada, guardada = self._entradas.get(clave, (None, None))
+            if entrada is not None and time.monotonic() - guardada < settings.CATALOGO_MAX_EDAD_SEGUNDOS:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return None if entrada is _NO_EXISTE else entrada
+            self.fallos += 1
+            version = self._version
+        fila = Producto.objects.filter(activo=True, **filtro).values_list(*_CAMPOS).first()
+        entrada = ProductoCacheado(*fila) if fila else None
+        with self._lock:
+            # Si la versión cambió mientras se consultaba, la fila puede ser vieja
+            if version == self._version:
+                self._guardar(clave, entrada or _NO_EXISTE)
+        return entrada
+
+    def buscar(self, codigo):
+        """Producto activo con ese código de barras (o None)."""
+        codigo = str(codigo).strip()
+        if not codigo:
+            return None
+        return self._obtener(codigo, {'codigo': codigo})
+
+    def por_id(self, producto_id):
+        return self._obtener(f"#{int(producto_id)}", {'pk': int(producto_id)})
+
+    def calentar(self, clases=('A',)):
+        """Precarga los productos más vendidos (clase ABC) en una consulta."""
+        self._vigente()
+        with self._lock:
+            version = self._version
+        filas = (
+            Producto.objects.filter(activo=True, clase_abc__in=clases)
+            .exclude(codigo=None).exclude(codigo='')
+            .order_by('participacion_acumulada')
+            .values_list(*_CAMPOS)[:settings.CATALOGO_CACHE_MAX]
+        )
+        entradas = [ProductoCacheado(*fila) for fila in filas]
+        with self._lock:
+            if version != self._version:
+                return 0
+            # Al final del LRU quedan los de mayor venta
+            for entrada in reversed(entradas):
+                self._guardar(entrada.codigo, entrada)
+        return len(entradas)
+
+    def estadisticas(self):
+        total = self.aciertos + self.fallos
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': round(self.aciertos / total, 4) if total else None,
+            'entradas': len(self._entradas),
+            'invalidaciones': self.invalidaciones,
+            'version': self._version,
+        }
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._version = None
+            self._verificado = float('-inf')
+            self.aciertos = self.fallos = self.invalidaciones = 0
+
+
+catalogo = CatalogoLRU()
@@ -0,0 +1,94 @@
+"""Clasificación ABC (Pareto) de productos por ingresos.
+
+Una consulta agrupada suma los ingresos de cada producto en la ventana
+(ventas vivas y archivadas, sin anuladas); el ranking y los acumulados se
+calculan con NumPy para todo el catálogo a la vez:
+
+- A: productos que juntos hacen el primer ABC_UMBRAL_A de los ingresos;
+- B: los siguientes hasta ABC_UMBRAL_B;
+- C: el resto, incluidos los que no vendieron.
+
+Sólo se escriben los productos cuya clase o participación cambió.
+"""
+from collections import Counter
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import DetalleVenta, DetalleVentaArchivada, Producto
+from .versiones import incrementar_version
+
+
+def _ingresos(desde):
+    """(producto_id, ingresos) de ventas no anuladas desde `desde`."""
+    def agrupado(modelo):
+        return (
+            modelo.objects.filter(venta__anulada=False, venta__fecha__gte=desde)
+            .order_by()
+            .values_list('producto_id')
+            .annotate(ingresos=Sum('subtotal'))
+        )
+
+    return agrupado(DetalleVenta).union(agrupado(DetalleVentaArchivada), all=True)
+
+
+def clasificar(ingresos, umbral_a, umbral_b):
+    """Clase ('A'/'B'/'C') y participación acumulada de cada producto.
+
+    Un producto entra en una clase si el acumulado *antes* de él no llegó
+    al umbral, así el que cruza el 80 % también es A.
+    """
+    total = ingresos.sum()
+    if total <= 0:
+        return np.full(len(ingresos), 'C'), np.ones(len(ingresos))
+    orden = np.argsort(-ingresos, kind='stable')
+    acumulada = np.empty(len(ingresos))
+    acumulada[orden] = np.cumsum(ingresos[orden]) / total
+    previa = acumulada - ingresos / total
+    clase = np.where(previa < umbral_a, 'A', np.where(previa < umbral_b, 'B', 'C'))
+    clase[ingresos <= 0] = 'C'
+    return clase, acumulada
+
+
+def actualizar(dias=None):
+    """Recalcula la clase ABC de los productos activos. Devuelve un Counter
+    con la cantidad de productos por clase."""
+    dias = settings.ABC_VENTANA_DIAS if dias is None else dias
+    desde = timezone.now() - timedelta(days=dias)
+
+    productos = list(
+        Producto.objects.filter(activo=True).order_by('id')
+        .values_list('id', 'clase_abc', 'participacion_acumulada')
+    )
+    if not productos:
+        return Counter()
+    ids = np.fromiter((p[0] for p in productos), dtype=np.int64, count=len(productos))
+
+    filas = list(_ingresos(desde))
+    producto_id = np.fromiter((f[0] for f in filas), dtype=np.int64, count=len(filas))
+    montos = np.fromiter((f[1] for f in filas), dtype=np.float64, count=len(filas))
+    fila = np.minimum(np.searchsorted(ids, producto_id), len(ids) - 1)
+    conocido = ids[fila] == producto_id
+    ingresos = np.bincount(fila[conocido], weights=montos[conocido], minlength=len(ids))
+
+    clase, acumulada = clasificar(ingresos, settings.ABC_UMBRAL_A, settings.ABC_UMBRAL_B)
+
+    cambiados = []
+    for (pk, clase_actual, acumulada_actual), nueva, valor in zip(productos, clase.tolist(), acumulada.tolist()):
+        valor = round(valor, 4)
+        if clase_actual != nueva or acumulada_actual != valor:
+            cambiados.append(Producto(id=pk, clase_abc=nueva, participacion_acumulada=valor))
+    with transaction.atomic():
+        Producto.objects.bulk_update(cambiados, ['clase_abc', 'participacion_acumulada'], batch_size=2000)
+        limpiados = (
+            Producto.objects.filter(activo=False).exclude(clase_abc='')
+            .update(clase_abc='', participacion_acumulada=None)
+        )
+    if cambiados or limpiados:
+        # bulk_update no dispara señales: invalidar a mano la lista de productos
+        transaction.on_commit(lambda: incrementar_version('productos'))
+    return Counter(clase.tolist())
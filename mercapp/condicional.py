@@ -0,0 +1,91 @@
+"""GET condicional (ETag / Last-Modified) para las páginas de lectura.
+
+El ETag de una página se arma con datos baratos: las versiones de datos de
+las que depende (mercapp/versiones.py, una sola lectura), el usuario y sus
+roles, la URL completa y la versión del despliegue. Si el navegador ya tiene
+esa versión se responde 304 sin ejecutar la vista: ni las consultas
+principales ni el render de la plantilla.
+
+Las versiones tienen que ser las mismas en todos los workers: si cada uno
+llevara las suyas (una LocMemCache), el que no vio el cambio respondería 304
+con la página vieja. Por eso viven en Redis o, sin Redis, en la tabla
+VersionDatos.
+
+El usuario y sus roles van en el ETag porque el contenido depende de ellos
+(un vendedor sólo ve sus ventas); la respuesta es además `private`, para
+que ningún proxy compartido la guarde.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .permissions import nombres_grupos
+from .versiones import obtener_versiones
+
+
+def _aplicable(request):
+    if settings.DEBUG:
+        # En desarrollo las plantillas cambian sin que cambie nada más
+        return False
+    # Con mensajes pendientes la página tiene que renderizarse para mostrarlos
+    return not len(messages.get_messages(request))
+
+
+def etag_pagina(request, *partes):
+    """ETag de la página para este usuario, o None si no conviene usarlo.
+
+    Entre las `partes` tiene que ir la versión 'auth' (ver `condicional`).
+    """
+    if not _aplicable(request):
+        return None
+    user = request.user
+    clave = [
+        settings.VERSION_DESPLIEGUE,
+        request.get_full_path(),
+        # La sesión cambia al iniciar sesión, y con ella el token CSRF de los formularios
+        request.session.session_key,
+        user.pk,
+        user.is_superuser,
+        sorted(nombres_grupos(user)),
+        *partes,
+    ]
+    return '"%s"' % hashlib.sha256(repr(clave).encode()).hexdigest()[:32]
+
+
+def condicional(*versiones, extra=None, last_modified=None):
+    """Decorador: responde 304 si no cambió ninguna de las `versiones`.
+
+    `extra(request, *args, **kwargs)` agrega partes propias de la vista al
+    ETag; `last_modified` es la función de fecha que recibe `condition`.
+    Va debajo de los decoradores de permisos, para no responder 304 a quien
+    no puede ver la página.
+    """
+    def etag(request, *args, **kwargs):
+        if not _aplicable(request):
+            return None
+        partes = obtener_versiones('auth', *versiones)
+        if extra is not None:
+            partes.append(extra(request, *args, **kwargs))
+        return etag_pagina(request, *partes)
+
+    def fecha(request, *args, **kwargs):
+        return last_modified(request, *args, **kwargs) if _aplicable(request) else None
+
+    def decorador(vista):
+        vista_condicional = condition(
+            etag_func=etag, last_modified_func=fecha if last_modified is not None else None,
+        )(vista)
+
+        @wraps(vista)
+        def envuelta(request, *args, **kwargs):
+            respuesta = vista_condicional(request, *args, **kwargs)
+            if respuesta.has_header('ETag') or respuesta.status_code == 304:
+                # Guardar, pero preguntar siempre antes de reutilizar
+                patch_cache_control(respuesta, private=True, no_cache=True)
+            return respuesta
+        return envuelta
+    return decorador
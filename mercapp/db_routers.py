@@ -0,0 +1,81 @@
+"""Enrutado opcional de lecturas a una réplica de la base de datos.
+
+Sólo se activa si existe el alias 'replica' (DATABASE_REPLICA_URL en
+settings). Las vistas de sólo lectura se marcan con `@lectura_en_replica`;
+todo lo demás (escrituras, transacciones, sesión y autenticación) sigue en
+la base primaria.
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+REPLICA = 'replica'
+
+# Cookie que deja al usuario en la primaria unos segundos tras escribir, para
+# que vea su propia venta aunque la réplica aún no la haya recibido.
+COOKIE_PRIMARIA = 'mercapp_primaria'
+
+_usar_replica = ContextVar('mercapp_usar_replica', default=False)
+
+
+def replica_configurada():
+    return REPLICA in settings.DATABASES
+
+
+def lectura_en_replica(view_func):
+    """Ejecuta la vista leyendo de la réplica (sólo GET/HEAD)."""
+
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        if (
+            not replica_configurada()
+            or request.method not in ('GET', 'HEAD')
+            or COOKIE_PRIMARIA in request.COOKIES
+        ):
+            return view_func(request, *args, **kwargs)
+        token = _usar_replica.set(True)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _usar_replica.reset(token)
+
+    return _wrapped
+
+
+def leyendo_de_replica():
+    """True si la vista actual está marcada para leer de la réplica."""
+    return _usar_replica.get()
+
+
+def fragment_cache_timeout():
+    """Duración de los fragmentos cacheados según el origen de la lectura.
+
+    Con réplica, la versión de datos puede avanzar antes de que los datos
+    lleguen a la réplica; se acota la vida del fragmento al mismo margen que
+    se da al usuario tras escribir.
+    """
+    if leyendo_de_replica():
+        return min(settings.FRAGMENT_CACHE_TIMEOUT, settings.REPLICA_PIN_SECONDS)
+    return settings.FRAGMENT_CACHE_TIMEOUT
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _usar_replica.get() or not replica_configurada():
+            return None
+        # Dentro de una transacción de escritura se lee lo que se escribe
+        if connections['default'].in_atomic_block:
+            return None
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primaria y réplica contienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
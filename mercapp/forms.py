@@ -1,7 +1,9 @@
 
 from django import forms
-from django.forms import formset_factory
-from .models import Producto, Venta, DetalleVenta
+from django.forms import BaseModelFormSet, modelformset_factory
+from .models import Producto, StockSucursal, Sucursal, Venta, DetalleVenta
+from .reportes import DIMENSIONES, MEDIDAS
+from .tareas import TIPOS
 
 from django import forms
 from django.contrib.auth import get_user_model
@@ -45,17 +47,228 @@ class ProductoForm(forms.ModelForm):
 class VentaForm(forms.ModelForm):
     class Meta:
         model = Venta
-        fields = ["metodo_pago"]
+        fields = ["metodo_pago", "sucursal"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        sucursales = Sucursal.objects.filter(activa=True)
+        if sucursales.exists():
+            # Con sucursales toda venta descuenta el stock de una de ellas
+            self.fields['sucursal'].queryset = sucursales
+            self.fields['sucursal'].required = True
+        else:
+            del self.fields['sucursal']
+
+
+class ProductoIdField(forms.ModelChoiceField):
+    """Campo de producto que viaja como id en un input oculto.
+
+    No renderiza el catálogo como <option>. Cuando el formset le asigna
+    `productos` (mapa id -> Producto precargado) resuelve el id contra ese
+    mapa en vez de hacer una consulta por fila.
+    """
+    widget = forms.HiddenInput
+    productos = None
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if self.productos is None:
+            return super().to_python(value)
+        try:
+            producto = self.productos.get(int(value))
+        except (TypeError, ValueError):
+            producto = None
+        if producto is None:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        return producto
 
 
 class DetalleVentaForm(forms.ModelForm):
+    producto = ProductoIdField(queryset=Producto.objects.filter(activo=True))
+    # Si no se envía precio se usa el precio actual del producto
+    precio_unitario = forms.DecimalField(
+        max_digits=12, decimal_places=2, min_value=0, required=False
+    )
+
     class Meta:
         model = DetalleVenta
         fields = ["producto", "cantidad", "precio_unitario"]
 
+    def clean(self):
+        cleaned = super().clean()
+        producto = cleaned.get('producto')
+        if producto is not None and cleaned.get('precio_unitario') is None:
+            cleaned['precio_unitario'] = producto.precio
+        return cleaned
+
+    def _get_validation_exclusions(self):
+        # El producto ya se validó contra el mapa precargado: se evita el
+        # SELECT de existencia que ForeignKey.validate haría por cada fila.
+        exclude = super()._get_validation_exclusions()
+        exclude.add('producto')
+        return exclude
+
+
+class BaseDetalleVentaFormSet(BaseModelFormSet):
+    """Formset de detalles que valida todos los productos con una sola consulta.
+
+    Los ids enviados en todas las filas se cargan con un único `IN` y el
+    mismo mapa se comparte entre los formularios, que lo reutilizan para el
+    precio por defecto y para el control de stock.
+    """
+
+    # Sucursal de la venta (la asigna la vista): el stock se controla contra ella
+    sucursal = None
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('queryset', DetalleVenta.objects.none())
+        super().__init__(*args, **kwargs)
+        self._productos = None
+
+    @property
+    def productos(self):
+        if self._productos is None:
+            ids = set()
+            if self.is_bound:
+                for i in range(self.total_form_count()):
+                    valor = self.data.get(f"{self.add_prefix(i)}-producto")
+                    try:
+                        ids.add(int(valor))
+                    except (TypeError, ValueError):
+                        continue
+            self._productos = (
+                Producto.objects.filter(activo=True).in_bulk(ids) if ids else {}
+            )
+        return self._productos
+
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        if self.is_bound:
+            form.fields['producto'].productos = self.productos
+        return form
+
+    def clean(self):
+        super().clean()
+        if any(self.errors):
+            return
+        # Cantidad total pedida por producto (un producto puede repetirse en varias filas)
+        requerido = {}
+        for form in self.forms:
+            producto = form.cleaned_data.get('producto')
+            cantidad = form.cleaned_data.get('cantidad')
+            if producto and cantidad:
+                requerido[producto.pk] = requerido.get(producto.pk, 0) + cantidad
+        if self.sucursal is not None:
+            disponible = dict(
+                StockSucursal.objects.filter(sucursal=self.sucursal, producto_id__in=requerido)
+                .values_list('producto_id', 'cantidad')
+            )
+        else:
+            disponible = {pk: self.productos[pk].stock for pk in requerido}
+        errores = []
+        for producto_id, cantidad in requerido.items():
+            producto = self.productos[producto_id]
+            if disponible.get(producto_id, 0) < cantidad:
+                errores.append(
+                    f"Stock insuficiente para {producto.nombre}. "
+                    f"Disponible: {disponible.get(producto_id, 0)}, requerido: {cantidad}"
+                )
+        if errores:
+            raise forms.ValidationError(errores)
+
 
-DetalleVentaFormSet = formset_factory(DetalleVentaForm, extra=3, min_num=1, validate_min=True)
+DetalleVentaFormSet = modelformset_factory(
+    DetalleVenta,
+    form=DetalleVentaForm,
+    formset=BaseDetalleVentaFormSet,
+    extra=1,
+    can_delete=False,
+)
+
+
+class TransferenciaForm(forms.Form):
+    producto = forms.ModelChoiceField(
+        queryset=Producto.objects.filter(activo=True), to_field_name='codigo',
+        widget=forms.TextInput(attrs={'placeholder': 'Código'}), label='Producto',
+        error_messages={'invalid_choice': 'No existe un producto activo con ese código.'},
+    )
+    cantidad = forms.IntegerField(min_value=1)
+    origen = forms.ModelChoiceField(
+        queryset=Sucursal.objects.filter(activa=True), required=False, empty_label='Depósito central',
+    )
+    destino = forms.ModelChoiceField(
+        queryset=Sucursal.objects.filter(activa=True), required=False, empty_label='Depósito central',
+    )
+    nota = forms.CharField(max_length=200, required=False)
+
+    def clean(self):
+        cleaned = super().clean()
+        if 'origen' in cleaned and 'destino' in cleaned and cleaned['origen'] == cleaned['destino']:
+            raise forms.ValidationError('El origen y el destino deben ser distintos.')
+        return cleaned
 
 
 class AnulacionForm(forms.Form):
     motivo = forms.CharField(widget=forms.Textarea(attrs={'rows':3}), label='Motivo de anulación', required=True)
+
+
+class PivotForm(forms.Form):
+    filas = forms.MultipleChoiceField(
+        choices=list(DIMENSIONES.items()), initial=['mes'], label='Filas',
+        widget=forms.CheckboxSelectMultiple,
+    )
+    columna = forms.ChoiceField(
+        choices=[('', '(ninguna)')] + list(DIMENSIONES.items()), required=False,
+        initial='metodo_pago', label='Columnas',
+    )
+    medida = forms.ChoiceField(choices=list(MEDIDAS.items()), initial='importe', label='Medida')
+    fecha_desde = forms.DateField(required=False, label='Fecha desde', widget=forms.DateInput(attrs={'type': 'date'}))
+    fecha_hasta = forms.DateField(required=False, label='Fecha hasta', widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def clean(self):
+        cleaned = super().clean()
+        if cleaned.get('columna') and cleaned.get('columna') in cleaned.get('filas', []):
+            raise forms.ValidationError('La dimensión de columnas no puede repetirse en las filas.')
+        return cleaned
+
+
+class BusquedaVentasForm(forms.Form):
+    producto = forms.CharField(required=False, max_length=150, label='Producto')
+    codigo = forms.CharField(required=False, max_length=50, label='Código')
+    usuario = forms.ModelChoiceField(
+        queryset=get_user_model().objects.order_by('username'), required=False,
+        empty_label='Todos', label='Vendedor',
+    )
+    metodo_pago = forms.ChoiceField(
+        choices=[('', 'Todos')] + Venta.METODO_PAGO_CHOICES, required=False, label='Método de pago',
+    )
+    total_desde = forms.DecimalField(required=False, min_value=0, decimal_places=2, label='Importe desde')
+    total_hasta = forms.DecimalField(required=False, min_value=0, decimal_places=2, label='Importe hasta')
+    anulada = forms.ChoiceField(
+        choices=[('', 'Todas'), ('no', 'Vigentes'), ('si', 'Anuladas')], required=False, label='Estado',
+    )
+    fecha_desde = forms.DateField(required=False, label='Fecha desde', widget=forms.DateInput(attrs={'type': 'date'}))
+    fecha_hasta = forms.DateField(required=False, label='Fecha hasta', widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def clean(self):
+        cleaned = super().clean()
+        for desde, hasta in (('total_desde', 'total_hasta'), ('fecha_desde', 'fecha_hasta')):
+            if cleaned.get(desde) is not None and cleaned.get(hasta) is not None and cleaned[desde] > cleaned[hasta]:
+                raise forms.ValidationError('El rango de importe o de fechas está invertido.')
+        return cleaned
+
+
+class TareaForm(forms.Form):
+    tipo = forms.ChoiceField(
+        choices=lambda: [(nombre, descripcion) for nombre, (descripcion, _) in TIPOS.items()],
+        label='Tarea',
+    )
+    dias = forms.IntegerField(
+        min_value=1, initial=730, required=False, label='Días (archivar)',
+        help_text='Sólo para archivar: ventas con más de estos días.',
+    )
@@ -0,0 +1,125 @@
+"""Logging estructurado y sin bloqueo.
+
+El hilo del request sólo encola el registro (`ColaJSONHandler`); un hilo
+listener arma el mensaje, lo formatea como JSON y lo escribe en stderr. Cada
+línea lleva el id del request y el usuario (ver RequestIdMiddleware), si el
+request ya lo había cargado.
+
+Este módulo se carga desde LOGGING en settings: no debe importar modelos.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+from contextvars import ContextVar
+from decimal import Decimal
+from logging.handlers import QueueHandler, QueueListener
+
+from django.utils.functional import empty
+
+_request_actual = ContextVar('mercapp_request', default=None)
+_request_id = ContextVar('mercapp_request_id', default=None)
+
+# Atributos estándar de LogRecord; el resto (extra=...) se incluye en el JSON
+_ATRIBUTOS_RECORD = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id', 'usuario'}
+# Argumentos que se pueden formatear más tarde en el listener sin riesgo
+_INMUTABLES = (str, int, float, bool, Decimal, type(None))
+
+
+def iniciar_request(request, request_id):
+    """Asocia el request al contexto actual; devuelve tokens para `terminar_request`."""
+    return _request_actual.set(request), _request_id.set(request_id)
+
+
+def terminar_request(tokens):
+    _request_actual.reset(tokens[0])
+    _request_id.reset(tokens[1])
+
+
+def request_id_actual():
+    return _request_id.get()
+
+
+class ContextoRequestFilter(logging.Filter):
+    """Agrega `request_id` y `usuario` al registro (en el hilo del request).
+
+    `request.user` es perezoso: si el request todavía no lo cargó, el log no
+    lo carga (serían consultas sólo para escribir una línea).
+    """
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        usuario = None
+        request = _request_actual.get()
+        user = getattr(request, 'user', None)
+        # En un SimpleLazyObject `_wrapped` es atributo propio: leerlo no lo evalúa
+        if getattr(user, '_wrapped', user) is not empty and user is not None and user.is_authenticated:
+            usuario = user.get_username()
+        record.usuario = usuario
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        datos = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'usuario': getattr(record, 'usuario', None),
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_RECORD:
+                datos[clave] = valor
+        if record.exc_info:
+            datos['excepcion'] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class ColaJSONHandler(QueueHandler):
+    """QueueHandler con su propio listener que escribe JSON en `stream`.
+
+    La cola no tiene límite: una ráfaga de logs nunca bloquea al request.
+    Tras un fork (gunicorn con preload_app) el hijo arranca su propio
+    listener, porque los hilos no sobreviven al fork.
+    """
+
+    def __init__(self, stream=None):
+        self._stream = stream or sys.stderr
+        super().__init__(queue.SimpleQueue())
+        self._iniciar()
+        os.register_at_fork(after_in_child=self._iniciar)
+        atexit.register(self.detener)
+
+    def _iniciar(self):
+        self.queue = queue.SimpleQueue()
+        destino = logging.StreamHandler(self._stream)
+        destino.setFormatter(JSONFormatter())
+        self.listener = QueueListener(self.queue, destino)
+        self.listener.start()
+        self._activo = True
+
+    def detener(self):
+        # Vacía la cola antes de terminar el proceso
+        if self._activo:
+            self._activo = False
+            self.listener.stop()
+
+    def close(self):
+        # logging.shutdown y una reconfiguración (dictConfig) cierran el handler
+        self.detener()
+        super().close()
+
+    def prepare(self, record):
+        # El mensaje se arma en el listener. Sólo se congelan aquí los
+        # argumentos que podrían cambiar o ser objetos perezosos del request.
+        record = copy.copy(record)
+        if isinstance(record.args, tuple) and not all(isinstance(a, _INMUTABLES) for a in record.args):
+            record.args = tuple(a if isinstance(a, _INMUTABLES) else str(a) for a in record.args)
+        elif isinstance(record.args, dict):
+            record.args = {k: v if isinstance(v, _INMUTABLES) else str(v) for k, v in record.args.items()}
+        return record
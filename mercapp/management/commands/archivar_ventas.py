@@ -0,0 +1,42 @@
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from mercapp.archivo import archivar_lote
+from mercapp.models import Venta
+
+
+class Command(BaseCommand):
+    help = "Mueve las ventas anteriores a una fecha de corte a las tablas de archivo"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=730, help="Archiva ventas con más de N días")
+        parser.add_argument("--antes-de", type=str, help="Fecha de corte YYYY-MM-DD (tiene prioridad sobre --dias)")
+        parser.add_argument("--lote", type=int, default=1000, help="Ventas por transacción")
+        parser.add_argument("--dry-run", action="store_true", help="Sólo informa cuántas ventas se moverían")
+
+    def handle(self, *args, **options):
+        if options["antes_de"]:
+            try:
+                fecha = datetime.strptime(options["antes_de"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--antes-de debe tener formato YYYY-MM-DD")
+            corte = timezone.make_aware(datetime.combine(fecha, time.min))
+        else:
+            corte = timezone.now() - timedelta(days=options["dias"])
+
+        pendientes = Venta.objects.filter(fecha__lt=corte).count()
+        self.stdout.write(f"Ventas anteriores a {corte:%Y-%m-%d %H:%M}: {pendientes}")
+        if options["dry_run"] or not pendientes:
+            return
+
+        total = 0
+        while True:
+            movidas = archivar_lote(corte, options["lote"])
+            if not movidas:
+                break
+            total += movidas
+            self.stdout.write(f"  archivadas {total}/{pendientes}")
+
+        self.stdout.write(self.style.SUCCESS(f"Ventas archivadas: {total}"))
@@ -0,0 +1,143 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from importlib import import_module
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+RUTAS_PUBLICAS = ("/accounts/login/", "/healthz")
+RUTAS_SESION = ("/", "/ventas/nueva/", "/reportes/ventas/", "/productos/")
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el arranque de un proceso (import de Django y carga de la app "
+        "WSGI) y el primer request a cada página, en frío y con el "
+        "calentamiento de mercapp/arranque.py"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticiones", type=int, default=3)
+        parser.add_argument("--usuario", help="Mide también las páginas con sesión de este usuario")
+        parser.add_argument("--modo", choices=("frio", "caliente"), help=(
+            "Mide un solo arranque en este proceso e imprime JSON (uso interno)"
+        ))
+        parser.add_argument("--inicio", type=float, help="time.time() al lanzar el proceso (uso interno)")
+        parser.add_argument("--sesion", default="", help="Cookie de sesión (uso interno)")
+
+    def handle(self, *args, **options):
+        if options["modo"]:
+            self.stdout.write(json.dumps(self._medir(options["modo"], options["inicio"], options["sesion"])))
+            return
+
+        sesion = self._crear_sesion(options["usuario"]) if options["usuario"] else None
+        try:
+            resultados = {modo: self._lanzar(modo, options["repeticiones"], sesion) for modo in ("frio", "caliente")}
+        finally:
+            if sesion is not None:
+                sesion.delete()
+
+        self.stdout.write(f"Mediana de {options['repeticiones']} procesos por modo (ms)")
+        for modo, corridas in resultados.items():
+            def mediana(clave):
+                return statistics.median(c[clave] for c in corridas) * 1000
+
+            self.stdout.write(
+                f"{modo:>9}: arranque {mediana('arranque'):7.0f}, app WSGI {mediana('app'):5.0f}, "
+                f"calentamiento {mediana('calentamiento'):5.0f}, "
+                f"hasta el primer request {mediana('hasta_primer_request'):7.0f}"
+            )
+            for ruta in corridas[0]["primero"]:
+                primero = statistics.median(c["primero"][ruta] for c in corridas) * 1000
+                segundo = statistics.median(c["segundo"][ruta] for c in corridas) * 1000
+                estados = sorted({c["estado"][ruta] for c in corridas})
+                self.stdout.write(
+                    f"{'':>11}{ruta:<20} primero {primero:7.1f}, segundo {segundo:6.1f}  [{', '.join(estados)}]"
+                )
+
+    def _lanzar(self, modo, repeticiones, sesion):
+        corridas = []
+        for _ in range(repeticiones):
+            # Proceso nuevo por corrida: es lo que paga un worker recién creado
+            comando = [
+                sys.executable, os.path.join(settings.BASE_DIR, "manage.py"), "bench_arranque",
+                "--modo", modo, "--inicio", repr(time.time()),
+            ]
+            if sesion is not None:
+                comando += ["--sesion", sesion.session_key]
+            salida = subprocess.run(comando, capture_output=True, text=True, check=True)
+            corridas.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+        return corridas
+
+    def _crear_sesion(self, nombre):
+        usuario = get_user_model().objects.filter(username=nombre, is_active=True).first()
+        if usuario is None:
+            raise CommandError(f"No existe el usuario activo {nombre}")
+        sesion = import_module(settings.SESSION_ENGINE).SessionStore()
+        sesion[SESSION_KEY] = str(usuario.pk)
+        sesion[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        sesion[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+        sesion.save()
+        return sesion
+
+    def _medir(self, modo, lanzado, cookie):
+        # Django ya está importado y configurado (manage.py): eso es el arranque
+        arranque = time.time() - lanzado
+
+        inicio = time.perf_counter()
+        from config.wsgi import application
+        app = time.perf_counter() - inicio
+
+        calentamiento = 0.0
+        if modo == "caliente":
+            from mercapp import arranque as calentador
+
+            from django.db import connections
+
+            inicio = time.perf_counter()
+            calentador.calentar()
+            calentamiento = time.perf_counter() - inicio
+            # Como post_worker_init: los requests de gthread van en otros
+            # hilos y no heredan la conexión del calentamiento
+            connections.close_all()
+
+        # La primera ruta es la que paga todo lo que quedó frío
+        rutas = (RUTAS_SESION if cookie else ()) + RUTAS_PUBLICAS
+        host = next((h.lstrip(".") for h in settings.ALLOWED_HOSTS if h and h != "*"), "localhost")
+        primero, segundo, estado = {}, {}, {}
+        for ruta in rutas:
+            estado[ruta], primero[ruta] = self._pedir(application, ruta, host, cookie)
+        for ruta in rutas:
+            segundo[ruta] = self._pedir(application, ruta, host, cookie)[1]
+
+        return {
+            "arranque": arranque,
+            "app": app,
+            "calentamiento": calentamiento,
+            "hasta_primer_request": arranque + app + calentamiento + primero[rutas[0]],
+            "primero": primero,
+            "segundo": segundo,
+            "estado": estado,
+        }
+
+    def _pedir(self, application, ruta, host, cookie):
+        entorno = {"PATH_INFO": ruta, "HTTP_HOST": host, "SERVER_NAME": host}
+        setup_testing_defaults(entorno)
+        if cookie:
+            entorno["HTTP_COOKIE"] = f"{settings.SESSION_COOKIE_NAME}={cookie}"
+        estado = []
+        inicio = time.perf_counter()
+        cuerpo = application(entorno, lambda status, headers, exc_info=None: estado.append(status))
+        try:
+            for _ in cuerpo:
+                pass
+        finally:
+            if hasattr(cuerpo, "close"):
+                cuerpo.close()
+        return estado[0].split()[0], time.perf_counter() - inicio
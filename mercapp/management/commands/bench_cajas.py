@@ -0,0 +1,267 @@
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from http.cookies import SimpleCookie
+from io import BytesIO
+from urllib import error as urlerror
+from urllib import request as urlrequest
+from urllib.parse import urlencode, urlsplit
+from wsgiref.util import setup_testing_defaults
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import got_request_exception
+
+from mercapp.models import Producto, Sucursal, Venta
+
+_CSRF = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+# Los productos más vendidos (clase ABC) aparecen más en las canastas
+PESOS_ABC = {'A': 8, 'B': 3, 'C': 1, '': 1}
+CANTIDADES = ([1, 2, 3, 4, 6], [60, 20, 10, 5, 5])
+METODOS_PAGO = [codigo for codigo, _ in Venta.METODO_PAGO_CHOICES]
+
+_hilo = threading.local()
+
+
+def _excepcion_del_request(sender, request=None, **kwargs):
+    # El handler WSGI convierte la excepción en un 500: se guarda su texto
+    # para distinguir bloqueos de la base de otros errores
+    error = sys.exc_info()[1]
+    _hilo.excepcion = f"{type(error).__name__}: {error}" if error else None
+
+
+class ClienteWSGI:
+    """Navegador mínimo contra la aplicación WSGI en este proceso.
+
+    Pasa por todo el stack real (middleware, sesión, CSRF, señales de
+    request que abren y cierran conexiones), sin red.
+    """
+
+    def __init__(self, application, host):
+        self.application = application
+        self.host = host
+        self.cookies = {}
+
+    def pedir(self, metodo, ruta, datos=None):
+        cuerpo = urlencode(datos or {}).encode()
+        ruta, _, query = ruta.partition('?')
+        entorno = {
+            'REQUEST_METHOD': metodo, 'PATH_INFO': ruta, 'QUERY_STRING': query,
+            'HTTP_HOST': self.host, 'SERVER_NAME': self.host, 'wsgi.input': BytesIO(cuerpo),
+        }
+        if metodo == 'POST':
+            entorno['CONTENT_TYPE'] = 'application/x-www-form-urlencoded'
+            entorno['CONTENT_LENGTH'] = str(len(cuerpo))
+        if self.cookies:
+            entorno['HTTP_COOKIE'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        setup_testing_defaults(entorno)
+
+        respuesta = {}
+
+        def start_response(status, headers, exc_info=None):
+            respuesta['estado'] = int(status.split()[0])
+            respuesta['cabeceras'] = headers
+
+        _hilo.excepcion = None
+        partes = self.application(entorno, start_response)
+        try:
+            contenido = b''.join(partes)
+        finally:
+            if hasattr(partes, 'close'):
+                partes.close()
+        for nombre, valor in respuesta['cabeceras']:
+            if nombre.lower() == 'set-cookie':
+                for cookie in SimpleCookie(valor).values():
+                    if cookie['max-age'] == '0':
+                        self.cookies.pop(cookie.key, None)
+                    else:
+                        self.cookies[cookie.key] = cookie.value
+        ubicacion = next((v for n, v in respuesta['cabeceras'] if n.lower() == 'location'), None)
+        return respuesta['estado'], contenido.decode('utf-8', 'replace'), ubicacion, _hilo.excepcion
+
+
+class _SinRedirecciones(urlrequest.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class ClienteHTTP:
+    """El mismo navegador mínimo contra un servidor (gunicorn/runserver)."""
+
+    def __init__(self, base):
+        self.base = base.rstrip('/')
+        self.opener = urlrequest.build_opener(urlrequest.HTTPCookieProcessor(), _SinRedirecciones())
+
+    def pedir(self, metodo, ruta, datos=None):
+        cuerpo = urlencode(datos).encode() if metodo == 'POST' else None
+        try:
+            with self.opener.open(urlrequest.Request(self.base + ruta, data=cuerpo, method=metodo), timeout=60) as r:
+                return r.status, r.read().decode('utf-8', 'replace'), None, None
+        except urlerror.HTTPError as e:
+            return e.code, e.read().decode('utf-8', 'replace'), e.headers.get('Location'), None
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga con cajas simuladas: cada caja inicia sesión, abre la "
+        "pantalla de venta, registra canastas y a veces abre reportes. Reporta "
+        "throughput, percentiles de latencia por endpoint y errores. Registra "
+        "ventas reales: usar contra una base de prueba."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuario", required=True)
+        parser.add_argument("--password", required=True)
+        parser.add_argument("--cajas", type=int, default=8)
+        parser.add_argument("--segundos", type=float, default=30)
+        parser.add_argument("--items", type=float, default=4, help="Productos por canasta (media)")
+        parser.add_argument("--reportes", type=float, default=0.1, help="Probabilidad de abrir reportes tras una venta")
+        parser.add_argument("--pausa", type=float, default=0, help="Segundos entre acciones de una caja")
+        parser.add_argument("--url", help="Servidor a probar (p. ej. http://127.0.0.1:8000); sin él, en proceso")
+        parser.add_argument("--semilla", type=int)
+        parser.add_argument("--confirmar", action="store_true", help="Necesario con DEBUG=False")
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["confirmar"]:
+            raise CommandError("bench_cajas registra ventas reales: usar una base de prueba y pasar --confirmar")
+        productos = list(Producto.objects.filter(activo=True).values_list('id', 'clase_abc'))
+        if not productos:
+            raise CommandError("No hay productos activos")
+        sucursales = list(Sucursal.objects.filter(activa=True).values_list('id', flat=True))
+        rng = random.Random(options["semilla"])
+
+        if options["url"]:
+            def nuevo_cliente():
+                return ClienteHTTP(options["url"])
+            destino = options["url"]
+        else:
+            from config.wsgi import application
+
+            host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h and h != '*'), 'localhost')
+
+            def nuevo_cliente():
+                return ClienteWSGI(application, host)
+            destino = "en proceso (WSGI)"
+            got_request_exception.connect(_excepcion_del_request, weak=False)
+
+        latencias = defaultdict(list)
+        errores = Counter()
+        ventas = []
+        lock = threading.Lock()
+        fin = time.monotonic() + options["segundos"]
+
+        semillas = [rng.random() for _ in range(options["cajas"])]
+
+        def caja(numero):
+            propias, fallas = defaultdict(list), Counter()
+            registradas = 0
+            try:
+                registradas = self._caja(
+                    nuevo_cliente(), options, random.Random(semillas[numero]), productos,
+                    sucursales[numero % len(sucursales)] if sucursales else None,
+                    fin, propias, fallas,
+                )
+            except Exception as e:
+                fallas[f"caja caída ({type(e).__name__})"] += 1
+            with lock:
+                for nombre, valores in propias.items():
+                    latencias[nombre].extend(valores)
+                errores.update(fallas)
+                ventas.append(registradas)
+
+        hilos = [threading.Thread(target=caja, args=(n,)) for n in range(options["cajas"])]
+        inicio = time.monotonic()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.monotonic() - inicio
+        got_request_exception.disconnect(_excepcion_del_request)
+
+        self._informe(options, destino, duracion, sum(ventas), latencias, errores)
+
+    def _caja(self, cliente, options, rng, productos, sucursal_id, fin, latencias, errores):
+        def medir(nombre, metodo, ruta, datos=None):
+            inicio = time.perf_counter()
+            estado, html, ubicacion, excepcion = cliente.pedir(metodo, ruta, datos)
+            latencias[nombre].append(time.perf_counter() - inicio)
+            if estado >= 500:
+                texto = (excepcion or '').lower()
+                errores['bloqueo de la base' if 'lock' in texto or 'deadlock' in texto else f"{nombre}: HTTP {estado}"] += 1
+            return estado, html, ubicacion
+
+        def token(html):
+            encontrado = _CSRF.search(html)
+            return encontrado.group(1) if encontrado else ''
+
+        _, html, _ = medir('login (GET)', 'GET', '/accounts/login/')
+        estado, _, _ = medir('login (POST)', 'POST', '/accounts/login/', {
+            'username': options["usuario"], 'password': options["password"], 'csrfmiddlewaretoken': token(html),
+        })
+        if estado != 302:
+            errores['login fallido'] += 1
+            return 0
+
+        ventas = 0
+        ids = [p[0] for p in productos]
+        pesos = [PESOS_ABC.get(p[1], 1) for p in productos]
+        while time.monotonic() < fin:
+            estado, html, _ = medir('pantalla de venta', 'GET', '/ventas/nueva/')
+            if estado != 200:
+                continue
+
+            tamano = min(len(ids), 1 + int(rng.expovariate(1 / max(options["items"] - 1, 0.01))))
+            canasta = set()
+            while len(canasta) < tamano:
+                canasta.add(rng.choices(ids, weights=pesos)[0])
+            datos = {
+                'csrfmiddlewaretoken': token(html),
+                'metodo_pago': rng.choice(METODOS_PAGO),
+                'form-TOTAL_FORMS': len(canasta), 'form-INITIAL_FORMS': 0,
+                'form-MIN_NUM_FORMS': 0, 'form-MAX_NUM_FORMS': 1000,
+            }
+            if sucursal_id:
+                datos['sucursal'] = sucursal_id
+            for i, producto_id in enumerate(canasta):
+                datos[f'form-{i}-producto'] = producto_id
+                datos[f'form-{i}-cantidad'] = rng.choices(*CANTIDADES)[0]
+
+            estado, html, ubicacion = medir('registrar venta', 'POST', '/ventas/nueva/', datos)
+            if estado == 302 and ubicacion:
+                ventas += 1
+                # Como el navegador: sigue la redirección al detalle
+                medir('detalle de venta', 'GET', urlsplit(ubicacion).path)
+            elif estado == 200:
+                if 'No hay stock suficiente' in html:
+                    # Pasó la validación pero otra caja se llevó el stock antes del UPDATE
+                    errores['conflicto de stock'] += 1
+                elif 'Stock insuficiente' in html:
+                    errores['sin stock'] += 1
+                else:
+                    errores['venta rechazada (formulario)'] += 1
+
+            if rng.random() < options["reportes"]:
+                medir('reporte de ventas', 'GET', '/reportes/ventas/')
+            if options["pausa"]:
+                time.sleep(options["pausa"])
+        return ventas
+
+    def _informe(self, options, destino, duracion, ventas, latencias, errores):
+        requests = sum(len(v) for v in latencias.values())
+        self.stdout.write(f"{options['cajas']} cajas, {duracion:.1f} s, {destino}")
+        self.stdout.write(
+            f"Ventas registradas: {ventas} ({ventas / duracion:.1f}/s), "
+            f"requests: {requests} ({requests / duracion:.1f}/s)"
+        )
+        self.stdout.write(f"{'endpoint':<20} {'n':>7} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)")
+        for nombre, valores in sorted(latencias.items()):
+            p50, p95, p99 = np.percentile(np.array(valores) * 1000, [50, 95, 99])
+            self.stdout.write(f"{nombre:<20} {len(valores):>7} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f}")
+        if errores:
+            self.stdout.write("Errores: " + ", ".join(f"{tipo} {n}" for tipo, n in errores.most_common()))
+        else:
+            self.stdout.write("Errores: ninguno")
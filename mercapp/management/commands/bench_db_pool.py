@@ -0,0 +1,87 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core import signals
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from mercapp.models import Producto
+
+# Configuraciones comparadas: variables de entorno para el proceso hijo
+PERFILES = {
+    "sin_persistencia": {"DB_POOL": "False", "DB_CONN_MAX_AGE": "0"},
+    "persistente": {"DB_POOL": "False", "DB_CONN_MAX_AGE": "600"},
+    "pool": {"DB_POOL": "True"},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga contra PostgreSQL local: compara conexiones sin "
+        "persistencia, persistentes y con pool (requiere DATABASE_URL)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=16)
+        parser.add_argument("--segundos", type=float, default=10)
+        parser.add_argument("--perfil", choices=sorted(PERFILES), help=(
+            "Ejecuta un solo perfil en este proceso e imprime JSON (uso interno)"
+        ))
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("bench_db_pool necesita DATABASE_URL apuntando a PostgreSQL")
+        if options["perfil"]:
+            resultado = self._medir(options["hilos"], options["segundos"])
+            self.stdout.write(json.dumps(resultado))
+            return
+
+        self.stdout.write(f"{options['hilos']} hilos, {options['segundos']} s por perfil")
+        for nombre, entorno in PERFILES.items():
+            # Cada perfil corre en su propio proceso: los settings se leen al arrancar
+            salida = subprocess.run(
+                [sys.executable, os.path.join(settings.BASE_DIR, "manage.py"), "bench_db_pool",
+                 "--perfil", nombre, "--hilos", str(options["hilos"]),
+                 "--segundos", str(options["segundos"])],
+                env={**os.environ, **entorno}, capture_output=True, text=True, check=True,
+            )
+            r = json.loads(salida.stdout.strip().splitlines()[-1])
+            self.stdout.write(
+                f"{nombre:>17}: {r['requests'] / r['segundos']:8.0f} req/s, "
+                f"errores: {r['errores']}"
+            )
+
+    def _medir(self, hilos, segundos):
+        fin = time.monotonic() + segundos
+        contadores = {"requests": 0, "errores": 0}
+        lock = threading.Lock()
+
+        def till():
+            hechos = errores = 0
+            while time.monotonic() < fin:
+                # Reproduce el ciclo de vida de un request: request_started y
+                # request_finished son los que abren/cierran/devuelven conexiones
+                signals.request_started.send(sender=self.__class__)
+                try:
+                    Producto.objects.filter(activo=True).count()
+                    hechos += 1
+                except Exception:
+                    errores += 1
+                finally:
+                    signals.request_finished.send(sender=self.__class__)
+            with lock:
+                contadores["requests"] += hechos
+                contadores["errores"] += errores
+
+        threads = [threading.Thread(target=till) for _ in range(hilos)]
+        inicio = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return {**contadores, "segundos": time.monotonic() - inicio}
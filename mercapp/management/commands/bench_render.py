@@ -0,0 +1,80 @@
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.utils import timezone
+
+from mercapp.models import Producto, Venta
+from mercapp.templatetags.format_eu import format_euro
+
+
+class Command(BaseCommand):
+    help = "Mide el tiempo de render de las tablas de productos y ventas (sin base de datos)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=10000)
+        parser.add_argument("--repeticiones", type=int, default=3)
+
+    def _medir(self, funcion, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        return min(tiempos)
+
+    def handle(self, *args, **options):
+        filas = options["filas"]
+        repeticiones = options["repeticiones"]
+        ahora = timezone.now()
+
+        # Objetos en memoria: se mide sólo el render, no las consultas
+        productos = [
+            Producto(id=i, codigo=f"P{i:06d}", nombre=f"Producto {i}", categoria="General",
+                     precio=Decimal("1234.50") + i, stock=i % 50, stock_minimo=5)
+            for i in range(1, filas + 1)
+        ]
+        ventas = [
+            Venta(id=i, fecha=ahora, total=Decimal("98765.43") + i, metodo_pago="EFECTIVO")
+            for i in range(1, filas + 1)
+        ]
+        request = RequestFactory().get("/reportes/ventas/")
+
+        def render_productos():
+            return render_to_string("mercapp/lista_productos.html", {
+                "productos": productos, "version_productos": 1, "cache_timeout": 3600,
+            })
+
+        def render_reporte():
+            return render_to_string("mercapp/reporte_ventas.html", {
+                "ventas": ventas, "total_vendido": sum(v.total for v in ventas),
+                "stock_bajo": [], "top_productos": [],
+                "version_ventas": 1, "version_productos": 1, "alcance": "todas",
+                "cache_timeout": 3600,
+            }, request=request)
+
+        valores = [v.total for v in ventas]
+
+        def filtro():
+            for v in valores:
+                format_euro(v)
+
+        self.stdout.write(f"Filas: {filas}")
+        self.stdout.write(f"format_euro x{filas}: {self._medir(filtro, repeticiones) * 1000:.1f} ms")
+
+        for nombre, funcion in (("lista_productos", render_productos), ("reporte_ventas", render_reporte)):
+            def sin_cache():
+                cache.clear()
+                funcion()
+
+            frio = self._medir(sin_cache, repeticiones)
+            # Con el fragmento ya cacheado la tabla no se vuelve a renderizar
+            cacheado = self._medir(funcion, repeticiones)
+            cache.clear()
+            self.stdout.write(
+                f"{nombre}: sin caché {frio * 1000:.1f} ms, "
+                f"fragmento cacheado {cacheado * 1000:.1f} ms"
+            )
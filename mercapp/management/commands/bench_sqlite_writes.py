@@ -0,0 +1,142 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.test import Client
+
+from mercapp.models import Producto
+
+# Modos comparados: variables de entorno de cada base temporal
+MODOS = {
+    "defecto": {"SQLITE_TUNED": "False"},
+    "tuned": {"SQLITE_TUNED": "True"},
+}
+USUARIO = "bench_cajero"
+
+
+class Command(BaseCommand):
+    help = (
+        "Registra ventas desde varios procesos a la vez sobre SQLite y compara "
+        "errores y throughput entre la configuración por defecto y SQLITE_TUNED"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--procesos", type=int, default=8)
+        parser.add_argument("--ventas", type=int, default=50, help="Ventas por proceso")
+        parser.add_argument("--productos", type=int, default=200)
+        # Uso interno: fases ejecutadas en procesos hijos
+        parser.add_argument("--preparar", action="store_true", help="(interno) carga datos iniciales")
+        parser.add_argument("--caja", action="store_true", help="(interno) ejecuta un proceso de caja")
+        parser.add_argument("--inicio", type=float, help="(interno) instante común de arranque")
+
+    def handle(self, *args, **options):
+        if options["preparar"]:
+            return self._preparar(options["productos"])
+        if options["caja"]:
+            return self._caja(options["ventas"], options["inicio"])
+        if os.getenv("DATABASE_URL"):
+            raise CommandError("bench_sqlite_writes usa bases SQLite temporales: quita DATABASE_URL")
+
+        self.stdout.write(
+            f"{options['procesos']} procesos x {options['ventas']} ventas, "
+            f"{options['productos']} productos"
+        )
+        for modo, entorno in MODOS.items():
+            with tempfile.TemporaryDirectory() as tmp:
+                env = {
+                    **os.environ, **entorno,
+                    "SQLITE_PATH": os.path.join(tmp, "bench.sqlite3"),
+                    "SESSION_MODE": "signed_cookies",
+                    "ALLOWED_HOSTS": "testserver",
+                }
+                self._ejecutar(["migrate", "--noinput"], env)
+                self._ejecutar(["bench_sqlite_writes", "--preparar",
+                                "--productos", str(options["productos"])], env)
+
+                # Todas las cajas empiezan a vender a la vez, después de arrancar Django
+                inicio = time.time() + 3
+                cajas = [
+                    self._lanzar(["bench_sqlite_writes", "--caja", "--ventas", str(options["ventas"]),
+                                  "--inicio", str(inicio)], env)
+                    for _ in range(options["procesos"])
+                ]
+                resultados = [json.loads(c.communicate()[0].strip().splitlines()[-1]) for c in cajas]
+                duracion = max(r["fin"] for r in resultados) - inicio
+
+            total = {k: sum(r[k] for r in resultados) for k in ("ok", "bloqueos", "stock", "otros")}
+            self.stdout.write(
+                f"{modo:>8}: {total['ok'] / duracion:7.1f} ventas/s, "
+                f"ok {total['ok']}, database is locked {total['bloqueos']}, "
+                f"stock {total['stock']}, otros errores {total['otros']}"
+            )
+
+    def _comando(self, argumentos):
+        return [sys.executable, os.path.join(settings.BASE_DIR, "manage.py"), *argumentos]
+
+    def _ejecutar(self, argumentos, env):
+        subprocess.run(self._comando(argumentos), env=env, check=True, capture_output=True)
+
+    def _lanzar(self, argumentos, env):
+        return subprocess.Popen(self._comando(argumentos), env=env, stdout=subprocess.PIPE, text=True)
+
+    def _preparar(self, cantidad):
+        if connection.vendor != "sqlite":
+            raise CommandError("Sólo para SQLite")
+        User = get_user_model()
+        User.objects.create_superuser(USUARIO, "bench@example.com", "bench")
+        Producto.objects.bulk_create([
+            Producto(codigo=f"B{i:05d}", nombre=f"Producto bench {i}",
+                     precio=Decimal("990.00"), stock=10**9)
+            for i in range(cantidad)
+        ])
+
+    def _caja(self, ventas, inicio):
+        client = Client(raise_request_exception=True)
+        # force_login actualiza last_login: también puede chocar con otra caja
+        for _ in range(50):
+            try:
+                client.force_login(get_user_model().objects.get(username=USUARIO))
+                break
+            except OperationalError:
+                time.sleep(0.05)
+        ids = list(Producto.objects.values_list("id", flat=True))
+        resultado = {"ok": 0, "bloqueos": 0, "stock": 0, "otros": 0}
+        time.sleep(max(0, inicio - time.time()))
+
+        for _ in range(ventas):
+            lineas = random.sample(ids, random.randint(1, 6))
+            data = {
+                "metodo_pago": "EFECTIVO",
+                "form-TOTAL_FORMS": str(len(lineas)),
+                "form-INITIAL_FORMS": "0",
+            }
+            for i, producto_id in enumerate(lineas):
+                data[f"form-{i}-producto"] = str(producto_id)
+                data[f"form-{i}-cantidad"] = str(random.randint(1, 3))
+                data[f"form-{i}-precio_unitario"] = ""
+            try:
+                resp = client.post("/ventas/nueva/", data)
+            except OperationalError as e:
+                resultado["bloqueos" if "locked" in str(e) else "otros"] += 1
+                continue
+            except Exception:
+                resultado["otros"] += 1
+                continue
+            if resp.status_code == 302:
+                resultado["ok"] += 1
+            elif b"Stock insuficiente" in resp.content:
+                resultado["stock"] += 1
+            else:
+                resultado["otros"] += 1
+
+        resultado["fin"] = time.time()
+        self.stdout.write(json.dumps(resultado))
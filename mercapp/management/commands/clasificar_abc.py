@@ -0,0 +1,22 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mercapp import clasificacion_abc
+
+
+class Command(BaseCommand):
+    help = "Clasifica los productos en A/B/C según su participación en los ingresos (para cron nocturno)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=settings.ABC_VENTANA_DIAS,
+                            help="Ventana de ventas en días")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        clases = clasificacion_abc.actualizar(options["dias"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Clasificación ABC en {time.perf_counter() - inicio:.1f} s; "
+            f"A: {clases['A']}, B: {clases['B']}, C: {clases['C']}"
+        ))
@@ -1,11 +1,14 @@
 
 import os
-from django.core.management.base import BaseCommand
+import time
+from django.core.management.base import BaseCommand, CommandError
 from django.core.management import call_command
 from django.conf import settings
+from django.db import connection
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
+from mercapp import auditoria, respaldos
 from mercapp.models import Respaldo
 
 User = get_user_model()
@@ -18,6 +21,11 @@ class Command(BaseCommand):
         parser.add_argument("--usuario", type=str, required=True)
         parser.add_argument("--tipo", type=str, choices=["AUTOMATICO", "MANUAL"], default="MANUAL")
         parser.add_argument("--dir", type=str, default="backups")
+        parser.add_argument("--modo", choices=["json", "snapshot"], default="json",
+                            help="json: dumpdata de todos los modelos; snapshot: copia del archivo "
+                                 "SQLite con la API de backup en línea (comprimida y con checksum)")
+        parser.add_argument("--si-hay-cambios", action="store_true",
+                            help="No respalda si los datos no cambiaron desde el último respaldo")
 
     def handle(self, *args, **options):
         username = options["usuario"]
@@ -25,23 +33,43 @@ class Command(BaseCommand):
         backup_dir = options["dir"]
 
         usuario = User.objects.get(username=username)
+        if options["modo"] == "snapshot" and connection.vendor != "sqlite":
+            raise CommandError("--modo snapshot sólo está disponible con SQLite")
+
+        # Se calcula antes del volcado: un cambio durante el volcado fuerza
+        # un respaldo nuevo la próxima vez en lugar de perderse.
+        huella_actual = respaldos.huella()
+        if options["si_hay_cambios"] and respaldos.sin_cambios(huella_actual):
+            self.stdout.write("Sin cambios desde el último respaldo; se omite")
+            return
 
         base_dir = settings.BASE_DIR
         backup_path = os.path.join(base_dir, backup_dir)
         os.makedirs(backup_path, exist_ok=True)
 
         ahora = timezone.now()
-        filename = f"respaldo_{ahora.strftime('%Y%m%d_%H%M%S')}.json"
-        full_path = os.path.join(backup_path, filename)
-
-        with open(full_path, "w", encoding="utf-8") as f:
-            call_command("dumpdata", "--indent", "2", stdout=f)
+        # Con microsegundos: dos respaldos seguidos no deben pisarse el archivo
+        nombre = f"respaldo_{ahora.strftime('%Y%m%d_%H%M%S_%f')}"
+        checksum = ""
+        inicio = time.perf_counter()
+        if options["modo"] == "snapshot":
+            full_path = os.path.join(backup_path, nombre + respaldos.EXTENSION_SNAPSHOT)
+            checksum = respaldos.snapshot_sqlite(full_path)
+        else:
+            full_path = os.path.join(backup_path, nombre + ".json")
+            with open(full_path, "w", encoding="utf-8") as f:
+                call_command("dumpdata", "--indent", "2", stdout=f)
+        duracion = time.perf_counter() - inicio
 
-        Respaldo.objects.create(
+        respaldo = Respaldo.objects.create(
             fecha=ahora,
             tipo=tipo,
             ubicacion=os.path.relpath(full_path, base_dir),
             usuario=usuario,
+            huella=huella_actual,
+            checksum=checksum,
         )
+        auditoria.registrar("RESPALDO_CREADO", usuario, respaldo, f"{tipo}: {respaldo.ubicacion}")
+        auditoria.vaciar()
 
-        self.stdout.write(self.style.SUCCESS(f"Respaldo creado: {full_path}"))
+        self.stdout.write(self.style.SUCCESS(f"Respaldo creado: {full_path} ({duracion:.1f} s)"))
@@ -0,0 +1,25 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mercapp import pronostico
+
+
+class Command(BaseCommand):
+    help = "Calcula velocidad de venta, días hasta quiebre y cantidad a reponer de cada producto"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=365, help="Días de historial de ventas")
+        parser.add_argument("--plazo", type=int, default=settings.REPOSICION_PLAZO_DIAS,
+                            help="Días que tarda en llegar un pedido")
+        parser.add_argument("--cobertura", type=int, default=settings.REPOSICION_COBERTURA_DIAS,
+                            help="Días de venta a cubrir además del plazo")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        a_reponer = pronostico.actualizar(options["dias"], options["plazo"], options["cobertura"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Pronóstico actualizado en {time.perf_counter() - inicio:.1f} s; "
+            f"productos a reponer: {a_reponer}"
+        ))
@@ -0,0 +1,64 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from mercapp import auditoria, respaldos
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea respaldos AUTOMATICO cada cierto tiempo (omitiendo los que no tendrían "
+        "cambios) y rota los antiguos con política abuelo-padre-hijo"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cada", type=int, default=settings.RESPALDO_INTERVALO_MINUTOS,
+                            help="Minutos entre respaldos")
+        parser.add_argument("--usuario", type=str, default=settings.RESPALDO_USUARIO,
+                            help="Usuario al que se asignan los respaldos (por defecto, el primer superusuario)")
+        parser.add_argument("--diarios", type=int, default=settings.RESPALDO_DIARIOS)
+        parser.add_argument("--semanales", type=int, default=settings.RESPALDO_SEMANALES)
+        parser.add_argument("--mensuales", type=int, default=settings.RESPALDO_MENSUALES)
+        parser.add_argument("--dir", type=str, default="backups")
+        parser.add_argument("--modo", choices=["json", "snapshot"], default=settings.RESPALDO_MODO)
+        parser.add_argument("--una-vez", action="store_true", help="Un solo ciclo (para cron)")
+
+    def handle(self, *args, **options):
+        usuario = self._usuario(options["usuario"])
+        detener = threading.Event()
+        if not options["una_vez"]:
+            for sen in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sen, lambda *_: detener.set())
+            self.stdout.write(f"Respaldos automáticos cada {options['cada']} min")
+
+        while not detener.is_set():
+            call_command(
+                "crear_respaldo", usuario=usuario, tipo="AUTOMATICO", dir=options["dir"], modo=options["modo"],
+                si_hay_cambios=True, stdout=self.stdout,
+            )
+            borrados = respaldos.rotar(options["diarios"], options["semanales"], options["mensuales"])
+            for respaldo in borrados:
+                auditoria.registrar("RESPALDO_ELIMINADO", descripcion=f"Rotación: {respaldo.ubicacion}")
+            auditoria.vaciar()
+            if borrados:
+                self.stdout.write(f"Respaldos rotados: {len(borrados)}")
+            if options["una_vez"]:
+                break
+            close_old_connections()
+            detener.wait(options["cada"] * 60)
+
+    def _usuario(self, username):
+        User = get_user_model()
+        if username:
+            if not User.objects.filter(username=username).exists():
+                raise CommandError(f"No existe el usuario {username}")
+            return username
+        admin = User.objects.filter(is_superuser=True, is_active=True).order_by("id").first()
+        if admin is None:
+            raise CommandError("Indica --usuario: no hay superusuarios activos")
+        return admin.username
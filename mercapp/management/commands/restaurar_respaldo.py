@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from mercapp import respaldos
+from mercapp.models import Respaldo
+
+
+class Command(BaseCommand):
+    help = (
+        "Restaura un snapshot SQLite (crear_respaldo --modo snapshot) reemplazando el "
+        "archivo de la base. Detén la aplicación y los workers antes de ejecutarlo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("respaldo_id", type=int)
+        parser.add_argument("--confirmar", action="store_true",
+                            help="Necesario para reemplazar la base actual")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Sólo se pueden restaurar snapshots sobre SQLite")
+        try:
+            respaldo = Respaldo.objects.get(pk=options["respaldo_id"])
+        except Respaldo.DoesNotExist:
+            raise CommandError(f"No existe el respaldo {options['respaldo_id']}")
+
+        ruta_base = str(connection.settings_dict["NAME"])
+        self.stdout.write(f"Respaldo #{respaldo.pk} del {respaldo.fecha:%Y-%m-%d %H:%M} -> {ruta_base}")
+        if not options["confirmar"]:
+            raise CommandError("Agrega --confirmar para reemplazar la base actual")
+
+        try:
+            previa = respaldos.restaurar_snapshot(respaldo, ruta_base)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Base restaurada. La anterior quedó en {previa}"))
@@ -0,0 +1,60 @@
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from mercapp import tareas
+
+
+class Command(BaseCommand):
+    help = "Procesa la cola de tareas en segundo plano (respaldos, exportaciones, recálculos)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=2, help="Tareas simultáneas")
+        parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos entre consultas a la cola")
+        parser.add_argument("--huerfanas", type=int, default=10,
+                            help="Minutos sin latido tras los que una tarea en curso se da por fallida")
+        parser.add_argument("--una-vez", action="store_true", help="Procesa lo pendiente y termina")
+
+    def handle(self, *args, **options):
+        nombre = f"{socket.gethostname()}:{os.getpid()}"
+        recuperadas = tareas.recuperar_huerfanas(options["huerfanas"])
+        if recuperadas:
+            self.stdout.write(self.style.WARNING(f"Tareas huérfanas marcadas como fallidas: {recuperadas}"))
+
+        detener = threading.Event()
+        for sen in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sen, lambda *_: detener.set())
+
+        hilos = options["hilos"]
+        libres = threading.Semaphore(hilos)
+        self.stdout.write(f"Worker {nombre} con {hilos} hilos")
+
+        def correr(tarea):
+            try:
+                tareas.ejecutar(tarea)
+                self.stdout.write(f"Tarea #{tarea.pk} ({tarea.tipo}) terminada")
+            finally:
+                # Los hilos del pool no pasan por request_finished
+                close_old_connections()
+                libres.release()
+
+        with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="tarea") as pool:
+            while not detener.is_set():
+                libres.acquire()
+                tarea = tareas.reclamar(nombre)
+                if tarea is None:
+                    libres.release()
+                    if options["una_vez"]:
+                        break
+                    close_old_connections()
+                    detener.wait(options["intervalo"])
+                    continue
+                self.stdout.write(f"Tarea #{tarea.pk} ({tarea.tipo}) iniciada")
+                pool.submit(correr, tarea)
+            # Al salir del bloque se esperan las tareas en curso
+        self.stdout.write("Worker detenido")
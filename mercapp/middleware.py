@@ -0,0 +1,130 @@
+import random
+import re
+import uuid
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.utils.functional import SimpleLazyObject
+
+from . import perfilador
+from .auth_cache import obtener_usuario
+from .db_routers import COOKIE_PRIMARIA, replica_configurada
+from .logs import iniciar_request, terminar_request
+from .permissions import es_admin
+
+
+def _get_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = obtener_usuario(request)
+    return request._cached_user
+
+
+async def _aget_user(request):
+    if not hasattr(request, '_acached_user'):
+        request._acached_user = await sync_to_async(obtener_usuario)(request)
+    return request._acached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware que resuelve `request.user` desde la caché.
+
+    Se activa con AUTH_CACHE=True (ver settings); en un acierto de caché no
+    hay consultas a `auth_user` ni a `auth_group`.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: _get_user(request))
+        request.auser = partial(_aget_user, request)
+
+
+class PrimariaTrasEscrituraMiddleware:
+    """Tras un request que escribe, fija al usuario a la base primaria.
+
+    Mientras dure la cookie, `lectura_en_replica` no envía sus lecturas a la
+    réplica. Sin réplica configurada el middleware se desactiva.
+    """
+
+    def __init__(self, get_response):
+        if not replica_configurada():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_cookie(
+                COOKIE_PRIMARIA, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class PerfiladorMiddleware:
+    """Perfila una muestra de requests con cProfile (ver mercapp/perfilador.py).
+
+    Va después de la autenticación: la cabecera de perfilado sólo cuenta si
+    el usuario es administrador. Con PERFILADOR=False no se instala.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PERFILADOR:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        forzado = settings.PERFILADOR_CABECERA in request.headers and es_admin(request.user)
+        if forzado or random.random() < settings.PERFILADOR_MUESTREO:
+            return perfilador.perfilar(self.get_response, request, forzado)
+        return self.get_response(request)
+
+
+class SaludMiddleware:
+    """Responde SALUD_RUTA (/healthz) para los health checks del balanceador.
+
+    Va primero en MIDDLEWARE: no valida el host, no abre sesión, no pide
+    login ni toca la base; sólo dice que el proceso atiende requests.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path_info == settings.SALUD_RUTA:
+            response = HttpResponse('ok', content_type='text/plain')
+            response['Cache-Control'] = 'no-store'
+            return response
+        return self.get_response(request)
+
+
+class RequestIdMiddleware:
+    """Asigna un id a cada request para correlacionar sus líneas de log.
+
+    Respeta un X-Request-ID entrante (p. ej. del proxy) si tiene un formato
+    razonable y lo devuelve en la respuesta.
+    """
+
+    HEADER = 'X-Request-ID'
+    _VALIDO = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get(self.HEADER, '')
+        if not self._VALIDO.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        tokens = iniciar_request(request, request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            terminar_request(tokens)
+        response[self.HEADER] = request_id
+        return response
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mercapp', '0007_alter_detalleventa_options_alter_producto_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fecha', models.DateTimeField()),
+                ('total', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('metodo_pago', models.CharField(choices=[('EFECTIVO', 'Efectivo'), ('DEBITO', 'Débito'), ('CREDITO', 'Crédito'), ('TRANSFERENCIA', 'Transferencia')], max_length=20)),
+                ('anulada', models.BooleanField(default=False)),
+                ('motivo_anulacion', models.TextField(blank=True, null=True)),
+                ('fecha_anulacion', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archivada_en', models.DateTimeField(auto_now_add=True)),
+                ('anulada_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ventas_archivadas_anuladas', to=settings.AUTH_USER_MODEL)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ventas_archivadas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Venta archivada',
+                'verbose_name_plural': 'Ventas archivadas',
+                'ordering': ['-fecha'],
+                'default_permissions': ('view',),
+            },
+        ),
+        migrations.CreateModel(
+            name='DetalleVentaArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('cantidad', models.PositiveIntegerField()),
+                ('precio_unitario', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='detalles_archivados', to='mercapp.producto')),
+                ('venta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='detalles', to='mercapp.ventaarchivada')),
+            ],
+            options={
+                'verbose_name': 'Detalle de venta archivada',
+                'verbose_name_plural': 'Detalles de ventas archivadas',
+                'default_permissions': ('view',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ventaarchivada',
+            index=models.Index(fields=['fecha'], name='mercapp_ven_fecha_27bb4b_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:03
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mercapp', '0008_ventaarchivada_detalleventaarchivada_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('accion', models.CharField(choices=[('PRODUCTO_CREADO', 'Producto creado'), ('PRODUCTO_EDITADO', 'Producto editado'), ('PRODUCTO_ELIMINADO', 'Producto eliminado'), ('VENTA_REGISTRADA', 'Venta registrada'), ('VENTA_ANULADA', 'Venta anulada'), ('USUARIO_CREADO', 'Usuario creado'), ('USUARIO_ACTIVADO', 'Usuario activado'), ('USUARIO_DESACTIVADO', 'Usuario desactivado'), ('USUARIO_PASSWORD', 'Contraseña restablecida'), ('USUARIO_ELIMINADO', 'Usuario eliminado'), ('RESPALDO_CREADO', 'Respaldo creado')], max_length=30)),
+                ('usuario', models.CharField(blank=True, max_length=150)),
+                ('objeto_tipo', models.CharField(blank=True, max_length=50)),
+                ('objeto_id', models.CharField(blank=True, max_length=50)),
+                ('descripcion', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Evento de auditoría',
+                'verbose_name_plural': 'Eventos de auditoría',
+                'ordering': ['-fecha', '-id'],
+                'default_permissions': ('view',),
+                'indexes': [models.Index(fields=['-fecha', '-id'], name='mercapp_aud_fecha_b82118_idx'), models.Index(fields=['accion', '-fecha'], name='mercapp_aud_accion_bb83cb_idx'), models.Index(fields=['usuario', '-fecha'], name='mercapp_aud_usuario_1d84b4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mercapp', '0010_tarea'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='respaldo',
+            name='huella',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='auditevent',
+            name='accion',
+            field=models.CharField(choices=[('PRODUCTO_CREADO', 'Producto creado'), ('PRODUCTO_EDITADO', 'Producto editado'), ('PRODUCTO_ELIMINADO', 'Producto eliminado'), ('VENTA_REGISTRADA', 'Venta registrada'), ('VENTA_ANULADA', 'Venta anulada'), ('USUARIO_CREADO', 'Usuario creado'), ('USUARIO_ACTIVADO', 'Usuario activado'), ('USUARIO_DESACTIVADO', 'Usuario desactivado'), ('USUARIO_PASSWORD', 'Contraseña restablecida'), ('USUARIO_ELIMINADO', 'Usuario eliminado'), ('RESPALDO_CREADO', 'Respaldo creado'), ('RESPALDO_ELIMINADO', 'Respaldo eliminado')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mercapp', '0011_respaldo_huella_alter_auditevent_accion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='respaldo',
+            name='checksum',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
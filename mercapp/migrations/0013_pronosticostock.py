@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mercapp', '0012_respaldo_checksum'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PronosticoStock',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pronostico', serialize=False, to='mercapp.producto')),
+                ('velocidad', models.FloatField(help_text='Unidades por día')),
+                ('desviacion', models.FloatField(help_text='Desviación diaria de unidades')),
+                ('dias_hasta_quiebre', models.FloatField(blank=True, null=True)),
+                ('punto_reorden', models.PositiveIntegerField(default=0)),
+                ('cantidad_sugerida', models.PositiveIntegerField(default=0)),
+                ('calculado_en', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Pronóstico de stock',
+                'verbose_name_plural': 'Pronósticos de stock',
+                'default_permissions': ('view',),
+                'indexes': [models.Index(fields=['dias_hasta_quiebre'], name='mercapp_pro_dias_ha_ba9e63_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mercapp', '0013_pronosticostock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='clase_abc',
+            field=models.CharField(blank=True, choices=[('A', 'A'), ('B', 'B'), ('C', 'C')], editable=False, max_length=1),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='participacion_acumulada',
+            field=models.FloatField(blank=True, editable=False, help_text='Fracción acumulada de los ingresos hasta este producto (de mayor a menor)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['clase_abc'], name='mercapp_pro_clase_a_2390d1_idx'),
+        ),
+    ]
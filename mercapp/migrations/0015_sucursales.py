@@ -0,0 +1,112 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:28
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mercapp', '0014_producto_clase_abc'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sucursal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('direccion', models.CharField(blank=True, max_length=200)),
+                ('activa', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name': 'Sucursal',
+                'verbose_name_plural': 'Sucursales',
+                'ordering': ['nombre'],
+                'default_permissions': ('add', 'change', 'delete', 'view'),
+            },
+        ),
+        migrations.CreateModel(
+            name='Transferencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cantidad', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('nota', models.CharField(blank=True, max_length=200)),
+            ],
+            options={
+                'verbose_name': 'Transferencia de stock',
+                'verbose_name_plural': 'Transferencias de stock',
+                'ordering': ['-fecha'],
+                'default_permissions': ('add', 'view'),
+            },
+        ),
+        migrations.AlterField(
+            model_name='auditevent',
+            name='accion',
+            field=models.CharField(choices=[('PRODUCTO_CREADO', 'Producto creado'), ('PRODUCTO_EDITADO', 'Producto editado'), ('PRODUCTO_ELIMINADO', 'Producto eliminado'), ('VENTA_REGISTRADA', 'Venta registrada'), ('VENTA_ANULADA', 'Venta anulada'), ('USUARIO_CREADO', 'Usuario creado'), ('USUARIO_ACTIVADO', 'Usuario activado'), ('USUARIO_DESACTIVADO', 'Usuario desactivado'), ('USUARIO_PASSWORD', 'Contraseña restablecida'), ('USUARIO_ELIMINADO', 'Usuario eliminado'), ('RESPALDO_CREADO', 'Respaldo creado'), ('RESPALDO_ELIMINADO', 'Respaldo eliminado'), ('STOCK_TRANSFERIDO', 'Stock transferido')], max_length=30),
+        ),
+        migrations.CreateModel(
+            name='StockSucursal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)])),
+                ('stock_minimo', models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)])),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stocks', to='mercapp.producto')),
+                ('sucursal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stocks', to='mercapp.sucursal')),
+            ],
+            options={
+                'verbose_name': 'Stock por sucursal',
+                'verbose_name_plural': 'Stock por sucursal',
+                'default_permissions': ('add', 'change', 'delete', 'view'),
+            },
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='sucursal',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ventas', to='mercapp.sucursal'),
+        ),
+        migrations.AddField(
+            model_name='ventaarchivada',
+            name='sucursal',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ventas_archivadas', to='mercapp.sucursal'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['sucursal', 'fecha'], name='mercapp_ven_sucursa_f9f968_idx'),
+        ),
+        migrations.AddField(
+            model_name='transferencia',
+            name='destino',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='transferencias_entrada', to='mercapp.sucursal'),
+        ),
+        migrations.AddField(
+            model_name='transferencia',
+            name='origen',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='transferencias_salida', to='mercapp.sucursal'),
+        ),
+        migrations.AddField(
+            model_name='transferencia',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='transferencias', to='mercapp.producto'),
+        ),
+        migrations.AddField(
+            model_name='transferencia',
+            name='usuario',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transferencias', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='stocksucursal',
+            constraint=models.UniqueConstraint(fields=('sucursal', 'producto'), name='stock_sucursal_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='stocksucursal',
+            constraint=models.CheckConstraint(condition=models.Q(('cantidad__gte', 0)), name='stock_sucursal_no_negativo'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mercapp', '0015_sucursales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('vista', models.CharField(help_text='Nombre de la URL (o ruta de la vista)', max_length=200)),
+                ('ruta', models.CharField(max_length=500)),
+                ('metodo', models.CharField(max_length=10)),
+                ('estado', models.PositiveSmallIntegerField()),
+                ('duracion_ms', models.FloatField()),
+                ('usuario', models.CharField(blank=True, max_length=150)),
+                ('forzado', models.BooleanField(default=False, help_text='Pedido con la cabecera de perfilado')),
+                ('funciones', models.JSONField(default=list)),
+            ],
+            options={
+                'verbose_name': 'Perfil de request',
+                'verbose_name_plural': 'Perfiles de requests',
+                'ordering': ['-fecha', '-id'],
+                'default_permissions': ('view', 'delete'),
+                'indexes': [models.Index(fields=['fecha'], name='mercapp_per_fecha_349061_idx'), models.Index(fields=['vista', 'fecha'], name='mercapp_per_vista_cd310c_idx')],
+            },
+        ),
+    ]
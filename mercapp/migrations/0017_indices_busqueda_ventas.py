@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mercapp', '0016_perfiles_requests'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='detalleventa',
+            index=models.Index(fields=['producto', 'venta'], name='detalle_producto_venta_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='detalleventaarchivada',
+            index=models.Index(fields=['producto', 'venta'], name='detallearch_producto_venta_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha', 'id'], name='venta_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['usuario', 'fecha', 'id'], name='venta_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(condition=models.Q(('anulada', True)), fields=['fecha', 'id'], name='venta_anuladas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ventaarchivada',
+            index=models.Index(fields=['usuario', 'fecha'], name='ventaarch_usuario_fecha_idx'),
+        ),
+    ]
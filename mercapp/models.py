@@ -4,9 +4,12 @@ from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.db.models.functions import Coalesce
 from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 
+from .versiones import incrementar_al_confirmar
+
 User = get_user_model()
 
 
@@ -42,6 +45,18 @@ class Producto(TimestampedModel):
     stock = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     stock_minimo = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     activo = models.BooleanField(default=True)
+    # Clasificación ABC por ingresos (mercapp/clasificacion_abc.py). Vacía
+    # hasta la primera corrida del job.
+    CLASE_ABC_CHOICES = [
+        ('A', 'A'),
+        ('B', 'B'),
+        ('C', 'C'),
+    ]
+    clase_abc = models.CharField(max_length=1, choices=CLASE_ABC_CHOICES, blank=True, editable=False)
+    participacion_acumulada = models.FloatField(
+        null=True, blank=True, editable=False,
+        help_text="Fracción acumulada de los ingresos hasta este producto (de mayor a menor)",
+    )
 
     class Meta:
         ordering = ['nombre']
@@ -51,12 +66,189 @@ class Producto(TimestampedModel):
         indexes = [
             models.Index(fields=['codigo']),
             models.Index(fields=['nombre']),
+            models.Index(fields=['clase_abc']),
         ]
 
     def __str__(self):
         return f"{self.nombre} (stock: {self.stock})"
 
 
+# ---------------------------------------------------
+# SUCURSALES Y STOCK POR SUCURSAL
+# ---------------------------------------------------
+# Con sucursales, cada una lleva su propio stock y una venta descuenta sólo
+# la fila (sucursal, producto) de su tienda: dos tiendas nunca compiten por
+# la misma fila. Producto.stock queda como stock central (depósito), que es
+# el único stock en instalaciones sin sucursales.
+class Sucursal(TimestampedModel):
+    nombre = models.CharField(max_length=100, unique=True)
+    direccion = models.CharField(max_length=200, blank=True)
+    activa = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['nombre']
+        verbose_name = "Sucursal"
+        verbose_name_plural = "Sucursales"
+        default_permissions = ('add', 'change', 'delete', 'view')
+
+    def __str__(self):
+        return self.nombre
+
+
+class StockSucursal(models.Model):
+    sucursal = models.ForeignKey(Sucursal, on_delete=models.CASCADE, related_name="stocks")
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name="stocks")
+    cantidad = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+    stock_minimo = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+
+    class Meta:
+        verbose_name = "Stock por sucursal"
+        verbose_name_plural = "Stock por sucursal"
+        default_permissions = ('add', 'change', 'delete', 'view')
+        constraints = [
+            models.UniqueConstraint(fields=['sucursal', 'producto'], name='stock_sucursal_unico'),
+            models.CheckConstraint(condition=models.Q(cantidad__gte=0), name='stock_sucursal_no_negativo'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto.nombre} en {self.sucursal.nombre}: {self.cantidad}"
+
+
+def descontar_stock(producto, cantidad, sucursal_id=None):
+    """Descuenta stock con un UPDATE condicional, sin leer la fila antes.
+
+    Dos cajas que venden el mismo producto a la vez no pueden dejarlo en
+    negativo: la segunda no encuentra fila con stock suficiente y falla.
+    """
+    if sucursal_id:
+        filas = StockSucursal.objects.filter(
+            sucursal_id=sucursal_id, producto_id=producto.pk, cantidad__gte=cantidad,
+        ).update(cantidad=models.F('cantidad') - cantidad)
+    else:
+        filas = Producto.objects.filter(pk=producto.pk, stock__gte=cantidad).update(
+            stock=models.F('stock') - cantidad, updated_at=timezone.now(),
+        )
+    if not filas:
+        raise ValidationError(
+            f"No hay stock suficiente para {producto.nombre}. "
+            f"Stock actual: {stock_disponible(producto.pk, sucursal_id)}, solicitado: {cantidad}"
+        )
+    _stock_cambiado(sucursal_id)
+
+
+def reponer_stock(producto, cantidad, sucursal_id=None):
+    if sucursal_id:
+        stock, creado = StockSucursal.objects.get_or_create(
+            sucursal_id=sucursal_id, producto_id=producto.pk, defaults={'cantidad': cantidad},
+        )
+        if not creado:
+            StockSucursal.objects.filter(pk=stock.pk).update(cantidad=models.F('cantidad') + cantidad)
+    else:
+        Producto.objects.filter(pk=producto.pk).update(stock=models.F('stock') + cantidad, updated_at=timezone.now())
+    _stock_cambiado(sucursal_id)
+
+
+def stock_disponible(producto_id, sucursal_id=None):
+    if sucursal_id:
+        return (
+            StockSucursal.objects.filter(sucursal_id=sucursal_id, producto_id=producto_id)
+            .values_list('cantidad', flat=True).first() or 0
+        )
+    return Producto.objects.filter(pk=producto_id).values_list('stock', flat=True).first() or 0
+
+
+def _stock_cambiado(sucursal_id):
+    # El stock central se ve en el catálogo y en la lista de productos; el
+    # de sucursal sólo en los reportes de stock (versión 'stock').
+    incrementar_al_confirmar('stock')
+    if not sucursal_id:
+        incrementar_al_confirmar('productos')
+
+
+class Transferencia(models.Model):
+    """Movimiento de stock entre sucursales (sin origen/destino = depósito central)."""
+    fecha = models.DateTimeField(default=timezone.now)
+    producto = models.ForeignKey(Producto, on_delete=models.PROTECT, related_name="transferencias")
+    origen = models.ForeignKey(
+        Sucursal, on_delete=models.PROTECT, null=True, blank=True, related_name="transferencias_salida",
+    )
+    destino = models.ForeignKey(
+        Sucursal, on_delete=models.PROTECT, null=True, blank=True, related_name="transferencias_entrada",
+    )
+    cantidad = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="transferencias")
+    nota = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        ordering = ['-fecha']
+        verbose_name = "Transferencia de stock"
+        verbose_name_plural = "Transferencias de stock"
+        default_permissions = ('add', 'view')
+
+    def __str__(self):
+        origen = self.origen.nombre if self.origen else "Depósito"
+        destino = self.destino.nombre if self.destino else "Depósito"
+        return f"{self.producto.nombre} x {self.cantidad}: {origen} -> {destino}"
+
+
+def transferir_stock(producto, cantidad, origen=None, destino=None, usuario=None, nota=''):
+    """Mueve stock de `origen` a `destino` en una transacción y la registra."""
+    if origen == destino:
+        raise ValidationError("El origen y el destino deben ser distintos.")
+    with transaction.atomic():
+        descontar_stock(producto, cantidad, origen.pk if origen else None)
+        reponer_stock(producto, cantidad, destino.pk if destino else None)
+        return Transferencia.objects.create(
+            producto=producto, cantidad=cantidad, origen=origen, destino=destino, usuario=usuario, nota=nota,
+        )
+
+
+def stock_bajo(sucursal=None):
+    """Productos en o bajo su stock mínimo, de una sucursal o consolidado.
+
+    Cada fila trae `nombre`, `disponible` y `minimo`. Lo consolidado suma el
+    depósito y todas las sucursales contra el mínimo del producto.
+    """
+    if sucursal is not None:
+        return (
+            StockSucursal.objects.filter(sucursal=sucursal, producto__activo=True, cantidad__lte=models.F('stock_minimo'))
+            .annotate(nombre=models.F('producto__nombre'), disponible=models.F('cantidad'), minimo=models.F('stock_minimo'))
+            .order_by('nombre')
+        )
+    return (
+        Producto.objects.filter(activo=True)
+        .annotate(disponible=models.F('stock') + Coalesce(models.Sum('stocks__cantidad'), 0), minimo=models.F('stock_minimo'))
+        .filter(disponible__lte=models.F('minimo'))
+    )
+
+
+# ---------------------------------------------------
+# PRONÓSTICO DE STOCK
+# ---------------------------------------------------
+# Resultado del job de pronóstico (mercapp/pronostico.py). Tabla aparte para
+# que recalcularlo no toque Producto (ni su updated_at ni las versiones de
+# caché del catálogo).
+class PronosticoStock(models.Model):
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, primary_key=True, related_name="pronostico")
+    velocidad = models.FloatField(help_text="Unidades por día")
+    desviacion = models.FloatField(help_text="Desviación diaria de unidades")
+    dias_hasta_quiebre = models.FloatField(null=True, blank=True)
+    punto_reorden = models.PositiveIntegerField(default=0)
+    cantidad_sugerida = models.PositiveIntegerField(default=0)
+    calculado_en = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Pronóstico de stock"
+        verbose_name_plural = "Pronósticos de stock"
+        default_permissions = ('view',)
+        indexes = [
+            models.Index(fields=['dias_hasta_quiebre']),
+        ]
+
+    def __str__(self):
+        return f"{self.producto.nombre}: {self.cantidad_sugerida} sugeridas"
+
+
 # ---------------------------------------------------
 # VENTA
 # ---------------------------------------------------
@@ -72,6 +264,8 @@ class Venta(TimestampedModel):
     total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
     metodo_pago = models.CharField(max_length=20, choices=METODO_PAGO_CHOICES, default="EFECTIVO")
     usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="ventas")
+    # Sin sucursal la venta descuenta el stock central de Producto
+    sucursal = models.ForeignKey(Sucursal, on_delete=models.PROTECT, null=True, blank=True, related_name="ventas")
     anulada = models.BooleanField(default=False)
     motivo_anulacion = models.TextField(blank=True, null=True)
     anulada_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='ventas_anuladas')
@@ -88,6 +282,13 @@ class Venta(TimestampedModel):
             ("can_view_reports", "Can view advanced reports"),
             ("can_delete_sales", "Can delete or annul sales"),
         ]
+        indexes = [
+            models.Index(fields=['sucursal', 'fecha']),
+            # Búsqueda de ventas (mercapp/busqueda.py): orden y cursor (fecha, id)
+            models.Index(fields=['fecha', 'id'], name='venta_fecha_id_idx'),
+            models.Index(fields=['usuario', 'fecha', 'id'], name='venta_usuario_fecha_idx'),
+            models.Index(fields=['fecha', 'id'], condition=models.Q(anulada=True), name='venta_anuladas_idx'),
+        ]
 
     def __str__(self):
         return f"Venta #{self.id} - {self.fecha.date()}"
@@ -102,13 +303,7 @@ class Venta(TimestampedModel):
             return
         with transaction.atomic():
             for detalle in self.detalles.select_related('producto').all():
-                prod = detalle.producto
-                if prod.stock - detalle.cantidad < 0:
-                    raise ValidationError(
-                        f"Stock insuficiente para {prod.nombre}. Disponible: {prod.stock}, requerido: {detalle.cantidad}"
-                    )
-                prod.stock -= detalle.cantidad
-                prod.save()
+                descontar_stock(detalle.producto, detalle.cantidad, self.sucursal_id)
             self.stock_aplicado = True
             self.save(update_fields=['stock_aplicado'])
 
@@ -117,9 +312,7 @@ class Venta(TimestampedModel):
             return
         with transaction.atomic():
             for detalle in self.detalles.select_related('producto').all():
-                prod = detalle.producto
-                prod.stock += detalle.cantidad
-                prod.save()
+                reponer_stock(detalle.producto, detalle.cantidad, self.sucursal_id)
             self.stock_aplicado = False
             self.save(update_fields=['stock_aplicado'])
 
@@ -138,11 +331,15 @@ class DetalleVenta(models.Model):
         verbose_name = "Detalle de Venta"
         verbose_name_plural = "Detalles de Venta"
         default_permissions = ('add', 'change', 'delete', 'view')
+        indexes = [
+            # Ventas que contienen un producto, sin leer las líneas
+            models.Index(fields=['producto', 'venta'], name='detalle_producto_venta_idx'),
+        ]
 
     def clean(self):
-        if self.cantidad <= 0:
+        if self.cantidad is not None and self.cantidad <= 0:
             raise ValidationError("La cantidad debe ser mayor que 0.")
-        if self.precio_unitario < Decimal('0.00'):
+        if self.precio_unitario is not None and self.precio_unitario < Decimal('0.00'):
             raise ValidationError("El precio unitario no puede ser negativo.")
 
     def save(self, *args, **kwargs):
@@ -154,6 +351,63 @@ class DetalleVenta(models.Model):
         return f"{self.producto.nombre} x {self.cantidad} (venta {self.venta_id})"
 
 
+# ---------------------------------------------------
+# VENTAS ARCHIVADAS
+# ---------------------------------------------------
+# Copia de ventas antiguas movidas fuera de las tablas calientes por el
+# comando `archivar_ventas`. Conservan el id original para que los enlaces
+# a /ventas/<id>/ sigan funcionando.
+class VentaArchivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    fecha = models.DateTimeField()
+    total = models.DecimalField(max_digits=14, decimal_places=2)
+    metodo_pago = models.CharField(max_length=20, choices=Venta.METODO_PAGO_CHOICES)
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="ventas_archivadas")
+    sucursal = models.ForeignKey(
+        Sucursal, on_delete=models.PROTECT, null=True, blank=True, related_name="ventas_archivadas",
+    )
+    anulada = models.BooleanField(default=False)
+    motivo_anulacion = models.TextField(blank=True, null=True)
+    anulada_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='ventas_archivadas_anuladas')
+    fecha_anulacion = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archivada_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-fecha']
+        verbose_name = "Venta archivada"
+        verbose_name_plural = "Ventas archivadas"
+        default_permissions = ('view',)
+        indexes = [
+            models.Index(fields=['fecha']),
+            models.Index(fields=['usuario', 'fecha'], name='ventaarch_usuario_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"Venta #{self.id} (archivada) - {self.fecha.date()}"
+
+
+class DetalleVentaArchivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    venta = models.ForeignKey(VentaArchivada, on_delete=models.CASCADE, related_name="detalles")
+    producto = models.ForeignKey(Producto, on_delete=models.PROTECT, related_name="detalles_archivados")
+    cantidad = models.PositiveIntegerField()
+    precio_unitario = models.DecimalField(max_digits=12, decimal_places=2)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        verbose_name = "Detalle de venta archivada"
+        verbose_name_plural = "Detalles de ventas archivadas"
+        default_permissions = ('view',)
+        indexes = [
+            models.Index(fields=['producto', 'venta'], name='detallearch_producto_venta_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto.nombre} x {self.cantidad} (venta {self.venta_id})"
+
+
 # ---------------------------------------------------
 # RESPALDO
 # ---------------------------------------------------
@@ -168,6 +422,10 @@ class Respaldo(models.Model):
     ubicacion = models.FileField(upload_to='respaldos/', blank=True, null=True)
     archivo_path = models.CharField(max_length=1024, blank=True, null=True)
     usuario = models.ForeignKey(User, on_delete=models.PROTECT, related_name="respaldos")
+    # Huella de los datos respaldados (ver mercapp/respaldos.py)
+    huella = models.CharField(max_length=64, blank=True, default="")
+    # sha256 del archivo (snapshots SQLite), para verificarlo al restaurar
+    checksum = models.CharField(max_length=64, blank=True, default="")
 
     class Meta:
         verbose_name = "Respaldo"
@@ -182,6 +440,148 @@ class Respaldo(models.Model):
         return f"Respaldo {self.tipo} - {self.fecha}"
 
 
+# ---------------------------------------------------
+# AUDITORÍA
+# ---------------------------------------------------
+class AuditEvent(models.Model):
+    """Evento de auditoría. Se escribe por lotes (ver mercapp/auditoria.py).
+
+    Sin claves foráneas: el registro debe sobrevivir al borrado del usuario o
+    del objeto afectado, y no debe bloquear ese borrado.
+    """
+    ACCION_CHOICES = [
+        ("PRODUCTO_CREADO", "Producto creado"),
+        ("PRODUCTO_EDITADO", "Producto editado"),
+        ("PRODUCTO_ELIMINADO", "Producto eliminado"),
+        ("VENTA_REGISTRADA", "Venta registrada"),
+        ("VENTA_ANULADA", "Venta anulada"),
+        ("USUARIO_CREADO", "Usuario creado"),
+        ("USUARIO_ACTIVADO", "Usuario activado"),
+        ("USUARIO_DESACTIVADO", "Usuario desactivado"),
+        ("USUARIO_PASSWORD", "Contraseña restablecida"),
+        ("USUARIO_ELIMINADO", "Usuario eliminado"),
+        ("RESPALDO_CREADO", "Respaldo creado"),
+        ("RESPALDO_ELIMINADO", "Respaldo eliminado"),
+        ("STOCK_TRANSFERIDO", "Stock transferido"),
+    ]
+
+    fecha = models.DateTimeField(default=timezone.now)
+    accion = models.CharField(max_length=30, choices=ACCION_CHOICES)
+    usuario = models.CharField(max_length=150, blank=True)
+    objeto_tipo = models.CharField(max_length=50, blank=True)
+    objeto_id = models.CharField(max_length=50, blank=True)
+    descripcion = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = "Evento de auditoría"
+        verbose_name_plural = "Eventos de auditoría"
+        ordering = ["-fecha", "-id"]
+        default_permissions = ('view',)
+        indexes = [
+            models.Index(fields=["-fecha", "-id"]),
+            models.Index(fields=["accion", "-fecha"]),
+            models.Index(fields=["usuario", "-fecha"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_accion_display()} - {self.usuario} - {self.fecha}"
+
+
+# ---------------------------------------------------
+# TAREAS EN SEGUNDO PLANO
+# ---------------------------------------------------
+# Cola en base de datos que procesa el comando `worker_tareas` (ver
+# mercapp/tareas.py). No necesita broker externo.
+class Tarea(models.Model):
+    PENDIENTE = "PENDIENTE"
+    EN_CURSO = "EN_CURSO"
+    COMPLETADA = "COMPLETADA"
+    FALLIDA = "FALLIDA"
+    ESTADO_CHOICES = [
+        (PENDIENTE, "Pendiente"),
+        (EN_CURSO, "En curso"),
+        (COMPLETADA, "Completada"),
+        (FALLIDA, "Fallida"),
+    ]
+
+    tipo = models.CharField(max_length=50)
+    parametros = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=PENDIENTE)
+    progreso = models.PositiveSmallIntegerField(default=0)
+    mensaje = models.CharField(max_length=255, blank=True)
+    resultado = models.TextField(blank=True)
+    creada_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="tareas")
+    creada_en = models.DateTimeField(default=timezone.now)
+    iniciada_en = models.DateTimeField(null=True, blank=True)
+    actualizada_en = models.DateTimeField(null=True, blank=True)
+    terminada_en = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        verbose_name = "Tarea"
+        verbose_name_plural = "Tareas"
+        ordering = ["-creada_en", "-id"]
+        default_permissions = ('add', 'view')
+        indexes = [
+            models.Index(fields=["estado", "creada_en"]),
+        ]
+
+    def __str__(self):
+        return f"Tarea #{self.id} {self.tipo} ({self.estado})"
+
+    @property
+    def activa(self):
+        return self.estado in (self.PENDIENTE, self.EN_CURSO)
+
+
+# ---------------------------------------------------
+# PERFILES DE REQUESTS
+# ---------------------------------------------------
+# Requests perfilados por PerfiladorMiddleware (ver mercapp/perfilador.py).
+class PerfilRequest(models.Model):
+    fecha = models.DateTimeField(default=timezone.now)
+    vista = models.CharField(max_length=200, help_text="Nombre de la URL (o ruta de la vista)")
+    ruta = models.CharField(max_length=500)
+    metodo = models.CharField(max_length=10)
+    estado = models.PositiveSmallIntegerField()
+    duracion_ms = models.FloatField()
+    usuario = models.CharField(max_length=150, blank=True)
+    forzado = models.BooleanField(default=False, help_text="Pedido con la cabecera de perfilado")
+    # [[función, llamadas, tiempo propio ms, tiempo acumulado ms], ...] por tiempo propio
+    funciones = models.JSONField(default=list)
+
+    class Meta:
+        verbose_name = "Perfil de request"
+        verbose_name_plural = "Perfiles de requests"
+        ordering = ["-fecha", "-id"]
+        default_permissions = ('view', 'delete')
+        indexes = [
+            models.Index(fields=["fecha"]),
+            models.Index(fields=["vista", "fecha"]),
+        ]
+
+    def __str__(self):
+        return f"{self.metodo} {self.vista} {self.duracion_ms:.0f} ms ({self.fecha})"
+
+
+# ---------------------------------------------------
+# VERSIONES DE DATOS
+# ---------------------------------------------------
+# Contadores de mercapp/versiones.py cuando no hay caché compartida
+# (VERSIONES_EN_BASE): así los ven igual todos los procesos.
+class VersionDatos(models.Model):
+    nombre = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = "Versión de datos"
+        verbose_name_plural = "Versiones de datos"
+        default_permissions = ('view',)
+
+    def __str__(self):
+        return f"{self.nombre}: {self.version}"
+
+
 # ---------------------------------------------------
 # SEÑALES
 # ---------------------------------------------------
@@ -197,9 +597,7 @@ def detalleventa_post_delete(sender, instance, **kwargs):
     venta = instance.venta
     if venta.stock_aplicado:
         with transaction.atomic():
-            prod = instance.producto
-            prod.stock += instance.cantidad
-            prod.save()
+            reponer_stock(instance.producto, instance.cantidad, venta.sucursal_id)
             venta.stock_aplicado = False
             venta.save(update_fields=['stock_aplicado'])
 
@@ -0,0 +1,153 @@
+"""Perfilado bajo demanda de requests en producción.
+
+PerfiladorMiddleware corre cProfile sobre una fracción PERFILADOR_MUESTREO
+de los requests, y sobre todo request de un administrador que traiga la
+cabecera PERFILADOR_CABECERA. De cada perfil se guardan las
+PERFILADOR_FUNCIONES funciones con más tiempo propio en PerfilRequest, y la
+página de perfiles las agrega por vista en una ventana de tiempo.
+
+Con PERFILADOR=False el middleware ni se instala (MiddlewareNotUsed). Un
+solo request por proceso se perfila a la vez: cProfile no admite dos
+perfiles activos en hilos distintos en todas las versiones de Python, y así
+el costo queda acotado aunque el muestreo sea alto.
+"""
+import cProfile
+import logging
+import os
+import pstats
+import sysconfig
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Avg, Count, Max, Sum
+from django.utils import timezone
+
+from .models import PerfilRequest
+
+logger = logging.getLogger('mercapp')
+
+_ocupado = threading.Lock()
+_ultima_limpieza = 0.0
+# Prefijos que se quitan de las rutas de archivo para acortar los nombres
+_RAICES = tuple(
+    str(raiz) + os.sep
+    for raiz in (settings.BASE_DIR, sysconfig.get_paths()['purelib'], sysconfig.get_paths()['stdlib'])
+)
+
+
+def _nombre(clave):
+    archivo, linea, funcion = clave
+    if archivo == '~':
+        # Funciones built-in: '<method 'execute' of 'sqlite3.Cursor' objects>'
+        return funcion
+    for raiz in _RAICES:
+        if archivo.startswith(raiz):
+            archivo = archivo[len(raiz):]
+            break
+    return f"{funcion} ({archivo}:{linea})"
+
+
+def resumir(perfil, limite):
+    """[[función, llamadas, propio ms, acumulado ms], ...] de las `limite`
+    funciones con más tiempo propio."""
+    estadisticas = pstats.Stats(perfil).stats
+    filas = sorted(estadisticas.items(), key=lambda item: item[1][2], reverse=True)[:limite]
+    return [
+        [_nombre(clave), llamadas, round(propio * 1000, 3), round(acumulado * 1000, 3)]
+        for clave, (_, llamadas, propio, acumulado, _) in filas
+    ]
+
+
+def perfilar(get_response, request, forzado=False):
+    """Atiende el request bajo cProfile y guarda el perfil."""
+    if not _ocupado.acquire(blocking=False):
+        # Ya hay otro request perfilándose en este proceso
+        return get_response(request)
+    perfil = cProfile.Profile()
+    inicio = time.perf_counter()
+    try:
+        perfil.enable()
+        try:
+            response = get_response(request)
+        finally:
+            perfil.disable()
+    finally:
+        _ocupado.release()
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+
+    coincidencia = getattr(request, 'resolver_match', None)
+    usuario = getattr(request, 'user', None)
+    try:
+        registro = PerfilRequest.objects.create(
+            vista=(coincidencia.view_name if coincidencia else '')[:200] or '(sin vista)',
+            ruta=request.path[:500],
+            metodo=request.method,
+            estado=response.status_code,
+            duracion_ms=round(duracion_ms, 3),
+            usuario=getattr(usuario, 'username', '') or '',
+            forzado=forzado,
+            funciones=resumir(perfil, settings.PERFILADOR_FUNCIONES),
+        )
+        _limpiar()
+    except DatabaseError:
+        logger.exception("No se pudo guardar el perfil de %s", request.path)
+    else:
+        if forzado:
+            response['X-Perfil-Id'] = str(registro.pk)
+            response['Server-Timing'] = f'perfil;dur={duracion_ms:.1f}'
+    return response
+
+
+def _limpiar():
+    """Borra perfiles más viejos que PERFILADOR_RETENCION_DIAS, a lo sumo
+    una vez por hora en cada proceso."""
+    global _ultima_limpieza
+    ahora = time.monotonic()
+    if ahora - _ultima_limpieza < 3600:
+        return
+    _ultima_limpieza = ahora
+    limite = timezone.now() - timedelta(days=settings.PERFILADOR_RETENCION_DIAS)
+    PerfilRequest.objects.filter(fecha__lt=limite).delete()
+
+
+def por_vista(desde):
+    """Perfiles por vista desde `desde`: cantidad, duración media y máxima."""
+    return (
+        PerfilRequest.objects.filter(fecha__gte=desde)
+        .values('vista')
+        .annotate(cantidad=Count('id'), media=Avg('duracion_ms'), maxima=Max('duracion_ms'), total=Sum('duracion_ms'))
+        .order_by('-total')
+    )
+
+
+def funciones_calientes(vista, desde, limite=30, maximo_perfiles=500):
+    """Funciones con más tiempo propio sumado en los perfiles de `vista`.
+
+    Cada fila: función, perfiles en que aparece, llamadas, tiempo propio y
+    acumulado (ms) y la fracción del tiempo total de esos requests.
+    """
+    perfiles = list(
+        PerfilRequest.objects.filter(vista=vista, fecha__gte=desde)
+        .values_list('duracion_ms', 'funciones')[:maximo_perfiles]
+    )
+    total = sum(duracion for duracion, _ in perfiles) or 1
+    acumulado = defaultdict(lambda: [0, 0, 0.0, 0.0])
+    for _, funciones in perfiles:
+        for nombre, llamadas, propio, acum in funciones:
+            fila = acumulado[nombre]
+            fila[0] += 1
+            fila[1] += llamadas
+            fila[2] += propio
+            fila[3] += acum
+    filas = sorted(acumulado.items(), key=lambda item: item[1][2], reverse=True)[:limite]
+    return len(perfiles), [
+        {
+            'funcion': nombre, 'perfiles': n, 'llamadas': llamadas,
+            'propio_ms': propio, 'acumulado_ms': acum, 'fraccion': propio / total,
+        }
+        for nombre, (n, llamadas, propio, acum) in filas
+    ]
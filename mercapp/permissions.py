@@ -1,6 +1,20 @@
 from django.contrib.auth.models import Group
 
 
+def nombres_grupos(user):
+    """Nombres de los grupos del usuario, consultados una sola vez.
+
+    El resultado queda en la propia instancia, de modo que es_admin,
+    es_vendedor y el context processor comparten una consulta por request.
+    El middleware de autenticación cacheada lo guarda junto con el usuario.
+    """
+    grupos = getattr(user, '_mercapp_grupos', None)
+    if grupos is None:
+        grupos = frozenset(user.groups.values_list('name', flat=True))
+        user._mercapp_grupos = grupos
+    return grupos
+
+
 def es_admin(user):
     """Usuario administrador: se considera admin si es superuser o pertenece
     al grupo 'Administrador'. Esto permite gestionar administradores desde
@@ -10,7 +24,7 @@ def es_admin(user):
         return False
     if user.is_superuser:
         return True
-    return user.groups.filter(name='Administrador').exists()
+    return 'Administrador' in nombres_grupos(user)
 
 
 def es_vendedor(user):
@@ -21,4 +35,4 @@ def es_vendedor(user):
     """
     if not getattr(user, 'is_authenticated', False):
         return False
-    return user.groups.filter(name='Vendedor').exists()
+    return 'Vendedor' in nombres_grupos(user)
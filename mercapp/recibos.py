@@ -0,0 +1,133 @@
+"""Tickets de venta (HTML y PDF) renderizados una sola vez.
+
+Una venta registrada no cambia salvo al anularse, así que el ticket se
+renderiza la primera vez que se pide y se guarda en la caché bajo una clave
+que incluye su estado (vigente/anulada). Anular la venta cambia la clave;
+las señales borran además la versión anterior.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Venta, VentaArchivada
+from .templatetags.format_eu import format_euro
+
+FORMATOS = ('html', 'pdf')
+ANCHO_TICKET = 40
+
+
+def estado_venta(venta_id):
+    """'v' (vigente) o 'a' (anulada); None si la venta no existe.
+
+    Es la única consulta necesaria para responder un 304 o servir el ticket
+    desde la caché.
+    """
+    for modelo in (Venta, VentaArchivada):
+        anulada = modelo.objects.filter(pk=venta_id).values_list('anulada', flat=True).first()
+        if anulada is not None:
+            return _estado(anulada)
+    return None
+
+
+def estado_de(venta):
+    """Estado de una venta ya cargada (para armar la URL versionada)."""
+    return _estado(venta.anulada)
+
+
+def _estado(anulada):
+    return 'a' if anulada else 'v'
+
+
+def etag(venta_id, estado, formato):
+    return f'"recibo-{venta_id}-{estado}-{formato}"'
+
+
+def _clave(venta_id, estado, formato):
+    return f'mercapp:recibo:{venta_id}:{estado}:{formato}'
+
+
+def invalidar(venta_id):
+    cache.delete_many([_clave(venta_id, e, f) for e in ('v', 'a') for f in FORMATOS])
+
+
+def obtener(venta_id, estado, formato):
+    """Bytes del ticket, renderizándolo sólo si no está en caché."""
+    clave = _clave(venta_id, estado, formato)
+    contenido = cache.get(clave)
+    if contenido is None:
+        venta = Venta.objects.select_related('usuario').filter(pk=venta_id).first()
+        if venta is None:
+            venta = VentaArchivada.objects.select_related('usuario').get(pk=venta_id)
+        detalles = list(venta.detalles.select_related('producto'))
+        if formato == 'pdf':
+            contenido = _pdf(lineas_ticket(venta, detalles))
+        else:
+            contenido = render_to_string(
+                'mercapp/recibo.html', {'venta': venta, 'detalles': detalles}
+            ).encode()
+        cache.set(clave, contenido, settings.RECIBO_CACHE_TIMEOUT)
+    return contenido
+
+
+def lineas_ticket(venta, detalles):
+    """Texto del ticket en columnas fijas (para el PDF)."""
+    def fila(izquierda, derecha):
+        espacio = ANCHO_TICKET - len(derecha) - 1
+        return f"{izquierda[:espacio]:<{espacio}} {derecha}"
+
+    usuario = venta.usuario.username if venta.usuario else '(usuario eliminado)'
+    lineas = [
+        'MercApp'.center(ANCHO_TICKET),
+        f'Venta #{venta.id}'.center(ANCHO_TICKET),
+        '',
+        f"Fecha: {timezone.localtime(venta.fecha):%d/%m/%Y %H:%M}",
+        f"Vendedor: {usuario}",
+        f"Pago: {venta.get_metodo_pago_display()}",
+        '-' * ANCHO_TICKET,
+    ]
+    for d in detalles:
+        lineas.append(d.producto.nombre[:ANCHO_TICKET])
+        lineas.append(fila(f"  {d.cantidad} x ${format_euro(d.precio_unitario)}", f"${format_euro(d.subtotal)}"))
+    lineas += ['-' * ANCHO_TICKET, fila('TOTAL', f"${format_euro(venta.total)}")]
+    if venta.anulada:
+        lineas += ['', '*** VENTA ANULADA ***'.center(ANCHO_TICKET)]
+    return lineas
+
+
+def _pdf(lineas):
+    """PDF mínimo de una página con texto monoespaciado (sin dependencias)."""
+    alto_linea = 12
+    alto = max(200, 40 + alto_linea * len(lineas))
+    ancho = 300
+
+    def escapar(texto):
+        return texto.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+    texto = [f"BT /F1 9 Tf 20 {alto - 30} Td {alto_linea} TL"]
+    for linea in lineas:
+        texto.append(f"({escapar(linea)}) '")
+    texto.append("ET")
+    flujo = "\n".join(texto).encode('cp1252', errors='replace')
+
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {ancho} {alto}] "
+         f"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>").encode(),
+        b"<< /Length %d >>\nstream\n" % len(flujo) + flujo + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+    ]
+    salida = bytearray(b"%PDF-1.4\n")
+    posiciones = []
+    for numero, cuerpo in enumerate(objetos, start=1):
+        posiciones.append(len(salida))
+        salida += b"%d 0 obj\n" % numero + cuerpo + b"\nendobj\n"
+    inicio_xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for posicion in posiciones:
+        salida += b"%010d 00000 n \n" % posicion
+    salida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objetos) + 1, inicio_xref
+    )
+    return bytes(salida)
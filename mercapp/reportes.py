@@ -0,0 +1,225 @@
+"""Motor de reportes pivote de ventas.
+
+Cualquier combinación de dimensiones (período, método de pago, vendedor,
+categoría), con sus totales, se resuelve con una sola consulta agrupada
+sobre las líneas de venta vivas y archivadas (UNION ALL). Las ventas anuladas no cuentan. El
+resultado se guarda en caché por parámetros y versión de datos.
+"""
+import hashlib
+import json
+from collections import defaultdict
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, Count, DateTimeField, F, Sum, Value
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from .models import DetalleVenta, DetalleVentaArchivada
+from .versiones import obtener_versiones
+
+PERIODOS = {
+    'dia': TruncDay,
+    'semana': TruncWeek,
+    'mes': TruncMonth,
+}
+
+DIMENSIONES = {
+    'dia': 'Día',
+    'semana': 'Semana',
+    'mes': 'Mes',
+    'metodo_pago': 'Método de pago',
+    'vendedor': 'Vendedor',
+    'categoria': 'Categoría',
+}
+
+MEDIDAS = {
+    'importe': 'Importe',
+    'unidades': 'Unidades',
+    'ventas': 'N° de ventas',
+}
+
+# Medidas que no se pueden sumar entre celdas: una venta con productos de
+# dos categorías cuenta una vez en cada celda, pero una sola en el total
+NO_ADITIVAS = {'ventas'}
+
+CACHE_TIMEOUT = 24 * 3600
+
+
+def _expresiones(dimensiones):
+    """Expresión ORM de cada dimensión, relativa a la línea de venta."""
+    zona = ZoneInfo(settings.TIME_ZONE)
+    expresiones = {}
+    for dim in dimensiones:
+        if dim in PERIODOS:
+            # Día/semana/mes según el reloj de la tienda, no UTC
+            expresiones[dim] = PERIODOS[dim]('venta__fecha', tzinfo=zona)
+        elif dim == 'metodo_pago':
+            expresiones[dim] = F('venta__metodo_pago')
+        elif dim == 'vendedor':
+            expresiones[dim] = F('venta__usuario__username')
+        elif dim == 'categoria':
+            expresiones[dim] = F('producto__categoria')
+        else:
+            raise ValueError(f"Dimensión desconocida: {dim}")
+    return expresiones
+
+
+def _agrupado(modelo, nivel, dimensiones, todas, fecha_desde, fecha_hasta, usuario):
+    """Líneas de `modelo` agrupadas por `dimensiones`. Devuelve además las
+    demás de `todas` como NULL y el `nivel`, para que las agrupaciones de
+    una misma consulta tengan las mismas columnas."""
+    qs = modelo.objects.filter(venta__anulada=False)
+    if fecha_desde:
+        qs = qs.filter(venta__fecha__date__gte=fecha_desde)
+    if fecha_hasta:
+        qs = qs.filter(venta__fecha__date__lte=fecha_hasta)
+    if usuario is not None:
+        qs = qs.filter(venta__usuario=usuario)
+    expresiones = _expresiones(dimensiones)
+    columnas = {'nivel': Value(nivel)}
+    for dim in todas:
+        # Las constantes no entran en el GROUP BY
+        columnas[dim] = expresiones.get(dim) or Value(
+            None, output_field=DateTimeField() if dim in PERIODOS else CharField(),
+        )
+    return (
+        qs.order_by()
+        .values(**columnas)
+        .annotate(
+            importe=Sum('subtotal'),
+            unidades=Sum('cantidad'),
+            ventas=Count('venta', distinct=True),
+        )
+    )
+
+
+def consultar_niveles(niveles, fecha_desde=None, fecha_hasta=None, usuario=None):
+    """Celdas de varias agrupaciones: {nivel: lista de dicts con medidas}
+    para cada {nivel: dimensiones} de `niveles`.
+
+    Una sola consulta: cada agrupación, sobre ventas vivas y archivadas, es
+    una rama del mismo UNION ALL; las mitades se combinan en Python.
+    Cacheado por parámetros y versión de datos.
+    """
+    niveles = {nivel: list(dimensiones) for nivel, dimensiones in niveles.items()}
+    parametros = json.dumps(
+        [niveles, str(fecha_desde or ''), str(fecha_hasta or ''),
+         getattr(usuario, 'pk', None), *obtener_versiones('ventas', 'productos')]
+    )
+    clave = 'mercapp:pivot:' + hashlib.sha1(parametros.encode()).hexdigest()
+    resultado = cache.get(clave)
+    if resultado is not None:
+        return resultado
+
+    # El primer nivel tiene que agrupar por todas: sus columnas fijan los
+    # tipos (y las conversiones de fecha) de todo el resultado
+    todas = list(dict.fromkeys(d for dimensiones in niveles.values() for d in dimensiones))
+    ramas = [
+        _agrupado(modelo, nivel, dimensiones, todas, fecha_desde, fecha_hasta, usuario)
+        for nivel, dimensiones in niveles.items()
+        for modelo in (DetalleVenta, DetalleVentaArchivada)
+    ]
+    acumulado = {nivel: defaultdict(lambda: {'importe': 0, 'unidades': 0, 'ventas': 0}) for nivel in niveles}
+    for fila in ramas[0].union(*ramas[1:], all=True):
+        # Una venta está viva o archivada, nunca en las dos: sus conteos se suman
+        item = acumulado[fila['nivel']][tuple(fila[d] for d in niveles[fila['nivel']])]
+        for medida in MEDIDAS:
+            item[medida] += fila[medida] or 0
+    resultado = {
+        nivel: [
+            {**dict(zip(niveles[nivel], clave_celda)), **medidas}
+            for clave_celda, medidas in celdas.items()
+        ]
+        for nivel, celdas in acumulado.items()
+    }
+    cache.set(clave, resultado, CACHE_TIMEOUT)
+    return resultado
+
+
+def consultar(dimensiones, fecha_desde=None, fecha_hasta=None, usuario=None):
+    """Celdas agrupadas por `dimensiones`: lista de dicts con medidas."""
+    return consultar_niveles({'celdas': dimensiones}, fecha_desde, fecha_hasta, usuario)['celdas']
+
+
+def etiqueta(dimension, valor):
+    if valor is None or valor == '':
+        return '(sin dato)'
+    if dimension == 'dia':
+        return valor.strftime('%d/%m/%Y')
+    if dimension == 'semana':
+        return 'Semana del ' + valor.strftime('%d/%m/%Y')
+    if dimension == 'mes':
+        return valor.strftime('%m/%Y')
+    return str(valor)
+
+
+def _orden(valor):
+    # None al final; fechas y textos comparables entre sí dentro de su tipo
+    return (valor is None, valor if valor is not None else '')
+
+
+def pivote(filas, columna, medida='importe', fecha_desde=None, fecha_hasta=None, usuario=None):
+    """Consulta y arma la tabla pivote.
+
+    Para las medidas no aditivas los totales no salen de sumar celdas sino
+    de agruparlas otra vez: por las filas, por la columna y sin dimensiones.
+    Es lo que hace GROUPING SETS en PostgreSQL; SQLite no lo tiene, así que
+    las cuatro agrupaciones van como ramas de la misma consulta (ver
+    `consultar_niveles`): una ida a la base, cualquiera sea el tamaño de la
+    tabla.
+    """
+    filas = list(filas)
+    dimensiones = filas + ([columna] if columna else [])
+    if medida not in NO_ADITIVAS:
+        return pivotear(consultar(dimensiones, fecha_desde, fecha_hasta, usuario), filas, columna, medida)
+
+    niveles = {'celdas': dimensiones, 'filas': filas, 'total': []}
+    if columna:
+        niveles['columnas'] = [columna]
+    resultado = consultar_niveles(niveles, fecha_desde, fecha_hasta, usuario)
+
+    def por_clave(nivel):
+        return {tuple(c[d] for d in niveles[nivel]): c[medida] for c in resultado[nivel]}
+
+    totales = {
+        'filas': por_clave('filas'),
+        'columnas': {clave[0]: valor for clave, valor in por_clave('columnas').items()} if columna else {},
+        'total': por_clave('total').get((), 0),
+    }
+    return pivotear(resultado['celdas'], filas, columna, medida, totales)
+
+
+def pivotear(celdas, filas, columna, medida='importe', totales=None):
+    """Arma la tabla pivote: una fila por combinación de `filas`, una columna
+    por valor de `columna` (o sólo el total si `columna` es None).
+
+    `totales` ({'filas', 'columnas', 'total'}) reemplaza la suma de celdas
+    en los totales (ver `pivote`)."""
+    columnas = sorted({c[columna] for c in celdas}, key=_orden) if columna else []
+    tabla = defaultdict(lambda: defaultdict(int))
+    for c in celdas:
+        clave = tuple(c[d] for d in filas)
+        tabla[clave][c[columna] if columna else None] += c[medida]
+
+    resultado_filas = []
+    totales_columna = defaultdict(int)
+    for clave in sorted(tabla, key=lambda k: tuple(_orden(v) for v in k)):
+        valores = tabla[clave]
+        for col, valor in valores.items():
+            totales_columna[col] += valor
+        resultado_filas.append({
+            'etiquetas': [etiqueta(d, v) for d, v in zip(filas, clave)],
+            'celdas': [valores.get(col, 0) for col in columnas],
+            'total': totales['filas'].get(clave, 0) if totales else sum(valores.values()),
+        })
+    if totales:
+        totales_columna = totales['columnas']
+    return {
+        'encabezados_filas': [DIMENSIONES[d] for d in filas],
+        'columnas': [etiqueta(columna, v) for v in columnas],
+        'filas': resultado_filas,
+        'totales': [totales_columna.get(col, 0) for col in columnas],
+        'total': totales['total'] if totales else sum(totales_columna.values()),
+        'ancho': len(filas) + len(columnas) + 1,
+    }
@@ -0,0 +1,210 @@
+"""Respaldos: huella de datos, rotación abuelo-padre-hijo y snapshots SQLite.
+
+La huella resume el estado de las tablas de negocio con unos pocos
+agregados indexados (conteos, máximos de id y de updated_at) y, en las
+tablas chicas sin updated_at (usuarios, grupos, permisos, stock por
+sucursal), un hash de sus filas. Si coincide con la del último respaldo, no
+hace falta volcar la base otra vez.
+
+En SQLite el respaldo puede ser una copia del archivo hecha con la API de
+backup en línea (en un solo paso; con WAL las cajas siguen escribiendo),
+comprimida con gzip y con su sha256 guardado en el Respaldo para
+verificarla al restaurar.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db import connection
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import (
+    DetalleVenta, DetalleVentaArchivada, Producto, PronosticoStock, Respaldo, StockSucursal, Sucursal,
+    Transferencia, Venta, VentaArchivada,
+)
+
+
+def _hash_filas(qs, *campos):
+    """Hash de las filas de una tabla chica, en orden de clave primaria."""
+    h = hashlib.sha256()
+    for fila in qs.order_by('pk').values_list(*campos).iterator(chunk_size=2000):
+        h.update(repr(fila).encode())
+    return h.hexdigest()
+
+
+def huella():
+    """Hash del estado de productos, sucursales y su stock, pronósticos,
+    ventas (vivas y archivadas), usuarios, grupos y permisos."""
+    User = get_user_model()
+    partes = [
+        Producto.objects.aggregate(n=Count('id'), id=Max('id'), cambio=Max('updated_at')),
+        Venta.objects.aggregate(n=Count('id'), id=Max('id'), cambio=Max('updated_at')),
+        DetalleVenta.objects.aggregate(n=Count('id'), id=Max('id')),
+        VentaArchivada.objects.aggregate(n=Count('id'), id=Max('id')),
+        DetalleVentaArchivada.objects.aggregate(n=Count('id'), id=Max('id')),
+        Sucursal.objects.aggregate(n=Count('id'), id=Max('id'), cambio=Max('updated_at')),
+        _hash_filas(StockSucursal.objects, 'id', 'sucursal_id', 'producto_id', 'cantidad', 'stock_minimo'),
+        Transferencia.objects.aggregate(n=Count('id'), id=Max('id')),
+        PronosticoStock.objects.aggregate(n=Count('producto'), cambio=Max('calculado_en')),
+        # La contraseña (hash con sal) cambia con cada reseteo
+        _hash_filas(
+            User.objects, 'id', 'username', 'password', 'email', 'is_active', 'is_staff', 'is_superuser',
+            'last_login',
+        ),
+        _hash_filas(Group.objects, 'id', 'name'),
+        _hash_filas(User.groups.through.objects, 'user_id', 'group_id'),
+        _hash_filas(User.user_permissions.through.objects, 'user_id', 'permission_id'),
+        _hash_filas(Group.permissions.through.objects, 'group_id', 'permission_id'),
+        Permission.objects.aggregate(n=Count('id'), id=Max('id')),
+    ]
+    return hashlib.sha256(json.dumps(partes, default=str).encode()).hexdigest()
+
+
+def ruta_archivo(respaldo):
+    nombre = respaldo.ubicacion.name if respaldo.ubicacion else respaldo.archivo_path
+    if not nombre:
+        return None
+    return nombre if os.path.isabs(nombre) else os.path.join(settings.BASE_DIR, nombre)
+
+
+def sin_cambios(huella_actual):
+    """True si el último respaldo tiene esta huella y su archivo sigue ahí."""
+    ultimo = Respaldo.objects.exclude(huella='').order_by('-fecha').first()
+    if ultimo is None or ultimo.huella != huella_actual:
+        return False
+    ruta = ruta_archivo(ultimo)
+    return ruta is not None and os.path.exists(ruta)
+
+
+def a_conservar(respaldos, diarios, semanales, mensuales):
+    """Ids a conservar según la política abuelo-padre-hijo.
+
+    Se guarda el respaldo más reciente de cada uno de los últimos `diarios`
+    días, `semanales` semanas ISO y `mensuales` meses (hora local).
+    """
+    conservar = set()
+    for cantidad, periodo in (
+        (diarios, lambda f: f.date()),
+        (semanales, lambda f: f.isocalendar()[:2]),
+        (mensuales, lambda f: (f.year, f.month)),
+    ):
+        vistos = set()
+        for respaldo in sorted(respaldos, key=lambda r: r.fecha, reverse=True):
+            clave = periodo(timezone.localtime(respaldo.fecha))
+            if clave in vistos:
+                continue
+            if len(vistos) == cantidad:
+                break
+            vistos.add(clave)
+            conservar.add(respaldo.pk)
+    return conservar
+
+
+def rotar(diarios, semanales, mensuales):
+    """Borra archivo y fila de los respaldos automáticos que la política no
+    conserva. Los respaldos manuales no se tocan. Devuelve los borrados."""
+    automaticos = list(Respaldo.objects.filter(tipo='AUTOMATICO'))
+    conservar = a_conservar(automaticos, diarios, semanales, mensuales)
+    borrados = [r for r in automaticos if r.pk not in conservar]
+    for respaldo in borrados:
+        ruta = ruta_archivo(respaldo)
+        if ruta and os.path.exists(ruta):
+            os.remove(ruta)
+        respaldo.delete()
+    return borrados
+
+
+# ---------------------------------------------------
+# SNAPSHOT SQLITE
+# ---------------------------------------------------
+EXTENSION_SNAPSHOT = ".sqlite3.gz"
+_BLOQUE = 1024 * 1024
+
+
+def sha256_archivo(ruta):
+    resumen = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(_BLOQUE), b""):
+            resumen.update(bloque)
+    return resumen.hexdigest()
+
+
+def copiar_sqlite(origen, ruta):
+    """Copia la base abierta en `origen` (conexión sqlite3) al archivo `ruta`.
+
+    Todo en un paso, dentro de una sola transacción de lectura. Con WAL las
+    escrituras de las cajas siguen mientras tanto, van al log y la copia no
+    las ve. Copiar por tandas de páginas no sirve con cajas activas: cada
+    escritura de otra conexión reinicia la copia desde el principio, y con
+    ventas cada pocos segundos no terminaría nunca.
+    """
+    copia = sqlite3.connect(ruta)
+    try:
+        origen.backup(copia, pages=-1)
+    finally:
+        copia.close()
+
+
+def snapshot_sqlite(destino):
+    """Copia consistente de la base SQLite actual en `destino` (gzip).
+
+    Ver copiar_sqlite. Devuelve el sha256 del archivo comprimido.
+    """
+    if connection.vendor != "sqlite":
+        raise ValueError("El snapshot sólo está disponible con SQLite")
+    if connection.in_atomic_block:
+        # La copia esperaría para siempre a que se libere nuestra propia escritura
+        raise ValueError("El snapshot no puede hacerse dentro de una transacción")
+    temporal = destino + ".tmp"
+    connection.ensure_connection()
+    copiar_sqlite(connection.connection, temporal)
+    try:
+        with open(temporal, "rb") as origen, gzip.open(destino, "wb", compresslevel=6) as comprimido:
+            shutil.copyfileobj(origen, comprimido, _BLOQUE)
+    finally:
+        os.remove(temporal)
+    return sha256_archivo(destino)
+
+
+def restaurar_snapshot(respaldo, ruta_base):
+    """Reemplaza el archivo `ruta_base` por el snapshot de `respaldo`.
+
+    Verifica checksum e integridad antes de tocar la base actual, que se
+    conserva renombrada. Devuelve la ruta de esa copia previa.
+    """
+    ruta = ruta_archivo(respaldo)
+    if not ruta or not ruta.endswith(EXTENSION_SNAPSHOT):
+        raise ValueError("El respaldo no es un snapshot SQLite")
+    if not os.path.exists(ruta):
+        raise ValueError(f"No existe el archivo {ruta}")
+    if respaldo.checksum and sha256_archivo(ruta) != respaldo.checksum:
+        raise ValueError("El checksum del archivo no coincide: respaldo dañado")
+
+    temporal = ruta_base + ".restaurando"
+    with gzip.open(ruta, "rb") as comprimido, open(temporal, "wb") as salida:
+        shutil.copyfileobj(comprimido, salida, _BLOQUE)
+    prueba = sqlite3.connect(temporal)
+    try:
+        estado = prueba.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        prueba.close()
+    if estado != "ok":
+        os.remove(temporal)
+        raise ValueError(f"El snapshot no pasa integrity_check: {estado}")
+
+    connection.close()
+    previa = f"{ruta_base}.antes-{timezone.now():%Y%m%d_%H%M%S}"
+    if os.path.exists(ruta_base):
+        os.replace(ruta_base, previa)
+    for sufijo in ("-wal", "-shm"):
+        if os.path.exists(ruta_base + sufijo):
+            os.remove(ruta_base + sufijo)
+    os.replace(temporal, ruta_base)
+    return previa
@@ -1,9 +1,16 @@
 
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.dispatch import receiver
-from django.core.exceptions import ValidationError
 
-from .models import DetalleVenta
+from .models import Producto, Sucursal, Venta, DetalleVenta, descontar_stock
+from . import recibos
+from .auth_cache import invalidar_usuario
+from .versiones import incrementar_al_confirmar, incrementar_version
+
+User = get_user_model()
 
 
 @receiver(post_save, sender=DetalleVenta)
@@ -11,14 +18,78 @@ def actualizar_stock_y_total(sender, instance, created, **kwargs):
     if not created:
         return
 
-    producto = instance.producto
-    if producto.stock < instance.cantidad:
-        raise ValidationError(
-            f"No hay stock suficiente para {producto.nombre}. "
-            f"Stock actual: {producto.stock}, solicitado: {instance.cantidad}"
-        )
-
-    producto.stock -= instance.cantidad
-    producto.save()
+    # UPDATE condicional sobre la fila de la sucursal de la venta (o el stock
+    # central): falla con ValidationError si otra caja se llevó el stock.
+    descontar_stock(instance.producto, instance.cantidad, instance.venta.sucursal_id)
 
     instance.venta.recalcular_total()
+
+
+# ---------------------------------------------------
+# VERSIONES DE DATOS (invalidan fragmentos cacheados)
+# ---------------------------------------------------
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def producto_cambiado(sender, instance, **kwargs):
+    incrementar_al_confirmar('productos')
+    # El catálogo de la caja no incluye stock: las ventas no lo invalidan
+    incrementar_al_confirmar('catalogo')
+
+
+@receiver(post_save, sender=Sucursal)
+@receiver(post_delete, sender=Sucursal)
+def sucursal_cambiada(sender, instance, **kwargs):
+    # Las vistas de stock listan las sucursales
+    incrementar_al_confirmar('stock')
+
+
+@receiver(post_save, sender=Venta)
+@receiver(post_delete, sender=Venta)
+@receiver(post_save, sender=DetalleVenta)
+@receiver(post_delete, sender=DetalleVenta)
+def venta_cambiada(sender, instance, **kwargs):
+    incrementar_al_confirmar('ventas')
+
+
+@receiver(post_save, sender=Venta)
+def venta_anulada(sender, instance, **kwargs):
+    # El ticket vigente ya no vale; el anulado usa otra clave (ver recibos)
+    if instance.anulada:
+        transaction.on_commit(lambda: recibos.invalidar(instance.pk))
+
+
+# ---------------------------------------------------
+# USUARIO CACHEADO (ver auth_cache)
+# ---------------------------------------------------
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def usuario_cambiado(sender, instance, **kwargs):
+    # Cubre cambios de contraseña (resetear_password) y de is_active
+    # (toggle_usuario_activo), además de cualquier otra edición.
+    invalidar_usuario(instance.pk)
+    transaction.on_commit(lambda: invalidar_usuario(instance.pk))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def grupos_usuario_cambiados(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # Cambio desde el grupo: pk_set son usuarios (None en un clear)
+        if pk_set is None:
+            incrementar_version('auth')
+            return
+        user_ids = list(pk_set)
+    else:
+        instance.__dict__.pop('_mercapp_grupos', None)
+        user_ids = [instance.pk]
+    for user_id in user_ids:
+        invalidar_usuario(user_id)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+@receiver(post_delete, sender=Group)
+def permisos_grupo_cambiados(sender, **kwargs):
+    # Afecta a todos los miembros del grupo: se invalida la caché completa
+    incrementar_version('auth')
@@ -0,0 +1,312 @@
+// Pantalla de venta (registrar_venta.html). Los datos que dependen del
+// servidor llegan en atributos data-* del formulario.
+
+// El catálogo se resuelve en el servidor (caché en memoria por worker)
+const urlBuscarProducto = document.getElementById('venta-form').dataset.urlBuscar;
+
+async function buscarProducto(params){
+    try{
+        const resp = await fetch(urlBuscarProducto + '?' + new URLSearchParams(params), {credentials: 'same-origin'});
+        return resp.ok ? await resp.json() : null;
+    } catch(err){
+        console.error('Error buscando producto:', err);
+        return null;
+    }
+}
+
+function aplicarProducto(row, p, conservarPrecio){
+    const productHidden = row.querySelector('input[name$="-producto"]');
+    const priceInput = row.querySelector('input[name$="-precio_unitario"]');
+    const qtyInput = row.querySelector('input[name$="-cantidad"]');
+    const nombreInput = row.querySelector('.nombre-input');
+    row.dataset.precio = p.precio;
+    row.dataset.nombre = p.nombre;
+    if (productHidden) productHidden.value = p.id;
+    if (priceInput && !(conservarPrecio && priceInput.value)) priceInput.value = formatMoney(parseNumber(p.precio));
+    if (qtyInput && (!qtyInput.value || qtyInput.value=='0')) qtyInput.value = 1;
+    if (nombreInput) nombreInput.value = p.nombre;
+    updateSubtotalForRow(row); updateTotal();
+}
+
+function parseNumber(v){
+    if (v === null || v === undefined) return 0;
+    let s = String(v).trim();
+    if (!s) return 0;
+    // remove spaces
+    s = s.replace(/\s+/g, '');
+    // Heurística para distinguir separador de miles vs decimal:
+    const hasComma = s.indexOf(',') > -1;
+    const hasDot = s.indexOf('.') > -1;
+    if (hasComma && hasDot){
+        // ambos presentes: el separador que aparece más a la derecha suele ser el decimal
+        if (s.lastIndexOf(',') > s.lastIndexOf('.')){
+            // coma es decimal: eliminar puntos de miles y convertir coma a punto
+            s = s.replace(/\./g, '').replace(',', '.');
+        } else {
+            // punto es decimal: eliminar comas de miles (si las hubiera)
+            s = s.replace(/,/g, '');
+        }
+    } else if (hasComma){
+        // sólo coma presente: si los dígitos después de la coma son 3 -> probable separador de miles
+        const parts = s.split(',');
+        if (parts.length === 2 && parts[1].length === 3){
+            // ejemplo: 2,800 -> 2800
+            s = parts[0] + parts[1];
+        } else {
+            // tratar coma como decimal
+            s = s.replace(',', '.');
+        }
+    } else if (hasDot){
+        // sólo punto presente: si los dígitos después del punto son 3 -> probable separador de miles
+        const parts = s.split('.');
+        if (parts.length === 2 && parts[1].length === 3){
+            // ejemplo: 2.800 -> 2800
+            s = parts[0] + parts[1];
+        } else if ((s.match(/\./g) || []).length > 1){
+            // múltiples puntos => eliminarlos (p. ej. 1.234.567)
+            s = s.replace(/\./g, '');
+        }
+        // si sólo un punto y no es separador de miles, lo dejamos como decimal
+    }
+    const n = parseFloat(s);
+    return isNaN(n) ? 0 : n;
+}
+
+function formatMoney(n){
+    // format as integer with dot thousands separator, no decimals (European style requested)
+    const num = Math.round(Number(n) || 0);
+    return String(num).replace(/\B(?=(\d{3})+(?!\d))/g, '.');
+}
+
+function updateSubtotalForRow(row){
+    const productHidden = row.querySelector('[name$="-producto"]');
+    const qtyInput = row.querySelector('input[name$="-cantidad"]');
+    const priceInput = row.querySelector('input[name$="-precio_unitario"]');
+    const subtotalCell = row.querySelector('.subtotal-cell');
+    const nombreInput = row.querySelector('.nombre-input');
+
+    const productId = productHidden ? productHidden.value : null;
+    const price = priceInput && priceInput.value ? parseNumber(priceInput.value) : (productId ? parseNumber(row.dataset.precio||0) : 0);
+    const qty = qtyInput ? parseNumber(qtyInput.value) : 0;
+    const subtotal = price * qty;
+    if (subtotalCell) subtotalCell.textContent = formatMoney(subtotal);
+    // also ensure price input is filled when product selected
+    if (productId && priceInput && (!priceInput.value || priceInput.value=="0")){
+        priceInput.value = formatMoney(parseNumber(row.dataset.precio||0));
+    }
+    // set nombre field if available
+    if (productId && nombreInput){
+        nombreInput.value = row.dataset.nombre || '';
+    }
+    // also mark row validity
+    if (typeof validateRow === 'function') validateRow(row);
+}
+
+function updateTotal(){
+    const rows = document.querySelectorAll('#detalles-table tbody tr.detalle-row');
+    let total = 0;
+    rows.forEach(r=>{
+        const cell = r.querySelector('.subtotal-cell');
+        if (cell){ total += parseNumber(cell.textContent); }
+    });
+    document.getElementById('venta-total').textContent = formatMoney(total);
+    validateFormState();
+}
+
+function validateRow(row){
+    const productHidden = row.querySelector('input[name$="-producto"]');
+    const qtyInput = row.querySelector('input[name$="-cantidad"]');
+    const qv = qtyInput ? parseInt((qtyInput.value||'0').toString().replace(/[^0-9]/g,'')) : 0;
+    const valid = productHidden && productHidden.value && qv > 0;
+    if (valid){
+        row.classList.remove('row-invalid');
+    } else {
+        row.classList.add('row-invalid');
+    }
+    return valid;
+}
+
+function validateFormState(){
+    const rows = Array.from(document.querySelectorAll('#detalles-table tbody tr.detalle-row'));
+    let hasValid = false;
+    rows.forEach(function(r){ if (validateRow(r)) hasValid = true; });
+    const submitBtn = document.getElementById('submit-venta');
+    const help = document.getElementById('venta-form-help');
+    if (hasValid){
+        if (submitBtn) submitBtn.removeAttribute('disabled');
+        if (help) help.style.display = 'none';
+    } else {
+        if (submitBtn) submitBtn.setAttribute('disabled','disabled');
+        if (help) help.style.display = 'block';
+    }
+}
+
+            function bindRowEvents(row){
+                    const qtyInput = row.querySelector('input[name$="-cantidad"]');
+                    const priceInput = row.querySelector('input[name$="-precio_unitario"]');
+                    const removeBtn = row.querySelector('.remove-row');
+                    const codigoInput = row.querySelector('.codigo-input');
+                    const searchBtn = row.querySelector('.search-btn');
+                    const productHidden = row.querySelector('input[name$="-producto"]');
+
+                                    // ensure inputs have form-control + centered style to match codigo/nombre
+                                    if (qtyInput){ qtyInput.classList.add('form-control','text-center'); qtyInput.style.maxWidth = '120px'; }
+                                    if (priceInput){
+                                        // render price as text so browser locale doesn't reformat decimals with comma
+                                        try { priceInput.type = 'text'; } catch(e){}
+                                        priceInput.classList.add('form-control','text-center');
+                                        priceInput.style.maxWidth = '140px';
+                                    }
+
+    // bind codigo input (scanner enter)
+    if (codigoInput){
+        codigoInput.addEventListener('keydown', function(e){
+            if (e.key === 'Enter'){
+                e.preventDefault();
+                const code = codigoInput.value.trim();
+                if (code){
+                    buscarProducto({codigo: code}).then(function(p){ if (p) aplicarProducto(row, p); });
+                }
+            }
+        });
+    }
+
+    // bind search button: código/ID y, si no existe, búsqueda por nombre
+    if (searchBtn){
+        searchBtn.addEventListener('click', async function(){
+            const code = codigoInput ? codigoInput.value.trim() : '';
+            const p = code ? await buscarProducto({codigo: code}) : null;
+            if (p){
+                aplicarProducto(row, p);
+                return;
+            }
+            const q = prompt('Código no encontrado. Buscar por nombre (texto):');
+            if (!q) return;
+            const datos = await buscarProducto({q: q});
+            if (datos && datos.resultados.length){
+                aplicarProducto(row, datos.resultados[0]);
+            } else {
+                alert('No se encontró ningún producto con ese texto.');
+            }
+        });
+    }
+    if (qtyInput){
+        qtyInput.addEventListener('input', function(){ updateSubtotalForRow(row); updateTotal(); validateRow(row); });
+    }
+    if (priceInput){
+        priceInput.addEventListener('input', function(){ updateSubtotalForRow(row); updateTotal(); validateRow(row); });
+    }
+    if (removeBtn){
+        removeBtn.addEventListener('click', function(){
+            row.remove();
+            // update TOTAL_FORMS
+            const totalForms = document.querySelector('[name="form-TOTAL_FORMS"]');
+            if (totalForms){ totalForms.value = parseInt(totalForms.value)-1; }
+            updateTotal();
+        });
+    }
+    // initial compute; una fila devuelta con error trae sólo el id del producto
+    updateSubtotalForRow(row);
+    validateRow(row);
+    if (productHidden && productHidden.value && !row.dataset.nombre){
+        buscarProducto({id: productHidden.value}).then(function(p){ if (p) aplicarProducto(row, p, true); });
+    }
+}
+
+document.addEventListener('DOMContentLoaded', function(){
+    // bind existing rows
+    try{
+        document.querySelectorAll('#detalles-table tbody tr.detalle-row').forEach(bindRowEvents);
+
+        const addRowBtn = document.getElementById('add-row');
+        if (addRowBtn){
+            addRowBtn.addEventListener('click', function(){
+                const tmpl = document.getElementById('empty-form-template');
+                const clone = tmpl.content.cloneNode(true);
+                // replace __prefix__ in names/ids
+                const totalForms = document.querySelector('[name="form-TOTAL_FORMS"]');
+                let index = parseInt(totalForms.value || '0');
+                const html = clone.firstElementChild.outerHTML.replace(/__prefix__/g, index);
+                const wrapper = document.createElement('tbody');
+                wrapper.innerHTML = html;
+                const newRow = wrapper.querySelector('tr');
+                document.querySelector('#detalles-table tbody').appendChild(newRow);
+                // increment total forms
+                totalForms.value = index + 1;
+                bindRowEvents(newRow);
+                updateTotal();
+            });
+        }
+    } catch(err){
+        console.error('Error during setup of venta form JS:', err);
+    }
+
+    // initial total
+    updateTotal();
+    try{ validateFormState(); } catch(e){ console.error('validateFormState error', e); }
+
+    // normalize price inputs before submit so Django receives plain numeric values (e.g. 2300.00)
+    const theForm = document.getElementById('venta-form') || document.querySelector('form');
+    if (theForm){
+        theForm.addEventListener('submit', function(e){
+            try{
+                // Client-side validation: at least one detalle with producto and cantidad>0
+                const rows = Array.from(document.querySelectorAll('#detalles-table tbody tr.detalle-row'));
+                let hasValid = false;
+                rows.forEach(function(r){
+                    const prod = r.querySelector('input[name$="-producto"]');
+                    const qty = r.querySelector('input[name$="-cantidad"]');
+                    const qv = qty ? parseInt((qty.value||'0').replace(/[^0-9]/g,'')) : 0;
+                    if (prod && prod.value && qv > 0){ hasValid = true; }
+                });
+                if (!hasValid){
+                    alert('Debes agregar al menos un producto.');
+                    e.preventDefault();
+                    return;
+                }
+                // normalize price inputs robustly using parseNumber -> ensure we send numeric values
+                // We'll create hidden inputs with the normalized values and disable the visible inputs
+                // so the user still sees formatted prices (e.g. "2.300").
+                // Remove any previous normalized hidden inputs we created earlier
+                document.querySelectorAll('.normalized-price').forEach(function(el){ el.remove(); });
+                const theFormEl = theForm;
+                document.querySelectorAll('input[name$="-precio_unitario"]').forEach(function(inp){
+                    try{
+                        const n = parseNumber(inp.value);
+                        const normalized = Number(n).toFixed(2);
+                        // create hidden input with same name
+                        const hidden = document.createElement('input');
+                        hidden.type = 'hidden';
+                        hidden.name = inp.name;
+                        hidden.value = normalized;
+                        hidden.className = 'normalized-price';
+                        theFormEl.appendChild(hidden);
+                        // disable visible input so it won't be submitted
+                        inp.disabled = true;
+                    }catch(e){
+                        // create fallback hidden 0.00
+                        const hidden = document.createElement('input');
+                        hidden.type = 'hidden';
+                        hidden.name = inp.name;
+                        hidden.value = '0.00';
+                        hidden.className = 'normalized-price';
+                        theFormEl.appendChild(hidden);
+                        inp.disabled = true;
+                    }
+                });
+
+                // ensure cantidad inputs are integers
+                document.querySelectorAll('input[name$="-cantidad"]').forEach(function(inp){
+                    let v = inp.value || '0';
+                    v = v.replace(/[^0-9]/g, '');
+                    if (v === '') v = '0';
+                    inp.value = v;
+                });
+            } catch(err){
+                console.error('Error preparing form for submit:', err);
+                alert('Error al preparar la venta para guardar. Abre la consola del navegador y revisa errores.');
+                e.preventDefault();
+            }
+        });
+    }
+});
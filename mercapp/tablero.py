@@ -0,0 +1,144 @@
+"""Actualizaciones en vivo del tablero de inicio (Server-Sent Events).
+
+El estado del tablero (total del día, ventas del día y stock bajo) se
+calcula una vez por combinación de versiones de datos ('ventas', 'stock',
+'productos') y alcance, y se guarda en la caché: da igual cuántas pantallas
+estén abiertas, cada cambio cuesta una sola tanda de consultas. Cada
+conexión sólo compara versiones (lecturas de caché) y envía lo nuevo
+respecto de lo que el navegador ya tiene.
+
+Servido por ASGI el flujo queda abierto y empuja los cambios; bajo WSGI
+cada petición devuelve lo pendiente y EventSource se reconecta tras
+`retry`, con el mismo protocolo.
+"""
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Venta, stock_bajo
+from .templatetags.format_eu import format_euro
+from .versiones import obtener_versiones
+
+PREFIJO = 'mercapp:tablero:'
+
+
+def firma():
+    """Versiones de datos de las que depende el tablero."""
+    return '.'.join(str(version) for version in obtener_versiones('ventas', 'stock', 'productos'))
+
+
+def ventas_de_hoy(usuario_id=None):
+    ventas = Venta.objects.filter(fecha__date=timezone.localdate())
+    if usuario_id is not None:
+        ventas = ventas.filter(usuario_id=usuario_id)
+    return ventas
+
+
+def total_de_hoy(ventas):
+    return ventas.filter(anulada=False).aggregate(total=Sum('total'))['total'] or 0
+
+
+def _calcular(usuario_id, con_stock):
+    ventas = ventas_de_hoy(usuario_id)
+    filas = [
+        {
+            'id': v.id,
+            'fecha': timezone.localtime(v.fecha).strftime('%d/%m/%Y %H:%M'),
+            'usuario': v.usuario.username if v.usuario else None,
+            'total': format_euro(v.total),
+            'metodo_pago': v.metodo_pago,
+            'anulada': v.anulada,
+        }
+        for v in ventas.select_related('usuario').order_by('-id')
+    ]
+    datos = {
+        'total': format_euro(total_de_hoy(ventas)),
+        'cantidad': len(filas),
+        'ventas': filas,
+    }
+    if con_stock:
+        datos['stock_bajo'] = [
+            {'nombre': p.nombre, 'disponible': p.disponible, 'minimo': p.minimo} for p in stock_bajo()
+        ]
+    return datos
+
+
+def resumen(usuario_id=None, con_stock=False, firma_actual=None):
+    """Estado del tablero para un alcance (un vendedor o todas), cacheado por versión."""
+    firma_actual = firma_actual or firma()
+    clave = f"{PREFIJO}{firma_actual}:{usuario_id or 'todas'}:{int(con_stock)}"
+    datos = cache.get(clave)
+    if datos is None:
+        datos = _calcular(usuario_id, con_stock)
+        cache.set(clave, datos, settings.TABLERO_CACHE_TIMEOUT)
+    return datos
+
+
+def evento(usuario_id, con_stock, desde, firma_actual):
+    """Evento SSE con lo que cambió desde la venta `desde` (id) en adelante.
+
+    Las ventas nuevas van completas; de las ya mostradas sólo se informan
+    las anuladas para que la página las marque. Devuelve (texto, último id).
+    """
+    datos = resumen(usuario_id, con_stock, firma_actual)
+    ventas = datos['ventas']
+    cuerpo = {
+        'total': datos['total'],
+        'cantidad': datos['cantidad'],
+        'nuevas': [v for v in ventas if v['id'] > desde],
+        'anuladas': [v['id'] for v in ventas if v['anulada'] and v['id'] <= desde],
+    }
+    if con_stock:
+        cuerpo['stock_bajo'] = datos['stock_bajo']
+    ultimo = max([desde] + [v['id'] for v in ventas])
+    texto = (
+        f"id: {ultimo}:{firma_actual}\n"
+        f"event: tablero\n"
+        f"data: {json.dumps(cuerpo, separators=(',', ':'))}\n\n"
+    )
+    return texto, ultimo
+
+
+def leer_cursor(valor):
+    """(id de la última venta vista, firma) de un Last-Event-ID."""
+    ultimo, _, vista = (valor or '').partition(':')
+    try:
+        return int(ultimo), vista
+    except ValueError:
+        return 0, ''
+
+
+def pendiente(usuario_id, con_stock, cursor):
+    """Un evento si la firma cambió respecto del cursor; si no, sólo el retry."""
+    desde, vista = cursor
+    actual = firma()
+    reintento = f"retry: {settings.TABLERO_REINTENTO_MS}\n\n"
+    if actual == vista:
+        return reintento
+    return reintento + evento(usuario_id, con_stock, desde, actual)[0]
+
+
+async def flujo(usuario_id, con_stock, cursor):
+    """Generador SSE para ASGI: revisa las versiones cada TABLERO_INTERVALO
+    segundos, envía un comentario de vida cada 15 s y cierra tras
+    TABLERO_DURACION segundos (el navegador se reconecta solo)."""
+    desde, vista = cursor
+    yield f"retry: {settings.TABLERO_REINTENTO_MS}\n\n"
+    inicio = ultimo_envio = time.monotonic()
+    while time.monotonic() - inicio < settings.TABLERO_DURACION:
+        actual = await sync_to_async(firma)()
+        if actual != vista:
+            texto, desde = await sync_to_async(evento)(usuario_id, con_stock, desde, actual)
+            vista = actual
+            ultimo_envio = time.monotonic()
+            yield texto
+        elif time.monotonic() - ultimo_envio >= 15:
+            ultimo_envio = time.monotonic()
+            yield ": sigo aquí\n\n"
+        await asyncio.sleep(settings.TABLERO_INTERVALO)
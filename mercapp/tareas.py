@@ -0,0 +1,212 @@
+"""Tareas largas en segundo plano con cola en base de datos.
+
+Las vistas encolan con `encolar()`; el comando `worker_tareas` reclama
+tareas pendientes y las ejecuta en un pool de hilos, fuera de los workers
+web (que gunicorn mataría a los 120 s). El reclamo es un UPDATE condicional,
+así que varios workers pueden compartir la cola sin broker ni bloqueos.
+
+Cada tipo de tarea es una función registrada con `@registrar_tipo`; recibe
+la Tarea y un callback `progreso(porcentaje, mensaje)` y devuelve el texto
+del resultado.
+
+Mientras una tarea corre, un hilo de latido renueva su `actualizada_en`
+cada LATIDO_SEGUNDOS aunque la función no informe progreso: una tarea en
+curso sin latido reciente es la de un worker muerto.
+"""
+import csv
+import io
+import logging
+import os
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from . import clasificacion_abc, pronostico
+from .archivo import archivar_lote
+from .models import DetalleVenta, DetalleVentaArchivada, Tarea, Venta, VentaArchivada
+
+logger = logging.getLogger(__name__)
+
+TIPOS = {}
+
+# Segundos mínimos entre dos escrituras de progreso de una misma tarea
+INTERVALO_PROGRESO = 1.0
+# Segundos entre latidos de una tarea en curso (ver recuperar_huerfanas)
+LATIDO_SEGUNDOS = 30
+
+
+def registrar_tipo(nombre, descripcion):
+    def decorador(funcion):
+        TIPOS[nombre] = (descripcion, funcion)
+        return funcion
+    return decorador
+
+
+def encolar(tipo, usuario=None, **parametros):
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de tarea desconocido: {tipo}")
+    return Tarea.objects.create(tipo=tipo, parametros=parametros, creada_por=usuario)
+
+
+def reclamar(worker):
+    """Toma la tarea pendiente más antigua. None si no hay ninguna."""
+    while True:
+        candidata = (
+            Tarea.objects.filter(estado=Tarea.PENDIENTE)
+            .order_by("creada_en", "id")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if candidata is None:
+            return None
+        ahora = timezone.now()
+        tomada = Tarea.objects.filter(pk=candidata, estado=Tarea.PENDIENTE).update(
+            estado=Tarea.EN_CURSO, worker=worker, iniciada_en=ahora, actualizada_en=ahora,
+        )
+        if tomada:
+            return Tarea.objects.select_related("creada_por").get(pk=candidata)
+        # Otro worker la tomó primero: probar con la siguiente
+
+
+def recuperar_huerfanas(minutos):
+    """Marca como fallidas las tareas en curso sin latido hace `minutos`
+    (su worker murió). Devuelve cuántas.
+
+    `minutos` tiene que ser bastante mayor que LATIDO_SEGUNDOS.
+    """
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return Tarea.objects.filter(estado=Tarea.EN_CURSO, actualizada_en__lt=limite).update(
+        estado=Tarea.FALLIDA, mensaje="Worker interrumpido", terminada_en=timezone.now(),
+    )
+
+
+def _latir(tarea_id, detener):
+    try:
+        while not detener.wait(LATIDO_SEGUNDOS):
+            try:
+                Tarea.objects.filter(pk=tarea_id, estado=Tarea.EN_CURSO).update(actualizada_en=timezone.now())
+            except DatabaseError:
+                logger.exception("No se pudo registrar el latido de la tarea %s", tarea_id)
+    finally:
+        # Conexión propia de este hilo
+        connection.close()
+
+
+def ejecutar(tarea):
+    """Ejecuta una tarea ya reclamada y guarda su estado final."""
+    ultimo = [0.0]
+    fin_latido = threading.Event()
+    latido = threading.Thread(target=_latir, args=(tarea.pk, fin_latido), name=f"latido-{tarea.pk}", daemon=True)
+    latido.start()
+
+    def progreso(porcentaje, mensaje=""):
+        ahora = timezone.now()
+        if porcentaje < 100 and ahora.timestamp() - ultimo[0] < INTERVALO_PROGRESO:
+            return
+        ultimo[0] = ahora.timestamp()
+        Tarea.objects.filter(pk=tarea.pk).update(
+            progreso=max(0, min(100, int(porcentaje))), mensaje=mensaje[:255], actualizada_en=ahora,
+        )
+
+    try:
+        _descripcion, funcion = TIPOS[tarea.tipo]
+        try:
+            resultado = funcion(tarea, progreso)
+        finally:
+            fin_latido.set()
+            latido.join()
+    except Exception:
+        logger.exception("Tarea %s (%s) falló", tarea.pk, tarea.tipo)
+        Tarea.objects.filter(pk=tarea.pk).update(
+            estado=Tarea.FALLIDA, mensaje="Error", resultado=traceback.format_exc(),
+            actualizada_en=timezone.now(), terminada_en=timezone.now(),
+        )
+    else:
+        Tarea.objects.filter(pk=tarea.pk).update(
+            estado=Tarea.COMPLETADA, progreso=100, mensaje="Completada", resultado=resultado or "",
+            actualizada_en=timezone.now(), terminada_en=timezone.now(),
+        )
+
+
+# ---------------------------------------------------
+# TIPOS DE TAREA
+# ---------------------------------------------------
+@registrar_tipo("respaldo", "Respaldo de la base de datos")
+def tarea_respaldo(tarea, progreso):
+    if tarea.creada_por is None:
+        raise ValueError("El respaldo necesita un usuario")
+    progreso(10, "Volcando datos")
+    salida = io.StringIO()
+    call_command("crear_respaldo", usuario=tarea.creada_por.username, tipo="MANUAL", stdout=salida)
+    return salida.getvalue().strip()
+
+
+@registrar_tipo("exportar_ventas", "Exportar ventas a CSV")
+def tarea_exportar_ventas(tarea, progreso):
+    """Todas las líneas de venta (vivas y archivadas) en un CSV."""
+    os.makedirs(settings.EXPORTS_DIR, exist_ok=True)
+    ruta = os.path.join(settings.EXPORTS_DIR, f"ventas_{tarea.pk}_{timezone.now():%Y%m%d_%H%M%S}.csv")
+    campos = ("venta_id", "venta__fecha", "venta__metodo_pago", "venta__anulada",
+              "producto__codigo", "producto__nombre", "cantidad", "precio_unitario", "subtotal")
+    total = Venta.objects.count() + VentaArchivada.objects.count()
+    hechas = 0
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["venta", "fecha", "metodo_pago", "anulada", "codigo", "producto",
+                           "cantidad", "precio_unitario", "subtotal"])
+        for modelo in (DetalleVenta, DetalleVentaArchivada):
+            venta_anterior = None
+            for fila in modelo.objects.order_by("venta_id", "id").values_list(*campos).iterator(chunk_size=2000):
+                escritor.writerow(fila)
+                if fila[0] != venta_anterior:
+                    venta_anterior = fila[0]
+                    hechas += 1
+                    progreso(100 * hechas / max(total, 1), f"{hechas}/{total} ventas")
+    return ruta
+
+
+@registrar_tipo("archivar_ventas", "Archivar ventas antiguas")
+def tarea_archivar_ventas(tarea, progreso):
+    corte = timezone.now() - timedelta(days=int(tarea.parametros.get("dias", 730)))
+    pendientes = Venta.objects.filter(fecha__lt=corte).count()
+    movidas = 0
+    while True:
+        lote = archivar_lote(corte, 1000)
+        if not lote:
+            break
+        movidas += lote
+        progreso(100 * movidas / max(pendientes, 1), f"{movidas}/{pendientes} ventas")
+    return f"Ventas archivadas: {movidas}"
+
+
+@registrar_tipo("recalcular_totales", "Recalcular totales de ventas")
+def tarea_recalcular_totales(tarea, progreso):
+    """Recalcula Venta.total desde sus líneas y corrige las que difieren."""
+    total = Venta.objects.count()
+    corregidas = 0
+    ventas = Venta.objects.order_by("id").prefetch_related("detalles")
+    for hechas, venta in enumerate(ventas.iterator(chunk_size=500), start=1):
+        anterior = venta.total
+        if venta.recalcular_total() != anterior:
+            venta.save(update_fields=["total"])
+            corregidas += 1
+        progreso(100 * hechas / max(total, 1), f"{hechas}/{total} ventas")
+    return f"Ventas revisadas: {total}, corregidas: {corregidas}"
+
+
+@registrar_tipo("pronostico", "Pronóstico de reposición")
+def tarea_pronostico(tarea, progreso):
+    progreso(10, "Calculando")
+    return f"Productos a reponer: {pronostico.actualizar()}"
+
+
+@registrar_tipo("clasificar_abc", "Clasificación ABC de productos")
+def tarea_clasificar_abc(tarea, progreso):
+    progreso(10, "Calculando")
+    clases = clasificacion_abc.actualizar()
+    return f"A: {clases['A']}, B: {clases['B']}, C: {clases['C']}"
@@ -3,6 +3,7 @@ from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 
 register = template.Library()
 
+
 @register.filter(is_safe=True)
 def format_euro(value):
     """Format a number in European style: thousands separator '.' and no decimals.
@@ -11,19 +12,23 @@ def format_euro(value):
     - 2800.00 -> '2.800'
     - 1234567.89 -> '1.234.568' (rounded)
     If value cannot be converted, return it unchanged.
+
+    Ints and Decimals (what the ORM returns) skip the string -> Decimal
+    conversion; this filter runs once per cell on long tables.
     """
     if value is None:
         return ''
-    try:
-        d = Decimal(value)
-    except (InvalidOperation, TypeError, ValueError):
-        return value
-    # Round to nearest integer
-    d = d.quantize(Decimal('1'), rounding=ROUND_HALF_UP)
-    try:
-        n = int(d)
-    except (ValueError, OverflowError):
-        return str(d)
+    if type(value) is int:
+        n = value
+    else:
+        if not isinstance(value, Decimal):
+            try:
+                value = Decimal(value)
+            except (InvalidOperation, TypeError, ValueError):
+                return value
+        if not value.is_finite():
+            return str(value)
+        # Round to nearest integer
+        n = int(value.to_integral_value(rounding=ROUND_HALF_UP))
     # Use English thousands separator and replace comma with dot
-    s = f"{n:,}"
-    return s.replace(',', '.')
+    return f"{n:,}".replace(',', '.')
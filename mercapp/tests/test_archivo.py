@@ -0,0 +1,51 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from mercapp.archivo import top_productos_con_archivo
+from mercapp.models import DetalleVenta, DetalleVentaArchivada, Producto, Venta, VentaArchivada
+
+
+class ArchivarVentasTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(self.user)
+        self.producto = Producto.objects.create(codigo='A1', nombre='Arroz', precio=Decimal('1000'), stock=100)
+        hace_tres_anios = timezone.now() - timedelta(days=3 * 365)
+        for fecha in (hace_tres_anios, timezone.now()):
+            venta = Venta.objects.create(fecha=fecha, usuario=self.user)
+            DetalleVenta.objects.create(venta=venta, producto=self.producto, cantidad=2, precio_unitario=Decimal('1000'))
+        self.vieja = Venta.objects.order_by('fecha').first()
+
+    def test_mueve_ventas_antiguas_y_mantiene_reportes(self):
+        call_command('archivar_ventas', dias=365, lote=1, stdout=StringIO())
+
+        self.assertEqual(Venta.objects.count(), 1)
+        self.assertTrue(VentaArchivada.objects.filter(id=self.vieja.id, total=Decimal('2000')).exists())
+        self.assertEqual(DetalleVentaArchivada.objects.get().venta_id, self.vieja.id)
+        # Archivar no devuelve stock (sólo se descontó al vender)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 96)
+
+        resp = self.client.get('/reportes/ventas/')
+        self.assertEqual(resp.context['total_vendido'], Decimal('4000'))
+        self.assertContains(resp, 'Archivada')
+
+        resp = self.client.get(f'/ventas/{self.vieja.id}/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'Arroz')
+
+        top = top_productos_con_archivo()
+        self.assertEqual(top, [{'nombre': 'Arroz', 'cantidad_total': 4, 'ventas_total': Decimal('4000')}])
+
+    def test_archivadas_de_solo_lectura_en_el_admin(self):
+        call_command('archivar_ventas', dias=365, stdout=StringIO())
+        url = f'/admin/mercapp/ventaarchivada/{self.vieja.id}/'
+        self.assertEqual(self.client.get(url + 'change/').status_code, 200)
+        self.assertEqual(self.client.post(url + 'delete/', {'post': 'yes'}).status_code, 403)
+        self.assertTrue(VentaArchivada.objects.filter(id=self.vieja.id).exists())
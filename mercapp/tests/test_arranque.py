@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from mercapp import arranque
+
+
+class ArranqueTest(TestCase):
+    @override_settings(ALLOWED_HOSTS=['mercapp.example.com'])
+    def test_healthz_sin_login_ni_base(self):
+        # Host no permitido, sin sesión: el health check del balanceador igual responde
+        with self.assertNumQueries(0):
+            respuesta = self.client.get('/healthz', HTTP_HOST='10.0.0.7')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.content, b'ok')
+
+    # Como en producción con Redis: caché de autenticación y versiones en la caché
+    @override_settings(AUTH_CACHE=True, VERSIONES_EN_BASE=False)
+    def test_calentar(self):
+        cache.clear()
+        get_user_model().objects.create_user('caja1', password='x')
+        tiempos = arranque.calentar()
+        self.assertEqual(set(tiempos), set(arranque.PASOS))
+        self.assertTrue(all(resultado is not None for resultado, _ in tiempos.values()))
+        self.assertGreater(tiempos['plantillas'][0], 10)
+        self.assertEqual(tiempos['roles'][0], 1)
+        # Los usuarios ya cacheados no se vuelven a cargar
+        self.assertEqual(arranque.calentar(['roles'])['roles'][0], 0)
@@ -0,0 +1,88 @@
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.signals import request_finished
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from mercapp import auditoria
+from mercapp.models import AuditEvent, Producto, Venta
+
+
+class AuditoriaTest(TestCase):
+    def setUp(self):
+        auditoria.vaciar()
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(self.admin)
+
+    def test_eventos_en_buffer_y_escritos_al_terminar_request(self):
+        producto = Producto.objects.create(codigo='A1', nombre='Arroz', precio=Decimal('1000'), stock=5)
+        venta = Venta.objects.create(usuario=self.admin)
+        auditoria.registrar('VENTA_REGISTRADA', self.admin, venta)
+        auditoria.registrar('PRODUCTO_EDITADO', self.admin, producto)
+        self.assertEqual(auditoria.pendientes(), 2)
+        self.assertFalse(AuditEvent.objects.exists())
+
+        # Un solo INSERT para todo el lote
+        with self.assertNumQueries(1):
+            self.assertEqual(auditoria.vaciar(), 2)
+
+        self.client.post(f'/ventas/{venta.id}/anular/', {'motivo': 'Error'})
+        evento = AuditEvent.objects.get(accion='VENTA_ANULADA')
+        self.assertEqual((evento.usuario, evento.objeto_tipo, evento.objeto_id), ('admin', 'venta', str(venta.id)))
+
+    def test_visor_requiere_permiso(self):
+        auditoria.registrar('RESPALDO_CREADO', self.admin, descripcion='MANUAL')
+        auditoria.vaciar()
+        resp = self.client.get('/auditoria/?accion=RESPALDO_CREADO')
+        self.assertContains(resp, 'Respaldo creado')
+
+        vendedor = get_user_model().objects.create_user('vend', password='x')
+        self.client.force_login(vendedor)
+        self.assertEqual(self.client.get('/auditoria/').status_code, 302)
+
+        vendedor.user_permissions.add(Permission.objects.get(codename='can_view_audit_logs'))
+        vendedor = get_user_model().objects.get(pk=vendedor.pk)
+        self.client.force_login(vendedor)
+        self.assertEqual(self.client.get('/auditoria/').status_code, 200)
+
+    def test_volcado_al_terminar_request_cierra_su_conexion(self):
+        auditoria.registrar('RESPALDO_CREADO', self.admin, descripcion='MANUAL')
+        with mock.patch.object(auditoria, 'close_old_connections') as cerrar:
+            request_finished.send(sender=None)
+        self.assertEqual(AuditEvent.objects.count(), 1)
+        cerrar.assert_called_once()
+
+
+@override_settings(AUDIT_BATCH_SIZE=3, AUDIT_VOLCADO_SEGUNDOS=60)
+class EscritorAuditoriaTest(TransactionTestCase):
+    # Sin la transacción de TestCase: el hilo escritor usa su propia conexión
+    def setUp(self):
+        auditoria.vaciar()
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(self.admin)
+        self.ventas = [Venta.objects.create(usuario=self.admin) for _ in range(3)]
+
+    def test_varios_requests_en_un_solo_insert(self):
+        with mock.patch.object(AuditEvent.objects, 'bulk_create', wraps=AuditEvent.objects.bulk_create) as insert:
+            auditoria.iniciar_escritor()
+            self.addCleanup(auditoria.detener_escritor)
+            for venta in self.ventas[:2]:
+                self.client.post(f'/ventas/{venta.id}/anular/', {'motivo': 'Error'})
+            # Los requests no escriben: esperan al lote
+            self.assertEqual(auditoria.pendientes(), 2)
+            insert.assert_not_called()
+
+            # El tercero completa AUDIT_BATCH_SIZE y despierta al escritor
+            self.client.post(f'/ventas/{self.ventas[2].id}/anular/', {'motivo': 'Error'})
+            for _ in range(100):
+                if not auditoria.pendientes() and insert.called:
+                    break
+                time.sleep(0.05)
+            auditoria.detener_escritor()
+
+        insert.assert_called_once()
+        self.assertEqual(len(insert.call_args.args[0]), 3)
+        self.assertEqual(AuditEvent.objects.filter(accion='VENTA_ANULADA').count(), 3)
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+
+from mercapp.auth_cache import obtener_usuario
+from mercapp.permissions import es_admin, es_vendedor
+
+
+# AUTH_CACHE exige caché compartida, y con ella las versiones viven en la caché
+@override_settings(VERSIONES_EN_BASE=False)
+class UsuarioCacheadoTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('cajero', password='clave-segura-123')
+        self.user.groups.add(Group.objects.create(name='Vendedor'))
+        self.client.force_login(self.user)
+
+    def _request(self):
+        request = RequestFactory().get('/')
+        request.session = self.client.session
+        request.session.keys()  # carga la sesión fuera de las mediciones
+        return request
+
+    def test_acierto_de_cache_sin_consultas(self):
+        obtener_usuario(self._request())
+        request = self._request()
+        with self.assertNumQueries(0):
+            user = obtener_usuario(request)
+            self.assertTrue(es_vendedor(user))
+            self.assertFalse(es_admin(user))
+            self.assertFalse(user.has_perm('mercapp.view_venta'))
+
+    def test_desactivar_usuario_invalida_la_cache(self):
+        obtener_usuario(self._request())
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(obtener_usuario(self._request()).is_authenticated)
+
+    def test_cambio_de_grupos_invalida_la_cache(self):
+        obtener_usuario(self._request())
+        self.user.groups.add(Group.objects.create(name='Administrador'))
+        self.assertTrue(es_admin(obtener_usuario(self._request())))
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from mercapp import busqueda
+from mercapp.models import DetalleVenta, Producto, Venta
+
+
+class BusquedaVentasTest(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.vendedor = User.objects.create_user('caja1', password='x')
+        self.vendedor.groups.add(Group.objects.get_or_create(name='Vendedor')[0])
+        self.arroz = Producto.objects.create(codigo='A1', nombre='Arroz', precio=Decimal('1000'), stock=100)
+        self.fideos = Producto.objects.create(codigo='F1', nombre='Fideos', precio=Decimal('3000'), stock=100)
+        ahora = timezone.now()
+        self.ventas = {}
+        for nombre, usuario, producto, cantidad, dias in (
+            ('vieja', self.vendedor, self.arroz, 6, 800),
+            ('grande', self.vendedor, self.arroz, 6, 3),
+            ('chica', self.vendedor, self.arroz, 1, 2),
+            ('ajena', self.admin, self.arroz, 6, 1),
+            ('fideos', self.vendedor, self.fideos, 2, 0),
+        ):
+            venta = Venta.objects.create(fecha=ahora - timedelta(days=dias), usuario=usuario)
+            DetalleVenta.objects.create(venta=venta, producto=producto, cantidad=cantidad, precio_unitario=producto.precio)
+            self.ventas[nombre] = venta.id
+        call_command('archivar_ventas', dias=365, stdout=StringIO())
+
+    def ids(self, filtros, **kwargs):
+        return [fila['id'] for fila in busqueda.buscar(filtros, **kwargs)[0]]
+
+    def test_filtros_combinados_incluyen_archivo(self):
+        v = self.ventas
+        self.assertEqual(
+            self.ids({'codigo': 'A1', 'usuario': self.vendedor, 'total_desde': Decimal('5000')}),
+            [v['grande'], v['vieja']],
+        )
+        self.assertEqual(self.ids({'producto': 'fide'}), [v['fideos']])
+        # Producto común: mismo resultado recorriendo por fecha con EXISTS
+        with mock.patch.object(busqueda, 'LINEAS_PRODUCTO_COMUN', 1):
+            self.assertEqual(
+                self.ids({'codigo': 'A1', 'usuario': self.vendedor, 'total_desde': Decimal('5000')}),
+                [v['grande'], v['vieja']],
+            )
+        self.assertEqual(
+            self.ids({'fecha_desde': timezone.localdate() - timedelta(days=2), 'codigo': 'A1'}),
+            [v['ajena'], v['chica']],
+        )
+
+    def test_paginacion_por_cursor(self):
+        # Misma fecha en dos ventas: el id desempata sin repetir ni saltear
+        Venta.objects.filter(id=self.ventas['chica']).update(
+            fecha=Venta.objects.get(id=self.ventas['ajena']).fecha
+        )
+        vistos, cursor = [], None
+        while True:
+            filas, siguiente = busqueda.buscar({}, cursor=cursor, limite=2)
+            vistos += [fila['id'] for fila in filas]
+            if siguiente is None:
+                break
+            cursor = busqueda.decodificar_cursor(siguiente)
+        self.assertEqual(sorted(vistos), sorted(self.ventas.values()))
+        self.assertEqual(len(vistos), len(set(vistos)))
+
+    def test_vendedor_solo_ve_sus_ventas(self):
+        self.client.force_login(self.vendedor)
+        resp = self.client.get('/ventas/buscar/', {'codigo': 'A1'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn('usuario', resp.context['form'].fields)
+        ids = [fila['id'] for fila in resp.context['ventas']]
+        self.assertNotIn(self.ventas['ajena'], ids)
+        self.assertIn(self.ventas['vieja'], ids)
+
+    def test_cursor_invalido_y_rango_invertido(self):
+        self.client.force_login(self.admin)
+        resp = self.client.get('/ventas/buscar/', {'cursor': 'basura'})
+        self.assertEqual(len(resp.context['ventas']), 5)
+        resp = self.client.get('/ventas/buscar/', {'total_desde': '5000', 'total_hasta': '10'})
+        self.assertFalse(resp.context['form'].is_valid())
+        self.assertEqual(resp.context['ventas'], [])
@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from mercapp.catalogo import catalogo
+from mercapp.models import Producto, descontar_stock
+
+
+@override_settings(CATALOGO_VERIFICAR_SEGUNDOS=60)
+class CatalogoTest(TestCase):
+    def setUp(self):
+        catalogo.limpiar()
+        self.addCleanup(catalogo.limpiar)
+        # Cada versión se incrementa una vez por transacción: se confirma
+        # el alta para que el guardado del test incremente otra vez
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arroz = Producto.objects.create(codigo='7790001', nombre='Arroz', precio=Decimal('1000'), stock=5)
+
+    def test_acierto_sin_consultas_e_invalidacion(self):
+        self.assertEqual(catalogo.buscar('7790001').nombre, 'Arroz')
+        with self.assertNumQueries(0):
+            self.assertEqual(catalogo.buscar('7790001').precio, Decimal('1000'))
+        self.assertIsNone(catalogo.buscar('nada'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(catalogo.buscar('nada'))
+
+        # El guardado sube la versión 'catalogo' al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arroz.precio = Decimal('1200')
+            self.arroz.save()
+        with self.settings(CATALOGO_VERIFICAR_SEGUNDOS=0):
+            self.assertEqual(catalogo.buscar('7790001').precio, Decimal('1200'))
+
+        stats = catalogo.estadisticas()
+        self.assertEqual(stats['invalidaciones'], 1)
+        self.assertEqual((stats['aciertos'], stats['fallos']), (2, 3))
+
+    def test_entrada_vence_sin_cambio_de_version(self):
+        self.assertEqual(catalogo.buscar('7790001').nombre, 'Arroz')
+        # update() no dispara señales: la versión no cambia
+        Producto.objects.filter(pk=self.arroz.pk).update(nombre='Arroz largo')
+        self.assertEqual(catalogo.buscar('7790001').nombre, 'Arroz')
+        with self.settings(CATALOGO_MAX_EDAD_SEGUNDOS=0):
+            self.assertEqual(catalogo.buscar('7790001').nombre, 'Arroz largo')
+        self.assertEqual(catalogo.estadisticas()['invalidaciones'], 0)
+
+    def test_las_ventas_no_vacian_el_catalogo(self):
+        vendedor = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(vendedor)
+        self.assertEqual(self.client.get('/productos/buscar/', {'codigo': '7790001'}).json()['stock'], 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            descontar_stock(self.arroz, 2)
+        with self.settings(CATALOGO_VERIFICAR_SEGUNDOS=0):
+            # El stock se lee aparte: sale actualizado sin invalidar la entrada
+            self.assertEqual(self.client.get('/productos/buscar/', {'codigo': '7790001'}).json()['stock'], 3)
+        stats = catalogo.estadisticas()
+        self.assertEqual((stats['invalidaciones'], stats['aciertos']), (0, 1))
+
+    def test_endpoint(self):
+        vendedor = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(vendedor)
+        datos = self.client.get('/productos/buscar/', {'codigo': '7790001'}).json()
+        self.assertEqual(datos, {'id': self.arroz.pk, 'codigo': '7790001', 'nombre': 'Arroz', 'precio': '1000.00', 'stock': 5})
+        self.assertEqual(self.client.get('/productos/buscar/', {'id': self.arroz.pk}).json()['nombre'], 'Arroz')
+        self.assertEqual(self.client.get('/productos/buscar/', {'codigo': 'x'}).status_code, 404)
+        self.assertEqual(len(self.client.get('/productos/buscar/', {'q': 'arr'}).json()['resultados']), 1)
+        self.assertEqual(self.client.get('/productos/catalogo/estadisticas/').json()['aciertos'], 0)
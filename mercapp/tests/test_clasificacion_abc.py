@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from mercapp import clasificacion_abc
+from mercapp.models import DetalleVenta, Producto, Venta
+
+
+class ClasificacionABCTest(TestCase):
+    def test_clasificar(self):
+        ingresos = np.array([10.0, 700.0, 0.0, 150.0, 100.0, 40.0])
+        clase, acumulada = clasificacion_abc.clasificar(ingresos, 0.8, 0.95)
+        # 700 (70 %) y 150 (85 %, cruza el 80 %) son A; 100 llega al 95 %
+        self.assertEqual(clase.tolist(), ['C', 'A', 'C', 'A', 'B', 'C'])
+        self.assertAlmostEqual(acumulada[3], 0.85)
+        self.assertAlmostEqual(acumulada[2], 1.0)
+
+    def test_actualizar_guarda_solo_cambios(self):
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        arroz = Producto.objects.create(codigo='A1', nombre='Arroz', precio=Decimal('1000'), stock=100)
+        sal = Producto.objects.create(codigo='B1', nombre='Sal', precio=Decimal('100'), stock=100)
+        venta = Venta.objects.create(usuario=admin)
+        DetalleVenta.objects.create(venta=venta, producto=arroz, cantidad=9, precio_unitario=Decimal('1000'))
+        DetalleVenta.objects.create(venta=venta, producto=sal, cantidad=2, precio_unitario=Decimal('100'))
+
+        self.assertEqual(clasificacion_abc.actualizar(), {'A': 1, 'C': 1})
+        arroz.refresh_from_db()
+        sal.refresh_from_db()
+        self.assertEqual((arroz.clase_abc, sal.clase_abc), ('A', 'C'))
+        self.assertAlmostEqual(arroz.participacion_acumulada, 9000 / 9200, places=4)
+
+        # Segunda corrida sin ventas nuevas: no reescribe productos
+        with CaptureQueriesContext(connection) as consultas:
+            clasificacion_abc.actualizar()
+        self.assertFalse([q for q in consultas if 'CASE WHEN' in q['sql']])
@@ -0,0 +1,126 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from mercapp.models import Producto, Venta, VersionDatos
+from mercapp.versiones import incrementar_al_confirmar, incrementar_version, obtener_version
+
+
+class GetCondicionalTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        # Confirma el alta: cada versión se incrementa una vez por transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto = Producto.objects.create(codigo='1', nombre='Arroz', precio=Decimal('1000'), stock=5)
+
+    def test_304_hasta_que_cambian_los_datos(self):
+        self.client.force_login(self.admin)
+        respuesta = self.client.get('/productos/')
+        etag = respuesta['ETag']
+        self.assertIn('private', respuesta['Cache-Control'])
+
+        with self.assertTemplateNotUsed('mercapp/lista_productos.html'):
+            respuesta = self.client.get('/productos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.precio = Decimal('1200')
+            self.producto.save()
+        respuesta = self.client.get('/productos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_sin_304_viejo_si_otro_worker_cambia_los_datos(self):
+        self.client.force_login(self.admin)
+        etag = self.client.get('/productos/')['ETag']
+
+        # Otro worker, con su propia caché local, guarda un producto
+        VersionDatos.objects.filter(nombre='productos').update(version=F('version') + 1)
+        cache.clear()
+        respuesta = self.client.get('/productos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_etag_distinto_por_usuario(self):
+        vendedor = get_user_model().objects.create_user('caja1', password='x')
+        vendedor.groups.add(Group.objects.get_or_create(name='Vendedor')[0])
+
+        self.client.force_login(self.admin)
+        etag = self.client.get('/reportes/ventas/')['ETag']
+        self.client.force_login(vendedor)
+        respuesta = self.client.get('/reportes/ventas/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_detalle_venta_last_modified(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            venta = Venta.objects.create(usuario=self.admin, total=Decimal('1000'), metodo_pago='EFECTIVO')
+        # Last-Modified tiene resolución de segundos
+        Venta.objects.filter(pk=venta.pk).update(updated_at=timezone.now() - timedelta(minutes=1))
+        self.client.force_login(self.admin)
+        respuesta = self.client.get(f'/ventas/{venta.id}/')
+        self.assertIn('Last-Modified', respuesta)
+        respuesta = self.client.get(f'/ventas/{venta.id}/', HTTP_IF_MODIFIED_SINCE=respuesta['Last-Modified'])
+        self.assertEqual(respuesta.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            venta.anulada = True
+            venta.save()
+        respuesta = self.client.get(f'/ventas/{venta.id}/', HTTP_IF_MODIFIED_SINCE=respuesta['Last-Modified'])
+        self.assertEqual(respuesta.status_code, 200)
+
+
+class VersionesCompartidasTest(TestCase):
+    def test_otro_proceso_ve_el_incremento(self):
+        # Sin caché compartida la versión vive en la base: vaciar la caché
+        # local (lo que ve otro worker) no la pierde ni la atrasa
+        version = obtener_version('productos')
+        incrementar_version('productos')
+        cache.clear()
+        self.assertEqual(obtener_version('productos'), version + 1)
+
+    def test_venta_de_varias_lineas_incrementa_cada_version_una_vez(self):
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        with self.captureOnCommitCallbacks(execute=True):
+            productos = [
+                Producto.objects.create(codigo=str(i), nombre=f'P{i}', precio=Decimal('100'), stock=10)
+                for i in range(5)
+            ]
+        datos = {
+            'metodo_pago': 'EFECTIVO',
+            'form-TOTAL_FORMS': '5', 'form-INITIAL_FORMS': '0',
+            'form-MIN_NUM_FORMS': '0', 'form-MAX_NUM_FORMS': '1000',
+        }
+        for i, producto in enumerate(productos):
+            datos.update({f'form-{i}-producto': producto.pk, f'form-{i}-cantidad': 1, f'form-{i}-precio_unitario': ''})
+        self.client.force_login(admin)
+
+        with CaptureQueriesContext(connection) as consultas, self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post('/ventas/nueva/', datos)
+        self.assertEqual(respuesta.status_code, 302)
+        versiones = [q['sql'] for q in consultas if q['sql'].startswith('UPDATE "mercapp_versiondatos"')]
+        # 'ventas', 'stock' y 'productos' (stock del depósito central), una vez cada una
+        self.assertEqual(len(versiones), 3)
+        # Antes de agrupar los incrementos eran 127 consultas
+        self.assertLessEqual(len(consultas), 55)
+
+    def test_incremento_descartado_por_rollback_se_vuelve_a_registrar(self):
+        version = obtener_version('ventas')
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    incrementar_al_confirmar('ventas')
+                    raise ValueError
+            except ValueError:
+                pass
+            incrementar_al_confirmar('ventas')
+            incrementar_al_confirmar('ventas')
+        self.assertEqual(obtener_version('ventas'), version + 1)
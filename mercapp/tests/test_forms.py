@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from mercapp.forms import DetalleVentaFormSet
+from mercapp.models import Producto
+
+
+class DetalleVentaFormSetTest(TestCase):
+    def setUp(self):
+        self.productos = [
+            Producto.objects.create(codigo=f'P{i}', nombre=f'Producto {i}', precio=Decimal('100.00'), stock=10)
+            for i in range(5)
+        ]
+
+    def _data(self, filas):
+        data = {
+            'form-TOTAL_FORMS': str(len(filas)),
+            'form-INITIAL_FORMS': '0',
+            'form-MIN_NUM_FORMS': '0',
+            'form-MAX_NUM_FORMS': '1000',
+        }
+        for i, (producto_id, cantidad, precio) in enumerate(filas):
+            data[f'form-{i}-producto'] = str(producto_id)
+            data[f'form-{i}-cantidad'] = str(cantidad)
+            data[f'form-{i}-precio_unitario'] = precio
+        return data
+
+    def test_valida_todas_las_filas_con_una_consulta(self):
+        filas = [(p.id, 1, '') for p in self.productos]
+        formset = DetalleVentaFormSet(self._data(filas))
+        with self.assertNumQueries(1):
+            self.assertTrue(formset.is_valid(), formset.errors)
+        # El precio por defecto sale del producto ya cargado
+        self.assertEqual(formset.forms[0].cleaned_data['precio_unitario'], Decimal('100.00'))
+
+    def test_stock_insuficiente_suma_filas_repetidas(self):
+        p = self.productos[0]
+        formset = DetalleVentaFormSet(self._data([(p.id, 6, ''), (p.id, 6, '')]))
+        self.assertFalse(formset.is_valid())
+        self.assertIn('Stock insuficiente', formset.non_form_errors()[0])
+
+    def test_producto_inexistente_es_invalido(self):
+        formset = DetalleVentaFormSet(self._data([(999999, 1, '')]))
+        self.assertFalse(formset.is_valid())
+        self.assertIn('producto', formset.forms[0].errors)
+
+    def test_formulario_vacio_no_incluye_catalogo(self):
+        html = str(DetalleVentaFormSet().empty_form)
+        self.assertNotIn('<option', html)
+        self.assertNotIn('Producto 0', html)
@@ -0,0 +1,51 @@
+import json
+import logging
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from django.utils.functional import SimpleLazyObject
+
+from mercapp.logs import ColaJSONHandler, ContextoRequestFilter, iniciar_request, terminar_request
+
+
+class LogsTest(TestCase):
+    def test_json_con_request_id_y_usuario(self):
+        salida = StringIO()
+        handler = ColaJSONHandler(stream=salida)
+        handler.addFilter(ContextoRequestFilter())
+        logger = logging.getLogger('mercapp.tests.logs')
+        logger.addHandler(handler)
+        logger.propagate = False
+        self.addCleanup(logger.removeHandler, handler)
+
+        request = RequestFactory().get('/')
+        request.user = get_user_model()(username='cajero1')
+        tokens = iniciar_request(request, 'abc123')
+        try:
+            logger.warning('Venta %s registrada', 7, extra={'total': '1500'})
+        finally:
+            terminar_request(tokens)
+        handler.detener()
+
+        linea = json.loads(salida.getvalue().strip())
+        self.assertEqual(linea['mensaje'], 'Venta 7 registrada')
+        self.assertEqual((linea['request_id'], linea['usuario'], linea['total']), ('abc123', 'cajero1', '1500'))
+
+    def test_no_carga_el_usuario_perezoso(self):
+        cargas = []
+        request = RequestFactory().get('/')
+        request.user = SimpleLazyObject(lambda: cargas.append(1) or get_user_model()(username='x'))
+        record = logging.makeLogRecord({'msg': 'hola'})
+        tokens = iniciar_request(request, 'abc123')
+        try:
+            ContextoRequestFilter().filter(record)
+        finally:
+            terminar_request(tokens)
+        self.assertEqual((record.usuario, cargas), (None, []))
+
+    def test_middleware_devuelve_request_id(self):
+        resp = self.client.get('/accounts/login/', HTTP_X_REQUEST_ID='proxy-42')
+        self.assertEqual(resp['X-Request-ID'], 'proxy-42')
+        resp = self.client.get('/accounts/login/', HTTP_X_REQUEST_ID='no valido!')
+        self.assertEqual(len(resp['X-Request-ID']), 32)
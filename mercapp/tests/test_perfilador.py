@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.test import TestCase, override_settings
+
+from mercapp.models import PerfilRequest
+
+
+@override_settings(PERFILADOR=True, PERFILADOR_MUESTREO=0)
+class PerfiladorTest(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+
+    def test_cabecera_solo_para_admin(self):
+        vendedor = get_user_model().objects.create_user('caja1', password='x')
+        vendedor.groups.add(Group.objects.get_or_create(name='Vendedor')[0])
+        self.client.force_login(vendedor)
+        self.client.get('/reportes/ventas/', HTTP_X_PERFILAR='1')
+        self.assertFalse(PerfilRequest.objects.exists())
+
+        self.client.force_login(self.admin)
+        respuesta = self.client.get('/reportes/ventas/', HTTP_X_PERFILAR='1')
+        perfil = PerfilRequest.objects.get()
+        self.assertEqual(respuesta['X-Perfil-Id'], str(perfil.pk))
+        self.assertEqual((perfil.vista, perfil.estado, perfil.forzado), ('reporte_ventas', 200, True))
+        self.assertTrue(perfil.funciones)
+
+        # La página agrega las funciones de la vista
+        respuesta = self.client.get('/perfiles/')
+        self.assertEqual(respuesta.context['vista'], 'reporte_ventas')
+        self.assertEqual(respuesta.context['cantidad'], 1)
+        self.assertTrue(respuesta.context['funciones'])
+
+    @override_settings(PERFILADOR_MUESTREO=1)
+    def test_muestreo(self):
+        self.client.force_login(self.admin)
+        self.client.get('/productos/')
+        self.assertEqual(PerfilRequest.objects.get().forzado, False)
+
+    @override_settings(PERFILADOR=False)
+    def test_apagado_no_se_instala(self):
+        self.client.force_login(self.admin)
+        respuesta = self.client.get('/productos/', HTTP_X_PERFILAR='1')
+        self.assertNotIn('X-Perfil-Id', respuesta)
+        self.assertFalse(PerfilRequest.objects.exists())
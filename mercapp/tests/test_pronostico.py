@@ -0,0 +1,81 @@
+import warnings
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from mercapp import pronostico
+from mercapp.models import DetalleVenta, Producto, PronosticoStock, Venta
+
+
+class PronosticoTest(TestCase):
+    def test_calcular_venta_constante(self):
+        # Producto 0 vende 2 por día los 30 días; producto 1 no vende
+        dias = 30
+        r = pronostico.calcular(
+            stock=np.array([10.0, 5.0]),
+            fila=np.zeros(dias, dtype=np.int64),
+            edad=np.arange(dias),
+            unidades=np.full(dias, 2.0),
+            dias=dias, plazo=7, cobertura=14,
+        )
+        self.assertAlmostEqual(r['velocidad'][0], 2.0)
+        self.assertAlmostEqual(r['desviacion'][0], 0.0)
+        self.assertAlmostEqual(r['dias_quiebre'][0], 5.0)
+        self.assertEqual(r['punto_reorden'][0], 14)
+        self.assertEqual(r['sugerida'][0], 2 * 21 - 10)
+        self.assertTrue(np.isinf(r['dias_quiebre'][1]))
+        self.assertEqual(r['sugerida'][1], 0)
+
+    def test_sin_stock_ni_ventas_no_advierte(self):
+        # 0/0 en días hasta quiebre: con -W error sería una excepción
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            r = pronostico.calcular(
+                stock=np.array([0.0, 4.0]),
+                fila=np.ones(3, dtype=np.int64), edad=np.arange(3), unidades=np.full(3, 1.0),
+                dias=30, plazo=7, cobertura=14,
+            )
+        self.assertTrue(np.isinf(r['dias_quiebre'][0]))
+        self.assertAlmostEqual(r['dias_quiebre'][1], 4.0)
+        self.assertEqual(r['sugerida'][0], 0)
+
+    def test_producto_nuevo_sobre_dias_desde_su_primera_venta(self):
+        # Producto 0 vende 2 por día hace un año; producto 1 lo mismo desde hace 10 días
+        dias = 365
+        r = pronostico.calcular(
+            stock=np.array([100.0, 100.0]),
+            fila=np.concatenate([np.zeros(dias, dtype=np.int64), np.ones(10, dtype=np.int64)]),
+            edad=np.concatenate([np.arange(dias), np.arange(10)]),
+            unidades=np.full(dias + 10, 2.0),
+            dias=dias, plazo=7, cobertura=14,
+        )
+        self.assertAlmostEqual(r['velocidad'][0], 2.0)
+        self.assertAlmostEqual(r['velocidad'][1], 2.0)
+        self.assertAlmostEqual(r['desviacion'][1], 0.0)
+        self.assertAlmostEqual(r['dias_quiebre'][1], 50.0)
+
+    def test_actualizar_y_reporte(self):
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        arroz = Producto.objects.create(codigo='A1', nombre='Arroz', precio=Decimal('1000'), stock=50)
+        Producto.objects.create(codigo='B1', nombre='Sal', precio=Decimal('500'), stock=5)
+        venta = Venta.objects.create(usuario=admin)
+        DetalleVenta.objects.create(venta=venta, producto=arroz, cantidad=30, precio_unitario=Decimal('1000'))
+        anulada = Venta.objects.create(usuario=admin, anulada=True)
+        DetalleVenta.objects.bulk_create([  # sin señales: no descuenta stock
+            DetalleVenta(venta=anulada, producto=arroz, cantidad=500, precio_unitario=Decimal('1000'),
+                         subtotal=Decimal('500000')),
+        ])
+
+        self.assertEqual(pronostico.actualizar(dias=30), 1)
+        self.assertEqual(PronosticoStock.objects.count(), 2)
+        p = arroz.pronostico
+        # Su única venta es de hoy: se promedia sobre ese día, no los 30
+        self.assertAlmostEqual(p.velocidad, 30, places=3)
+        self.assertGreater(p.cantidad_sugerida, 0)
+
+        self.client.force_login(admin)
+        resp = self.client.get('/reportes/reponer/')
+        self.assertContains(resp, 'Arroz')
+        self.assertNotContains(resp, 'Sal')
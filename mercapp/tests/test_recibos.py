@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from mercapp.models import DetalleVenta, Producto, Venta
+
+
+class ReciboVentaTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(self.user)
+        producto = Producto.objects.create(codigo='A1', nombre='Arroz', precio=Decimal('1000'), stock=100)
+        self.venta = Venta.objects.create(usuario=self.user)
+        DetalleVenta.objects.create(venta=self.venta, producto=producto, cantidad=2, precio_unitario=Decimal('1000'))
+        self.url = f'/ventas/{self.venta.id}/recibo/'
+
+    def test_url_versionada_cacheada_y_304(self):
+        resp = self.client.get(self.url)
+        self.assertRedirects(resp, self.url + '?v=v', fetch_redirect_response=False)
+
+        resp = self.client.get(self.url + '?v=v')
+        self.assertContains(resp, 'Arroz')
+        self.assertIn('immutable', resp['Cache-Control'])
+        etag = resp['ETag']
+
+        # Reimpresión: sólo la sesión, la versión 'auth' del usuario cacheado
+        # y la consulta del estado de la venta
+        with self.assertNumQueries(3):
+            self.assertContains(self.client.get(self.url + '?v=v'), 'Arroz')
+        resp = self.client.get(self.url + '?v=v', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        resp = self.client.get(f'/ventas/{self.venta.id}/recibo.pdf?v=v')
+        self.assertEqual(resp['Content-Type'], 'application/pdf')
+        self.assertTrue(resp.content.startswith(b'%PDF-'))
+        self.assertIn(b'Arroz', resp.content)
+
+    def test_anular_cambia_la_version(self):
+        self.client.get(self.url + '?v=v')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/ventas/{self.venta.id}/anular/', {'motivo': 'Error de caja'})
+
+        resp = self.client.get(self.url + '?v=v')
+        self.assertRedirects(resp, self.url + '?v=a', fetch_redirect_response=False)
+        self.assertContains(self.client.get(self.url + '?v=a'), 'VENTA ANULADA')
@@ -0,0 +1,67 @@
+import unittest
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase
+
+from mercapp.db_routers import COOKIE_PRIMARIA, ReplicaRouter, _usar_replica, lectura_en_replica
+from mercapp.models import Venta
+
+REPLICA_SEPARADA = (
+    'replica' in settings.DATABASES
+    and not settings.DATABASES['replica'].get('TEST', {}).get('MIRROR')
+)
+
+
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def _bd_en_vista(self, request):
+        @lectura_en_replica
+        def vista(request):
+            return self.router.db_for_read(Venta)
+        return vista(request)
+
+    @unittest.skipUnless('replica' in settings.DATABASES, 'requiere DATABASE_REPLICA_URL')
+    def test_get_lee_de_la_replica(self):
+        self.assertEqual(self._bd_en_vista(RequestFactory().get('/')), 'replica')
+
+    def test_post_y_cookie_de_escritura_quedan_en_primaria(self):
+        self.assertIsNone(self._bd_en_vista(RequestFactory().post('/')))
+        request = RequestFactory().get('/')
+        request.COOKIES[COOKIE_PRIMARIA] = '1'
+        self.assertIsNone(self._bd_en_vista(request))
+
+    def test_fuera_de_vistas_marcadas_lee_de_primaria(self):
+        self.assertIsNone(self.router.db_for_read(Venta))
+        self.assertEqual(self.router.db_for_write(Venta), 'default')
+
+
+@unittest.skipUnless(REPLICA_SEPARADA, 'requiere DATABASE_REPLICA_URL y DATABASE_REPLICA_TEST_MIRROR=False')
+class ReplicaSeparadaTest(TransactionTestCase):
+    # Sin la transacción envolvente de TestCase, que fijaría todo a la primaria
+    databases = {'default', 'replica'} if REPLICA_SEPARADA else {'default'}
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.user.save(using='replica')
+        self.client.force_login(self.user)
+        Venta.objects.create(total=Decimal('777777'), usuario=self.user)
+
+    def test_reporte_usa_la_replica_salvo_tras_escribir(self):
+        # La venta sólo existe en la primaria: el reporte (réplica) no la ve
+        self.assertNotContains(self.client.get('/reportes/ventas/'), '777.777')
+        self.client.cookies[COOKIE_PRIMARIA] = '1'
+        self.assertContains(self.client.get('/reportes/ventas/'), '777.777')
+
+    def test_transaccion_abierta_lee_de_primaria(self):
+        token = _usar_replica.set(True)
+        try:
+            with transaction.atomic():
+                self.assertEqual(Venta.objects.count(), 1)
+            self.assertEqual(Venta.objects.count(), 0)
+        finally:
+            _usar_replica.reset(token)
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from mercapp import reportes
+from mercapp.versiones import obtener_versiones
+from mercapp.models import DetalleVenta, Producto, Venta
+
+
+class ReportePivotTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        arroz = Producto.objects.create(codigo='A', nombre='Arroz', categoria='Almacén', precio=Decimal('100'), stock=100)
+        leche = Producto.objects.create(codigo='L', nombre='Leche', categoria='Lácteos', precio=Decimal('50'), stock=100)
+        for metodo, anulada in (('EFECTIVO', False), ('DEBITO', False), ('DEBITO', True)):
+            venta = Venta.objects.create(metodo_pago=metodo, usuario=self.user)
+            DetalleVenta.objects.create(venta=venta, producto=arroz, cantidad=1, precio_unitario=Decimal('100'))
+            DetalleVenta.objects.create(venta=venta, producto=leche, cantidad=2, precio_unitario=Decimal('50'))
+            if anulada:
+                Venta.objects.filter(pk=venta.pk).update(anulada=True)
+
+    def test_una_consulta_y_excluye_anuladas(self):
+        obtener_versiones('ventas', 'productos')
+        # Las versiones (una lectura) y la consulta de las celdas
+        with self.assertNumQueries(2):
+            celdas = reportes.consultar(['mes', 'metodo_pago', 'categoria'])
+        self.assertEqual(len(celdas), 4)
+        pivot = reportes.pivotear(celdas, ['categoria'], 'metodo_pago')
+        self.assertEqual(pivot['columnas'], ['DEBITO', 'EFECTIVO'])
+        self.assertEqual(pivot['total'], Decimal('400'))
+        # Segunda vez: desde la caché
+        with self.assertNumQueries(1):
+            reportes.consultar(['mes', 'metodo_pago', 'categoria'])
+
+    def test_vista(self):
+        self.client.force_login(self.user)
+        resp = self.client.get('/reportes/pivot/', {'filas': ['vendedor'], 'columna': 'categoria', 'medida': 'unidades'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['pivot']['total'], 6)
+
+    def test_totales_de_ventas_no_cuentan_dos_veces(self):
+        # Cada venta tiene productos de dos categorías
+        obtener_versiones('ventas', 'productos')
+        # Las versiones y una sola consulta para celdas y totales
+        with self.assertNumQueries(2):
+            pivot = reportes.pivote(['metodo_pago'], 'categoria', 'ventas')
+        self.assertEqual(pivot['columnas'], ['Almacén', 'Lácteos'])
+        self.assertEqual([f['celdas'] for f in pivot['filas']], [[1, 1], [1, 1]])
+        self.assertEqual([f['total'] for f in pivot['filas']], [1, 1])
+        self.assertEqual(pivot['totales'], [2, 2])
+        self.assertEqual(pivot['total'], 2)
+        self.assertEqual(reportes.pivote(['categoria'], None, 'ventas')['total'], 2)
+
+        # Con un período de columna, sus totales también salen como fechas
+        pivot = reportes.pivote(['categoria'], 'mes', 'ventas')
+        self.assertEqual(len(pivot['columnas']), 1)
+        self.assertEqual(pivot['totales'], [2])
+        self.assertEqual([f['total'] for f in pivot['filas']], [2, 2])
@@ -0,0 +1,157 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from mercapp import respaldos
+from mercapp.models import Producto, Respaldo, StockSucursal, Sucursal
+
+
+class RespaldosAutomaticosTest(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def _ciclo(self):
+        call_command('respaldos_automaticos', una_vez=True, dir=self.dir, stdout=StringIO())
+
+    def test_omite_si_no_hay_cambios(self):
+        self._ciclo()
+        self._ciclo()
+        self.assertEqual(Respaldo.objects.filter(tipo='AUTOMATICO').count(), 1)
+
+        primero = Respaldo.objects.get()
+        Producto.objects.create(codigo='A1', nombre='Arroz', precio=Decimal('1000'), stock=5)
+        self._ciclo()
+        # Mismo día: la rotación conserva sólo el más reciente, con su archivo
+        nuevo = Respaldo.objects.get()
+        self.assertNotEqual(nuevo.pk, primero.pk)
+        self.assertFalse(os.path.exists(respaldos.ruta_archivo(primero)))
+        self.assertTrue(os.path.exists(respaldos.ruta_archivo(nuevo)))
+
+    def test_huella_cambia_con_usuarios_grupos_y_stock_por_sucursal(self):
+        producto = Producto.objects.create(codigo='A1', nombre='Arroz', precio=Decimal('1000'), stock=5)
+        sucursal = Sucursal.objects.create(nombre='Centro')
+        stock = StockSucursal.objects.create(sucursal=sucursal, producto=producto, cantidad=3)
+        vendedor = get_user_model().objects.create_user('caja1', password='x')
+
+        def cambiar_password():
+            vendedor.set_password('otra')
+            vendedor.save()
+
+        def desactivar():
+            vendedor.is_active = False
+            vendedor.save()
+
+        def cambiar_minimo():
+            stock.stock_minimo = 2
+            stock.save()
+
+        cambios = (
+            cambiar_password,
+            desactivar,
+            lambda: vendedor.groups.add(Group.objects.create(name='Vendedor')),
+            lambda: Sucursal.objects.create(nombre='Norte'),
+            cambiar_minimo,
+        )
+        previa = respaldos.huella()
+        for cambio in cambios:
+            cambio()
+            actual = respaldos.huella()
+            self.assertNotEqual(actual, previa, cambio)
+            previa = actual
+
+    def test_politica_abuelo_padre_hijo(self):
+        inicio = timezone.make_aware(datetime(2026, 1, 1, 3, 0))
+        lista = [
+            Respaldo(pk=i, fecha=inicio + timedelta(days=i), tipo='AUTOMATICO')
+            for i in range(120)
+        ]
+        conservar = respaldos.a_conservar(lista, diarios=7, semanales=4, mensuales=3)
+        fechas = {(inicio + timedelta(days=pk)).strftime('%m-%d') for pk in conservar}
+        self.assertEqual(fechas, {
+            '04-24', '04-25', '04-26', '04-27', '04-28', '04-29', '04-30',  # diarios
+            '04-12', '04-19',  # domingos de las semanas anteriores
+            '02-28', '03-31',  # fin de los meses anteriores
+        })
+
+
+class SnapshotSQLiteTest(TransactionTestCase):
+    # Sin la transacción envolvente de TestCase: la API de backup no puede
+    # leer una base con una escritura abierta.
+    def setUp(self):
+        get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def test_snapshot_sqlite_comprimido_y_verificable(self):
+        Producto.objects.create(codigo='A1', nombre='Arroz', precio=Decimal('1000'), stock=5)
+        call_command('crear_respaldo', usuario='admin', modo='snapshot', dir=self.dir, stdout=StringIO())
+
+        respaldo = Respaldo.objects.get()
+        ruta = respaldos.ruta_archivo(respaldo)
+        self.assertTrue(ruta.endswith('.sqlite3.gz'))
+        self.assertEqual(respaldos.sha256_archivo(ruta), respaldo.checksum)
+
+        copia = os.path.join(self.dir, 'copia.sqlite3')
+        with gzip.open(ruta) as origen, open(copia, 'wb') as destino:
+            shutil.copyfileobj(origen, destino)
+        base = sqlite3.connect(copia)
+        self.addCleanup(base.close)
+        self.assertEqual(base.execute('SELECT nombre FROM mercapp_producto').fetchall(), [('Arroz',)])
+
+
+class CopiaConEscriturasTest(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.ruta = os.path.join(self.dir, 'base.sqlite3')
+        base = sqlite3.connect(self.ruta)
+        base.execute('PRAGMA journal_mode=WAL')
+        base.execute('CREATE TABLE venta (id INTEGER PRIMARY KEY, nota TEXT)')
+        # Bastante más grande que una tanda de páginas
+        base.executemany('INSERT INTO venta (nota) VALUES (?)', (('x' * 400,) for _ in range(40000)))
+        base.commit()
+        base.close()
+
+    def test_termina_aunque_las_cajas_escriban(self):
+        detener = threading.Event()
+
+        def caja():
+            base = sqlite3.connect(self.ruta, timeout=5)
+            while not detener.is_set():
+                base.execute("INSERT INTO venta (nota) VALUES ('caja')")
+                base.commit()
+                time.sleep(0.001)
+            base.close()
+
+        escritor = threading.Thread(target=caja, daemon=True)
+        escritor.start()
+        self.addCleanup(escritor.join)
+        self.addCleanup(detener.set)
+
+        destino = os.path.join(self.dir, 'copia.sqlite3')
+        origen = sqlite3.connect(self.ruta, check_same_thread=False)
+        self.addCleanup(origen.close)
+        copia = threading.Thread(target=respaldos.copiar_sqlite, args=(origen, destino), daemon=True)
+        copia.start()
+        copia.join(timeout=5)
+        self.assertFalse(copia.is_alive(), 'la copia no terminó con escrituras concurrentes')
+
+        base = sqlite3.connect(destino)
+        self.addCleanup(base.close)
+        self.assertEqual(base.execute('PRAGMA integrity_check').fetchone()[0], 'ok')
+        self.assertGreaterEqual(base.execute('SELECT count(*) FROM venta').fetchone()[0], 40000)
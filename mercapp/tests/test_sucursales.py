@@ -0,0 +1,80 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from mercapp.models import Producto, StockSucursal, Sucursal, Transferencia, Venta, stock_bajo, transferir_stock
+
+
+class SucursalesTest(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(self.admin)
+        self.centro = Sucursal.objects.create(nombre='Centro')
+        self.norte = Sucursal.objects.create(nombre='Norte')
+        self.arroz = Producto.objects.create(
+            codigo='A1', nombre='Arroz', precio=Decimal('1000'), stock=20, stock_minimo=10,
+        )
+        StockSucursal.objects.create(sucursal=self.centro, producto=self.arroz, cantidad=5, stock_minimo=2)
+
+    def _vender(self, sucursal, cantidad):
+        return self.client.post('/ventas/nueva/', {
+            'metodo_pago': 'EFECTIVO',
+            'sucursal': sucursal.pk,
+            'form-TOTAL_FORMS': '1',
+            'form-INITIAL_FORMS': '0',
+            'form-MIN_NUM_FORMS': '0',
+            'form-MAX_NUM_FORMS': '1000',
+            'form-0-producto': str(self.arroz.pk),
+            'form-0-cantidad': str(cantidad),
+            'form-0-precio_unitario': '',
+        })
+
+    def test_venta_descuenta_solo_la_sucursal(self):
+        resp = self._vender(self.centro, 3)
+        venta = Venta.objects.get()
+        self.assertRedirects(resp, f'/ventas/{venta.pk}/')
+        self.assertEqual(venta.sucursal, self.centro)
+        self.assertEqual(StockSucursal.objects.get(sucursal=self.centro).cantidad, 2)
+        self.arroz.refresh_from_db()
+        self.assertEqual(self.arroz.stock, 20)
+        self.assertEqual(self.client.session['sucursal_id'], self.centro.pk)
+
+        # Norte no tiene stock propio aunque el depósito sí
+        resp = self._vender(self.norte, 1)
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'Stock insuficiente para Arroz')
+        self.assertEqual(Venta.objects.count(), 1)
+
+    def test_transferencias(self):
+        transferir_stock(self.arroz, 8, destino=self.norte, usuario=self.admin)
+        transferir_stock(self.arroz, 5, origen=self.centro, destino=self.norte)
+        self.arroz.refresh_from_db()
+        self.assertEqual(self.arroz.stock, 12)
+        self.assertEqual(StockSucursal.objects.get(sucursal=self.norte).cantidad, 13)
+        self.assertEqual(StockSucursal.objects.get(sucursal=self.centro).cantidad, 0)
+
+        with self.assertRaises(ValidationError):
+            transferir_stock(self.arroz, 1, origen=self.centro, destino=self.norte)
+        with self.assertRaises(ValidationError):
+            transferir_stock(self.arroz, 1, origen=self.norte, destino=self.norte)
+        self.assertEqual(Transferencia.objects.count(), 2)
+
+        resp = self.client.post('/sucursales/transferencias/', {
+            'producto': 'A1', 'cantidad': 2, 'origen': self.norte.pk, 'destino': '',
+        })
+        self.assertRedirects(resp, '/sucursales/transferencias/')
+        self.arroz.refresh_from_db()
+        self.assertEqual(self.arroz.stock, 14)
+
+    def test_stock_bajo_por_sucursal_y_consolidado(self):
+        # Consolidado: 20 + 5 = 25 sobre mínimo 10
+        self.assertEqual(list(stock_bajo()), [])
+        StockSucursal.objects.filter(sucursal=self.centro).update(cantidad=1)
+        self.assertEqual([(p.nombre, p.disponible) for p in stock_bajo(self.centro)], [('Arroz', 1)])
+        Producto.objects.filter(pk=self.arroz.pk).update(stock=5)
+        self.assertEqual([(p.nombre, p.disponible, p.minimo) for p in stock_bajo()], [('Arroz', 6, 10)])
+
+        resp = self.client.get('/reportes/ventas/', {'sucursal': self.centro.pk})
+        self.assertContains(resp, 'Stock bajo mínimo en Centro')
@@ -0,0 +1,76 @@
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from mercapp.models import Venta
+
+
+def _eventos(texto):
+    """Datos de los eventos 'tablero' de una respuesta SSE."""
+    return [
+        json.loads(bloque.split('data: ', 1)[1])
+        for bloque in texto.split('\n\n')
+        if 'event: tablero' in bloque
+    ]
+
+
+class TableroEventosTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.vendedor = get_user_model().objects.create_user('caja1', password='x')
+        self.vendedor.groups.add(Group.objects.get_or_create(name='Vendedor')[0])
+
+    def _venta(self, usuario, total):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Venta.objects.create(usuario=usuario, total=Decimal(total), metodo_pago='EFECTIVO')
+
+    def test_envia_solo_lo_nuevo(self):
+        primera = self._venta(self.admin, '1000')
+        self.client.force_login(self.admin)
+
+        respuesta = self.client.get('/eventos/inicio/')
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        texto = respuesta.content.decode()
+        self.assertIn('retry: ', texto)
+        [datos] = _eventos(texto)
+        self.assertEqual([v['id'] for v in datos['nuevas']], [primera.id])
+        self.assertIn('stock_bajo', datos)
+        cursor = texto.split('id: ', 1)[1].split('\n', 1)[0]
+
+        # Sin cambios: sólo el retry
+        respuesta = self.client.get('/eventos/inicio/', HTTP_LAST_EVENT_ID=cursor)
+        self.assertEqual(_eventos(respuesta.content.decode()), [])
+
+        segunda = self._venta(self.admin, '500')
+        with self.captureOnCommitCallbacks(execute=True):
+            primera.anulada = True
+            primera.save()
+        [datos] = _eventos(self.client.get('/eventos/inicio/', HTTP_LAST_EVENT_ID=cursor).content.decode())
+        self.assertEqual([v['id'] for v in datos['nuevas']], [segunda.id])
+        self.assertEqual(datos['anuladas'], [primera.id])
+        self.assertEqual((datos['total'], datos['cantidad']), ('500', 2))
+
+    def test_vendedor_solo_ve_sus_ventas(self):
+        self._venta(self.admin, '1000')
+        propia = self._venta(self.vendedor, '300')
+        self.client.force_login(self.vendedor)
+
+        [datos] = _eventos(self.client.get('/eventos/inicio/').content.decode())
+        self.assertEqual([v['id'] for v in datos['nuevas']], [propia.id])
+        self.assertNotIn('stock_bajo', datos)
+
+
+class TableroAsgiTest(TestCase):
+    @override_settings(TABLERO_DURACION=0)
+    async def test_flujo_abierto(self):
+        usuario = await get_user_model().objects.acreate_superuser('admin', 'admin@example.com', 'x')
+        await self.async_client.aforce_login(usuario)
+        respuesta = await self.async_client.get('/eventos/inicio/')
+        self.assertTrue(respuesta.streaming)
+        texto = b''.join([parte async for parte in respuesta.streaming_content]).decode()
+        self.assertTrue(texto.startswith('retry: '))
@@ -0,0 +1,72 @@
+import tempfile
+import time
+from unittest import mock
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from mercapp import tareas
+from mercapp.models import DetalleVenta, Producto, Tarea, Venta
+
+
+class TareasTest(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(self.admin)
+        producto = Producto.objects.create(codigo='A1', nombre='Arroz', precio=Decimal('1000'), stock=100)
+        self.venta = Venta.objects.create(usuario=self.admin)
+        DetalleVenta.objects.create(venta=self.venta, producto=producto, cantidad=2, precio_unitario=Decimal('1000'))
+
+    def test_lanzar_reclamar_y_ejecutar(self):
+        Venta.objects.filter(pk=self.venta.pk).update(total=Decimal('1'))
+        self.client.post('/tareas/', {'tipo': 'recalcular_totales'})
+        tarea = Tarea.objects.get()
+        self.assertEqual((tarea.estado, tarea.creada_por), (Tarea.PENDIENTE, self.admin))
+
+        reclamada = tareas.reclamar('test')
+        self.assertEqual(reclamada.pk, tarea.pk)
+        self.assertIsNone(tareas.reclamar('otro'))
+
+        tareas.ejecutar(reclamada)
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.progreso), (Tarea.COMPLETADA, 100))
+        self.assertIn('corregidas: 1', tarea.resultado)
+        self.venta.refresh_from_db()
+        self.assertEqual(self.venta.total, Decimal('2000'))
+
+        resp = self.client.get(f'/tareas/{tarea.pk}/estado/')
+        self.assertEqual(resp.json()['estado'], Tarea.COMPLETADA)
+
+    def test_exportar_y_descargar(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(EXPORTS_DIR=tmp):
+            tarea = tareas.encolar('exportar_ventas', self.admin)
+            tareas.ejecutar(tareas.reclamar('test'))
+            tarea.refresh_from_db()
+            self.assertEqual(tarea.estado, Tarea.COMPLETADA)
+            resp = self.client.get(f'/tareas/{tarea.pk}/descargar/')
+            contenido = b''.join(resp.streaming_content).decode()
+            resp.close()
+        self.assertIn('Arroz', contenido)
+
+    def test_error_queda_registrado(self):
+        tareas.encolar('respaldo')  # sin usuario
+        tareas.ejecutar(tareas.reclamar('test'))
+        tarea = Tarea.objects.get()
+        self.assertEqual(tarea.estado, Tarea.FALLIDA)
+        self.assertIn('necesita un usuario', tarea.resultado)
+
+
+class LatidoTest(TransactionTestCase):
+    def test_tarea_larga_sin_progreso_no_queda_huerfana(self):
+        def lenta(tarea, progreso):
+            time.sleep(0.5)
+            # Otro worker que arranca ahora no la toma por muerta
+            return str(tareas.recuperar_huerfanas(minutos=0.2 / 60))
+
+        tarea = tareas.encolar('respaldo')
+        with mock.patch.dict(tareas.TIPOS, {'respaldo': ('Lenta', lenta)}), \
+                mock.patch.object(tareas, 'LATIDO_SEGUNDOS', 0.05):
+            tareas.ejecutar(tareas.reclamar('test'))
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.resultado), (Tarea.COMPLETADA, '0'))
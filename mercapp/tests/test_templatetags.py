@@ -0,0 +1,29 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from mercapp.models import Producto
+from mercapp.templatetags.format_eu import format_euro
+
+
+class FormatEuroTest(TestCase):
+    def test_formatos(self):
+        self.assertEqual(format_euro(2800), '2.800')
+        self.assertEqual(format_euro(Decimal('1234567.89')), '1.234.568')
+        self.assertEqual(format_euro('1234.5'), '1.235')
+        self.assertEqual(format_euro(None), '')
+        self.assertEqual(format_euro('abc'), 'abc')
+
+
+class FragmentoProductosTest(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(user)
+
+    def test_alta_de_producto_invalida_la_tabla_cacheada(self):
+        self.client.get('/productos/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.create(codigo='NUEVO', nombre='Producto nuevo', precio=Decimal('10'))
+        resp = self.client.get('/productos/')
+        self.assertContains(resp, 'Producto nuevo')
@@ -9,3 +9,13 @@ class ViewsTest(TestCase):
         self.assertEqual(resp.status_code, 302)
         location = resp.headers.get('Location', '')
         self.assertIn('/accounts/login/', location)
+
+    def test_registrar_venta_usa_bundle_estatico(self):
+        """La lógica de la pantalla de venta se sirve como estático cacheable."""
+        from django.contrib.auth import get_user_model
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin)
+        html = self.client.get('/ventas/nueva/').content.decode()
+        self.assertIn('mercapp/js/venta.js', html)
+        self.assertIn('mercapp/css/venta.css', html)
+        self.assertNotIn('function parseNumber', html)
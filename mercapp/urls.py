@@ -4,17 +4,26 @@ from . import views
 urlpatterns = [
     # Página de inicio (dashboard)
     path("", views.inicio, name="inicio"),
+    path("eventos/inicio/", views.eventos_inicio, name="eventos_inicio"),
 
     path("productos/", views.lista_productos, name="lista_productos"),
     path("productos/nuevo/", views.crear_producto, name="crear_producto"),
     path("productos/<int:producto_id>/editar/", views.editar_producto, name="editar_producto"),
     path("productos/<int:producto_id>/eliminar/", views.eliminar_producto, name="eliminar_producto"),
+    path("productos/buscar/", views.buscar_producto, name="buscar_producto"),
+    path("productos/catalogo/estadisticas/", views.estadisticas_catalogo, name="estadisticas_catalogo"),
 
     path("ventas/nueva/", views.registrar_venta, name="registrar_venta"),
+    path("sucursales/transferencias/", views.transferencias, name="transferencias"),
+    path("ventas/buscar/", views.buscar_ventas, name="buscar_ventas"),
     path("ventas/<int:venta_id>/", views.detalle_venta_view, name="detalle_venta"),
     path("ventas/<int:venta_id>/anular/", views.anular_venta, name="anular_venta"),
+    path("ventas/<int:venta_id>/recibo/", views.recibo_venta, name="recibo_venta"),
+    path("ventas/<int:venta_id>/recibo.pdf", views.recibo_venta, {"formato": "pdf"}, name="recibo_venta_pdf"),
 
     path("reportes/ventas/", views.reporte_ventas, name="reporte_ventas"),
+    path("reportes/pivot/", views.reporte_pivot, name="reporte_pivot"),
+    path("reportes/reponer/", views.reporte_reponer, name="reporte_reponer"),
     # Vendedores management
     path("vendedores/nuevo/", views.crear_vendedor, name="crear_vendedor"),
     path("usuarios/nuevo/", views.crear_usuario, name="crear_usuario"),
@@ -23,6 +32,11 @@ urlpatterns = [
     path("usuarios/<int:user_id>/toggle/", views.toggle_usuario_activo, name="toggle_usuario_activo"),
     path("usuarios/<int:user_id>/reset_password/", views.resetear_password, name="resetear_password"),
     path("usuarios/<int:user_id>/eliminar/", views.eliminar_usuario, name="eliminar_usuario"),
+    path("auditoria/", views.lista_auditoria, name="lista_auditoria"),
+    path("tareas/", views.lista_tareas, name="lista_tareas"),
+    path("perfiles/", views.perfiles, name="perfiles"),
+    path("tareas/<int:tarea_id>/estado/", views.estado_tarea, name="estado_tarea"),
+    path("tareas/<int:tarea_id>/descargar/", views.descargar_tarea, name="descargar_tarea"),
     # Crear grupos Railway
     path("run-crear-grupos/", views.ejecutar_crear_grupos, name="run_crear_grupos"),
 ]
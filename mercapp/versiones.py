@@ -0,0 +1,120 @@
+"""Contadores de versión de datos.
+
+Cada conjunto de datos ('productos', 'ventas', ...) tiene un número que se
+incrementa cuando algo cambia. Las claves de caché que incluyen la versión
+quedan obsoletas solas, sin tener que borrar fragmento por fragmento.
+
+El contador tiene que ser el mismo para todos los procesos (workers de
+gunicorn y worker de tareas). Con caché compartida (Redis) vive en la caché;
+sin ella (VERSIONES_EN_BASE) vive en la tabla VersionDatos, porque una
+LocMemCache es de cada proceso y los demás nunca verían el incremento.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+PREFIJO = 'mercapp:version:'
+
+
+def _version_inicial():
+    # Si la clave se pierde (reinicio, desalojo) se parte de un valor nuevo
+    # para no reutilizar versiones de fragmentos que aún sigan en caché.
+    return time.time_ns() // 1000
+
+
+def obtener_version(nombre):
+    """Versión actual del conjunto de datos `nombre`."""
+    if settings.VERSIONES_EN_BASE:
+        return _obtener_de_base(nombre)
+    clave = PREFIJO + nombre
+    version = cache.get(clave)
+    if version is None:
+        version = _version_inicial()
+        if not cache.add(clave, version, timeout=None):
+            version = cache.get(clave, version)
+    return version
+
+
+def obtener_versiones(*nombres):
+    """Versiones de varios conjuntos de datos, en una sola lectura."""
+    if settings.VERSIONES_EN_BASE:
+        from .models import VersionDatos
+
+        versiones = dict(VersionDatos.objects.filter(nombre__in=nombres).values_list('nombre', 'version'))
+    else:
+        versiones = cache.get_many([PREFIJO + nombre for nombre in nombres])
+        versiones = {clave[len(PREFIJO):]: version for clave, version in versiones.items()}
+    return [versiones[nombre] if nombre in versiones else obtener_version(nombre) for nombre in nombres]
+
+
+def incrementar_version(nombre):
+    """Invalida todo lo cacheado con la versión actual de `nombre`."""
+    if settings.VERSIONES_EN_BASE:
+        return _incrementar_en_base(nombre)
+    clave = PREFIJO + nombre
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        version = _version_inicial()
+        cache.set(clave, version, timeout=None)
+        return version
+
+
+def incrementar_al_confirmar(nombre, using=None):
+    """Incrementa `nombre` una sola vez cuando se confirme la transacción.
+
+    Una venta guarda la Venta, cada línea y cada movimiento de stock, y
+    cada uno avisa que cambiaron 'ventas' o 'stock'. Sin esto cada aviso
+    sería una escritura más sobre la misma fila de VersionDatos después del
+    commit, y todas las cajas se pisarían en esa fila.
+    """
+    conexion = transaction.get_connection(using)
+    if not conexion.in_atomic_block:
+        incrementar_version(nombre)
+        return
+    pendientes = conexion.__dict__.setdefault('_mercapp_versiones', {})
+    registrado = pendientes.get(nombre)
+    # Si la transacción (o el savepoint donde se registró) se deshizo, Django
+    # descartó el callback: sigue valiendo sólo si está en la lista pendiente
+    if registrado is not None and any(f is registrado for _, f, _ in conexion.run_on_commit):
+        return
+
+    def incrementar():
+        pendientes.pop(nombre, None)
+        incrementar_version(nombre)
+
+    pendientes[nombre] = incrementar
+    transaction.on_commit(incrementar, using=using)
+
+
+def _obtener_de_base(nombre):
+    from .models import VersionDatos
+
+    # Con réplica se lee de la réplica, igual que los datos que versiona
+    version = VersionDatos.objects.filter(nombre=nombre).values_list('version', flat=True).first()
+    if version is None:
+        version = _crear_en_base(nombre)
+    return version
+
+
+def _incrementar_en_base(nombre):
+    from .models import VersionDatos
+
+    with transaction.atomic():
+        if VersionDatos.objects.filter(nombre=nombre).update(version=F('version') + 1):
+            return VersionDatos.objects.get(nombre=nombre).version
+    return _crear_en_base(nombre)
+
+
+def _crear_en_base(nombre):
+    from .models import VersionDatos
+
+    try:
+        with transaction.atomic(using='default'):
+            return VersionDatos.objects.create(nombre=nombre, version=_version_inicial()).version
+    except IntegrityError:
+        # Otro proceso la creó a la vez
+        return VersionDatos.objects.using('default').get(nombre=nombre).version
@@ -1,56 +1,114 @@
 import logging
+import os
+from datetime import timedelta
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils import timezone
-from django.db.models import Sum, F
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Sum, F, Q
+from django.db.models.functions import Coalesce
 from django.db.models.deletion import ProtectedError
-from django.forms import modelformset_factory
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import add_never_cache_headers, get_conditional_response, patch_cache_control
 from django import forms
-from .models import Producto, Venta, DetalleVenta, Respaldo
-from .forms import ProductoForm, VentaForm, DetalleVentaForm, VendedorCreationForm, UsuarioCreationForm, AnulacionForm
+from .models import (
+    AuditEvent, Producto, PronosticoStock, Venta, DetalleVenta, Respaldo, Sucursal, Tarea, Transferencia,
+    VentaArchivada, stock_bajo, stock_disponible, transferir_stock,
+)
+from .forms import ProductoForm, VentaForm, DetalleVentaFormSet, VendedorCreationForm, UsuarioCreationForm, AnulacionForm, BusquedaVentasForm, PivotForm, TareaForm, TransferenciaForm
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
+from .archivo import filtrar_ventas, listado_con_archivo, top_productos_con_archivo, total_con_archivo
+from .db_routers import fragment_cache_timeout, leyendo_de_replica, lectura_en_replica
 from .permissions import es_admin, es_vendedor
+from . import auditoria, busqueda, perfilador, recibos, reportes, tablero, tareas
+from .catalogo import catalogo
+from .condicional import condicional
+from .versiones import obtener_versiones
 
 
 logger = logging.getLogger('mercapp')
 
 @login_required
+@lectura_en_replica
+@condicional('ventas', 'stock', 'productos', extra=lambda request: timezone.localdate())
 def inicio(request):
     user = request.user
-    hoy = timezone.localdate()
-
-    ventas_hoy = Venta.objects.filter(fecha__date=hoy)
+    # La firma se toma antes de consultar: si algo cambia mientras tanto, el
+    # flujo de eventos lo enviará igual.
+    firma = tablero.firma()
 
     # El vendedor solo ve sus ventas (el admin ve todas)
-    if es_vendedor(user) and not es_admin(user):
-        ventas_hoy = ventas_hoy.filter(usuario=user)
-
-    total_hoy = ventas_hoy.aggregate(total=Sum('total'))['total'] or 0
+    ventas_hoy = tablero.ventas_de_hoy(_alcance_tablero(user))
+    total_hoy = tablero.total_de_hoy(ventas_hoy)
 
-    productos_bajo_stock = Producto.objects.filter(
-        activo=True,
-        stock__lte=F('stock_minimo')
-    )
+    # Consolidado: depósito central más todas las sucursales
+    productos_bajo_stock = stock_bajo()
 
+    ventas_hoy = list(ventas_hoy.select_related('usuario'))
     contexto = {
         'ventas_hoy': ventas_hoy,
         'total_hoy': total_hoy,
         'productos_bajo_stock': productos_bajo_stock,
         'es_admin': es_admin(user),
         'es_vendedor': es_vendedor(user),
+        # Punto de partida del flujo de eventos (mercapp/tablero.py)
+        'ultima_venta': max((v.id for v in ventas_hoy), default=0),
+        'firma_tablero': firma,
     }
 
     return render(request, 'mercapp/inicio.html', contexto)
 
 
+def _alcance_tablero(user):
+    return user.id if es_vendedor(user) and not es_admin(user) else None
+
+
+@login_required
+def eventos_inicio(request):
+    """Server-Sent Events con los cambios del tablero de inicio."""
+    user = request.user
+    cursor = tablero.leer_cursor(
+        request.headers.get('Last-Event-ID')
+        or f"{request.GET.get('desde', 0)}:{request.GET.get('firma', '')}"
+    )
+    args = (_alcance_tablero(user), es_admin(user), cursor)
+    if isinstance(request, ASGIRequest):
+        respuesta = StreamingHttpResponse(tablero.flujo(*args), content_type='text/event-stream')
+    else:
+        # Bajo WSGI no se retiene un hilo por pantalla: se responde lo
+        # pendiente y el navegador vuelve a preguntar tras `retry`.
+        respuesta = HttpResponse(tablero.pendiente(*args), content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
+
+
 @login_required
 @user_passes_test(es_admin)
+@lectura_en_replica
+@condicional('productos', 'stock')
 def lista_productos(request):
+    hay_sucursales = Sucursal.objects.exists()
     productos = Producto.objects.filter(activo=True)
-    return render(request, 'mercapp/lista_productos.html', {'productos': productos})
+    if hay_sucursales:
+        productos = productos.annotate(en_sucursales=Coalesce(Sum('stocks__cantidad'), 0))
+    version_productos, version_stock = obtener_versiones('productos', 'stock')
+    contexto = {
+        'productos': productos,
+        'hay_sucursales': hay_sucursales,
+        'version_productos': version_productos,
+        'version_stock': version_stock,
+        'origen': 'replica' if leyendo_de_replica() else 'primaria',
+        'cache_timeout': fragment_cache_timeout(),
+    }
+    return render(request, 'mercapp/lista_productos.html', contexto)
 
 
 @login_required
@@ -59,14 +117,15 @@ def crear_producto(request):
     if request.method == "POST":
         form = ProductoForm(request.POST)
         if form.is_valid():
-            form.save()
+            producto = form.save()
+            auditoria.registrar('PRODUCTO_CREADO', request.user, producto, producto.nombre)
             messages.success(request, "Producto creado correctamente.")
-            logger.info(f"Producto creado por {request.user.username}")
+            logger.info("Producto %s creado por %s", producto.id, request.user.username)
             return redirect('lista_productos')
         else:
             # provide feedback about why the form failed
             errors = form.errors.as_json()
-            logger.warning(f"Error al crear producto por {request.user.username}: {errors}")
+            logger.warning("Error al crear producto por %s: %s", request.user.username, errors)
             messages.error(request, "El formulario contiene errores. Revísalos y vuelve a intentar.")
     else:
         form = ProductoForm()
@@ -81,8 +140,10 @@ def editar_producto(request, producto_id):
         form = ProductoForm(request.POST, instance=producto)
         if form.is_valid():
             form.save()
+            cambios = ", ".join(form.changed_data)
+            auditoria.registrar('PRODUCTO_EDITADO', request.user, producto, f"Campos: {cambios}")
             messages.success(request, "Producto actualizado correctamente.")
-            logger.info(f"Producto {producto.id} actualizado por {request.user.username}")
+            logger.info("Producto %s actualizado por %s", producto.id, request.user.username)
             return redirect('lista_productos')
     else:
         form = ProductoForm(instance=producto)
@@ -94,7 +155,8 @@ def editar_producto(request, producto_id):
 def eliminar_producto(request, producto_id):
     producto = get_object_or_404(Producto, id=producto_id)
     if request.method == "POST":
-        logger.info(f"Producto {producto.id} eliminado por {request.user.username}")
+        logger.info("Producto %s eliminado por %s", producto.id, request.user.username)
+        auditoria.registrar('PRODUCTO_ELIMINADO', request.user, producto, producto.nombre)
         producto.delete()
         messages.success(request, "Producto eliminado correctamente.")
         return redirect('lista_productos')
@@ -104,51 +166,177 @@ def eliminar_producto(request, producto_id):
 @login_required
 @user_passes_test(lambda u: es_admin(u) or es_vendedor(u))
 def registrar_venta(request):
-    DetalleFormSet = modelformset_factory(
-        DetalleVenta,
-        form=DetalleVentaForm,
-        extra=1,
-        can_delete=False
-    )
-
     if request.method == "POST":
         venta_form = VentaForm(request.POST)
-        detalle_formset = DetalleFormSet(request.POST, queryset=DetalleVenta.objects.none())
-
-        if venta_form.is_valid() and detalle_formset.is_valid():
-            venta = venta_form.save(commit=False)
-            venta.usuario = request.user
-            venta.save()
-
-            for form in detalle_formset:
-                detalle = form.save(commit=False)
-                if detalle.producto and detalle.cantidad:
-                    detalle.venta = venta
-                    detalle.save()
-
-            venta.recalcular_total()
-            logger.info(f"Venta {venta.id} registrada por {request.user.username}")
-            messages.success(request, "Venta registrada correctamente.")
-            return redirect('detalle_venta', venta_id=venta.id)
+        detalle_formset = DetalleVentaFormSet(request.POST)
+        venta_valida = venta_form.is_valid()
+        if venta_valida:
+            detalle_formset.sucursal = venta_form.cleaned_data.get('sucursal')
+
+        if venta_valida and detalle_formset.is_valid():
+            # Venta, detalles y descuento de stock en una sola transacción
+            try:
+                with transaction.atomic():
+                    venta = venta_form.save(commit=False)
+                    venta.usuario = request.user
+                    venta.save()
+
+                    for form in detalle_formset:
+                        detalle = form.save(commit=False)
+                        if detalle.producto and detalle.cantidad:
+                            detalle.venta = venta
+                            detalle.save()
+
+                    venta.recalcular_total()
+            except ValidationError as e:
+                # Otra caja vendió el stock entre la validación y el guardado
+                messages.error(request, " ".join(e.messages))
+            else:
+                logger.info("Venta %s registrada por %s", venta.id, request.user.username)
+                auditoria.registrar('VENTA_REGISTRADA', request.user, venta, f"Total {venta.total}")
+                if venta.sucursal_id:
+                    # La caja queda en su sucursal para la próxima venta
+                    request.session['sucursal_id'] = venta.sucursal_id
+                messages.success(request, "Venta registrada correctamente.")
+                return redirect('detalle_venta', venta_id=venta.id)
 
     else:
-        venta_form = VentaForm()
-        detalle_formset = DetalleFormSet(queryset=DetalleVenta.objects.none())
+        venta_form = VentaForm(initial={'sucursal': request.session.get('sucursal_id')})
+        detalle_formset = DetalleVentaFormSet()
 
     contexto = {
         'venta_form': venta_form,
         'formset': detalle_formset,
-        'productos': Producto.objects.filter(activo=True),
+        # El catálogo ya no se incrusta en la página: lo resuelve buscar_producto
+        'hay_productos': Producto.objects.filter(activo=True).exists(),
     }
     return render(request, 'mercapp/registrar_venta.html', contexto)
 
 
+def _producto_json(p, stock):
+    return {'id': p.id, 'codigo': p.codigo, 'nombre': p.nombre, 'precio': str(p.precio), 'stock': stock}
+
+
+@login_required
+@user_passes_test(lambda u: es_admin(u) or es_vendedor(u))
+def buscar_producto(request):
+    """Resuelve un código escaneado (?codigo=), un id (?id=) o busca por nombre (?q=)."""
+    if 'q' in request.GET:
+        texto = request.GET['q'].strip()
+        productos = (
+            Producto.objects.filter(activo=True, nombre__icontains=texto).order_by('nombre')[:10]
+            if texto else []
+        )
+        return JsonResponse({'resultados': [_producto_json(p, p.stock) for p in productos]})
+
+    codigo = request.GET.get('codigo', '').strip()
+    producto = catalogo.buscar(codigo) if codigo else None
+    if producto is None and (codigo.isdigit() or 'id' in request.GET):
+        # El campo de la caja acepta también el id del producto
+        try:
+            producto = catalogo.por_id(request.GET.get('id', codigo))
+        except ValueError:
+            producto = None
+    if producto is None:
+        return JsonResponse({'error': 'Producto no encontrado'}, status=404)
+    # El catálogo no guarda stock (ver catalogo.py)
+    return JsonResponse(_producto_json(producto, stock_disponible(producto.id)))
+
+
+@login_required
+@user_passes_test(es_admin)
+def transferencias(request):
+    """Mueve stock entre sucursales y el depósito central."""
+    if request.method == "POST":
+        form = TransferenciaForm(request.POST)
+        if form.is_valid():
+            datos = form.cleaned_data
+            try:
+                transferencia = transferir_stock(
+                    datos['producto'], datos['cantidad'], datos['origen'], datos['destino'],
+                    usuario=request.user, nota=datos['nota'],
+                )
+            except ValidationError as e:
+                form.add_error(None, e)
+            else:
+                auditoria.registrar('STOCK_TRANSFERIDO', request.user, transferencia, str(transferencia))
+                messages.success(request, f"Transferencia registrada: {transferencia}.")
+                return redirect('transferencias')
+    else:
+        form = TransferenciaForm()
+    recientes = Transferencia.objects.select_related('producto', 'origen', 'destino', 'usuario')[:50]
+    return render(request, 'mercapp/transferencias.html', {'form': form, 'transferencias': recientes})
+
+
+@login_required
+@user_passes_test(es_admin)
+def estadisticas_catalogo(request):
+    """Aciertos del catálogo en memoria de este worker."""
+    return JsonResponse({'pid': os.getpid(), **catalogo.estadisticas()})
+
+
+def _estado_detalle(request, venta_id):
+    """(updated_at, anulada, total) de la venta viva o archivada; una
+    consulta por request, compartida por el ETag y el Last-Modified."""
+    if not hasattr(request, '_estado_detalle'):
+        request._estado_detalle = None
+        for modelo in (Venta, VentaArchivada):
+            fila = modelo.objects.filter(pk=venta_id).values_list('updated_at', 'anulada', 'total').first()
+            if fila is not None:
+                request._estado_detalle = fila
+                break
+    return request._estado_detalle
+
+
+def _modificacion_detalle(request, venta_id):
+    estado = _estado_detalle(request, venta_id)
+    return estado[0] if estado else None
+
+
 @login_required
 @user_passes_test(lambda u: es_admin(u) or es_vendedor(u))
+@condicional('productos', extra=_estado_detalle, last_modified=_modificacion_detalle)
 def detalle_venta_view(request, venta_id):
-    venta = get_object_or_404(Venta, id=venta_id)
-    detalles = DetalleVenta.objects.filter(venta=venta)
-    return render(request, 'mercapp/detalle_venta.html', {'venta': venta, 'detalles': detalles})
+    venta = Venta.objects.filter(id=venta_id).first()
+    archivada = venta is None
+    if archivada:
+        # Las ventas antiguas se movieron al archivo conservando su id
+        venta = get_object_or_404(VentaArchivada, id=venta_id)
+    detalles = venta.detalles.select_related('producto')
+    return render(request, 'mercapp/detalle_venta.html', {
+        'venta': venta, 'detalles': detalles, 'archivada': archivada,
+        'estado_recibo': recibos.estado_de(venta),
+    })
+
+
+@login_required
+@user_passes_test(lambda u: es_admin(u) or es_vendedor(u))
+def recibo_venta(request, venta_id, formato='html'):
+    """Ticket imprimible (HTML o PDF), renderizado una vez y servido desde caché.
+
+    La URL lleva el estado de la venta (?v=), así que cada versión puede
+    cachearse en el navegador indefinidamente; anular la venta cambia la URL.
+    """
+    estado = recibos.estado_venta(venta_id)
+    if estado is None:
+        raise Http404("Venta no encontrada")
+    if request.GET.get('v') != estado:
+        respuesta = redirect(f"{request.path}?v={estado}")
+        add_never_cache_headers(respuesta)
+        return respuesta
+
+    etag = recibos.etag(venta_id, estado, formato)
+    respuesta = get_conditional_response(request, etag=etag)
+    if respuesta is None:
+        respuesta = HttpResponse(
+            recibos.obtener(venta_id, estado, formato),
+            content_type='application/pdf' if formato == 'pdf' else 'text/html; charset=utf-8',
+        )
+        if formato == 'pdf':
+            respuesta['Content-Disposition'] = f'inline; filename="venta-{venta_id}.pdf"'
+    respuesta['ETag'] = etag
+    patch_cache_control(respuesta, private=True, max_age=365 * 24 * 3600, immutable=True)
+    return respuesta
 
 
 @login_required
@@ -165,7 +353,8 @@ def anular_venta(request, venta_id):
             venta.anulada_por = request.user
             venta.fecha_anulacion = timezone.now()
             venta.save()
-            logger.info(f"Venta {venta.id} anulada por {request.user.username}: {motivo}")
+            logger.info("Venta %s anulada por %s: %s", venta.id, request.user.username, motivo)
+            auditoria.registrar('VENTA_ANULADA', request.user, venta, motivo)
             messages.success(request, f'Venta {venta.id} anulada correctamente.')
             return redirect('detalle_venta', venta_id=venta.id)
     else:
@@ -176,46 +365,135 @@ def anular_venta(request, venta_id):
 
 @login_required
 @user_passes_test(lambda u: es_admin(u) or es_vendedor(u))
+@lectura_en_replica
+@condicional('ventas', 'productos', 'stock', extra=lambda request: request.user.has_perm('mercapp.can_view_reports'))
 def reporte_ventas(request):
-    ventas = Venta.objects.all()
-
     fecha_desde = request.GET.get('fecha_desde')
     fecha_hasta = request.GET.get('fecha_hasta')
 
-    if fecha_desde:
-        ventas = ventas.filter(fecha__date__gte=fecha_desde)
-    if fecha_hasta:
-        ventas = ventas.filter(fecha__date__lte=fecha_hasta)
-
     # Acceso a reportes:
     # - Administrador ve todas las ventas.
     # - Cualquier usuario con permiso 'mercapp.can_view_reports' puede ver todas.
     # - Vendedor (grupo) ve sólo sus propias ventas.
+    alcance = 'todas'
+    usuario = None
     if not (es_admin(request.user) or request.user.has_perm('mercapp.can_view_reports')):
         # si no es admin ni tiene permiso de ver reportes, restringir a sus ventas
-        ventas = ventas.filter(usuario=request.user)
+        usuario = request.user
+        alcance = request.user.id
 
-    total_vendido = ventas.aggregate(total=Sum('total'))['total'] or 0
-    stock_bajo = Producto.objects.filter(stock__lte=F('stock_minimo'))
+    # Por sucursal o consolidado (sin ?sucursal=)
+    sucursales = list(Sucursal.objects.all())
+    sucursal = next((s for s in sucursales if str(s.pk) == request.GET.get('sucursal')), None)
 
-    # Reporte mejorado: productos más vendidos (top 10)
-    top_productos = (
-        DetalleVenta.objects
-        .values('producto__nombre')
-        .annotate(cantidad_total=Sum('cantidad'), ventas_total=Sum('subtotal'))
-        .order_by('-cantidad_total')[:10]
-    )
+    # Las ventas antiguas viven en las tablas de archivo: se suman ambas
+    ventas = filtrar_ventas(Venta.objects.all(), fecha_desde, fecha_hasta, usuario, sucursal)
+    archivadas = filtrar_ventas(VentaArchivada.objects.all(), fecha_desde, fecha_hasta, usuario, sucursal)
+
+    total_vendido = total_con_archivo(ventas, archivadas)
+    version_ventas, version_productos, version_stock = obtener_versiones('ventas', 'productos', 'stock')
 
     contexto = {
-        'ventas': ventas,
+        'ventas': listado_con_archivo(ventas, archivadas),
         'total_vendido': total_vendido,
-        'stock_bajo': stock_bajo,
-        'top_productos': top_productos,
+        'stock_bajo': stock_bajo(sucursal),
+        'sucursales': sucursales,
+        'sucursal': sucursal,
+        # Reporte mejorado: productos más vendidos (top 10). Se pasa la
+        # función: la plantilla la llama sólo si el fragmento no está en caché.
+        'top_productos': top_productos_con_archivo,
+        # Claves de los fragmentos cacheados de las tablas
+        'version_ventas': version_ventas,
+        'version_productos': version_productos,
+        'version_stock': version_stock,
+        'alcance': alcance,
+        'origen': 'replica' if leyendo_de_replica() else 'primaria',
+        'cache_timeout': fragment_cache_timeout(),
+        'es_admin': es_admin(request.user),
     }
 
     return render(request, 'mercapp/reporte_ventas.html', contexto)
 
 
+@login_required
+@user_passes_test(es_admin)
+@lectura_en_replica
+def reporte_reponer(request):
+    """Productos a reponer según el último pronóstico (comando pronosticar_stock)."""
+    horizonte = settings.REPOSICION_PLAZO_DIAS + settings.REPOSICION_COBERTURA_DIAS
+    pronosticos = (
+        PronosticoStock.objects.select_related('producto')
+        .filter(producto__activo=True)
+        .filter(Q(cantidad_sugerida__gt=0) | Q(dias_hasta_quiebre__lte=horizonte))
+        .order_by(F('dias_hasta_quiebre').asc(nulls_last=True), '-velocidad')
+    )
+    pagina = Paginator(pronosticos, 100).get_page(request.GET.get('page'))
+    ultimo = PronosticoStock.objects.order_by('-calculado_en').values_list('calculado_en', flat=True).first()
+    return render(request, 'mercapp/reporte_reponer.html', {
+        'pagina': pagina,
+        'calculado_en': ultimo,
+        'plazo': settings.REPOSICION_PLAZO_DIAS,
+        'cobertura': settings.REPOSICION_COBERTURA_DIAS,
+    })
+
+
+@login_required
+@user_passes_test(lambda u: es_admin(u) or es_vendedor(u))
+@lectura_en_replica
+def reporte_pivot(request):
+    """Ventas por período, método de pago, vendedor y categoría (tabla pivote)."""
+    por_defecto = {
+        'filas': ['mes'], 'columna': 'metodo_pago', 'medida': 'importe',
+        'fecha_desde': None, 'fecha_hasta': None,
+    }
+    if 'filas' in request.GET:
+        form = PivotForm(request.GET)
+        parametros = form.cleaned_data if form.is_valid() else None
+    else:
+        form = PivotForm(initial=por_defecto)
+        parametros = por_defecto
+
+    pivot = None
+    if parametros is not None:
+        # Mismo criterio de alcance que reporte_ventas
+        usuario = None
+        if not (es_admin(request.user) or request.user.has_perm('mercapp.can_view_reports')):
+            usuario = request.user
+        pivot = reportes.pivote(
+            parametros['filas'], parametros['columna'] or None, parametros['medida'],
+            parametros['fecha_desde'], parametros['fecha_hasta'], usuario,
+        )
+
+    return render(request, 'mercapp/reporte_pivot.html', {'form': form, 'pivot': pivot})
+
+
+@login_required
+@user_passes_test(lambda u: es_admin(u) or es_vendedor(u))
+@lectura_en_replica
+def buscar_ventas(request):
+    """Búsqueda de ventas con paginación por cursor (mercapp/busqueda.py)."""
+    # Mismo criterio de alcance que reporte_ventas
+    usuario = None
+    if not (es_admin(request.user) or request.user.has_perm('mercapp.can_view_reports')):
+        usuario = request.user
+
+    form = BusquedaVentasForm(request.GET or None)
+    if usuario is not None:
+        del form.fields['usuario']
+    filas, siguiente = [], None
+    if not request.GET or form.is_valid():
+        filtros = form.cleaned_data if request.GET else {}
+        cursor = busqueda.decodificar_cursor(request.GET.get('cursor'))
+        filas, siguiente = busqueda.buscar(filtros, usuario, cursor)
+
+    return render(request, 'mercapp/buscar_ventas.html', {
+        'form': form,
+        'ventas': filas,
+        'siguiente': siguiente,
+        'primera_pagina': 'cursor' not in request.GET,
+    })
+
+
 @login_required
 @user_passes_test(lambda u: es_admin(u))
 def crear_vendedor(request):
@@ -246,6 +524,7 @@ def crear_vendedor(request):
                     pass
 
                 user.groups.add(group)
+                auditoria.registrar('USUARIO_CREADO', request.user, user, f"{username} (Vendedor)")
                 messages.success(request, f'Vendedor {username} creado y asignado al grupo Vendedor')
                 return redirect('lista_productos')
     else:
@@ -290,6 +569,7 @@ def crear_usuario(request):
 
                 # assign group permissions are handled by setup_roles; ensure group exists
                 user.groups.add(group)
+                auditoria.registrar('USUARIO_CREADO', request.user, user, f"{username} ({group.name})")
                 messages.success(request, f'Usuario {username} creado y asignado al rol {rol}')
                 return redirect('lista_usuarios')
     else:
@@ -319,6 +599,8 @@ def toggle_usuario_activo(request, user_id):
 
         usuario.is_active = not usuario.is_active
         usuario.save()
+        accion = 'USUARIO_ACTIVADO' if usuario.is_active else 'USUARIO_DESACTIVADO'
+        auditoria.registrar(accion, request.user, usuario, usuario.username)
         if usuario.is_active:
             messages.success(request, f'Usuario {usuario.username} reactivado.')
         else:
@@ -340,6 +622,7 @@ def resetear_password(request, user_id):
         if form.is_valid():
             usuario.set_password(form.cleaned_data['password'])
             usuario.save()
+            auditoria.registrar('USUARIO_PASSWORD', request.user, usuario, usuario.username)
             messages.success(request, f'Contraseña actualizada para {usuario.username}')
             return redirect('lista_usuarios')
     else:
@@ -366,26 +649,126 @@ def eliminar_usuario(request, user_id):
 
     if request.method == 'POST':
         username = usuario.username
+        usuario_id = usuario.pk
         try:
             usuario.delete()
+            auditoria.registrar('USUARIO_ELIMINADO', request.user, descripcion=f"{username} (id {usuario_id})")
             messages.success(request, f'Usuario {username} eliminado correctamente.')
-            logger.info(f'Usuario {username} eliminado por {request.user.username}')
+            logger.info('Usuario %s eliminado por %s', username, request.user.username)
         except ProtectedError as e:
             # Si el usuario está referenciado por objetos protegidos (p.ej. Ventas),
             # evitamos la excepción y en su lugar desactivamos la cuenta para
             # preservar integridad referencial y datos históricos.
             usuario.is_active = False
             usuario.save()
+            auditoria.registrar('USUARIO_DESACTIVADO', request.user, usuario, f"{username} (no se pudo eliminar)")
             messages.warning(request, (
                 f'No se pudo eliminar al usuario {username} porque tiene objetos relacionados protegidos (p.ej. ventas). '
                 'Se ha desactivado la cuenta en su lugar.'
             ))
-            logger.warning(f'Intento de eliminar usuario {username} falló por ProtectedError; cuenta desactivada por {request.user.username}.')
+            logger.warning(
+                'Intento de eliminar usuario %s falló por ProtectedError; cuenta desactivada por %s.',
+                username, request.user.username,
+            )
         return redirect('lista_usuarios')
 
     return render(request, 'mercapp/usuario_confirm_delete.html', {'usuario': usuario})
 
 
+@login_required
+@user_passes_test(lambda u: u.has_perm('mercapp.can_view_audit_logs'))
+def lista_auditoria(request):
+    eventos = AuditEvent.objects.all()
+    accion = request.GET.get('accion', '')
+    usuario = request.GET.get('usuario', '').strip()
+    if accion:
+        eventos = eventos.filter(accion=accion)
+    if usuario:
+        eventos = eventos.filter(usuario=usuario)
+    pagina = Paginator(eventos, 50).get_page(request.GET.get('page'))
+    filtros = request.GET.copy()
+    filtros.pop('page', None)
+    return render(request, 'mercapp/auditoria.html', {
+        'pagina': pagina,
+        'acciones': AuditEvent.ACCION_CHOICES,
+        'accion': accion,
+        'usuario': usuario,
+        'filtros': filtros.urlencode(),
+    })
+
+
+@login_required
+@user_passes_test(es_admin)
+def perfiles(request):
+    """Funciones más costosas por vista según los perfiles guardados (mercapp/perfilador.py)."""
+    try:
+        horas = max(1, min(int(request.GET.get('horas', 24)), 24 * settings.PERFILADOR_RETENCION_DIAS))
+    except ValueError:
+        horas = 24
+    desde = timezone.now() - timedelta(hours=horas)
+    vistas = list(perfilador.por_vista(desde))
+    vista = request.GET.get('vista') or (vistas[0]['vista'] if vistas else None)
+    cantidad, funciones = perfilador.funciones_calientes(vista, desde) if vista else (0, [])
+    return render(request, 'mercapp/perfiles.html', {
+        'vistas': vistas,
+        'vista': vista,
+        'horas': horas,
+        'cantidad': cantidad,
+        'funciones': funciones,
+        'activo': settings.PERFILADOR,
+        'muestreo': settings.PERFILADOR_MUESTREO,
+        'cabecera': settings.PERFILADOR_CABECERA,
+    })
+
+
+@login_required
+@user_passes_test(es_admin)
+def lista_tareas(request):
+    if request.method == 'POST':
+        form = TareaForm(request.POST)
+        if form.is_valid():
+            parametros = {}
+            if form.cleaned_data['tipo'] == 'archivar_ventas':
+                parametros['dias'] = form.cleaned_data['dias'] or 730
+            tarea = tareas.encolar(form.cleaned_data['tipo'], request.user, **parametros)
+            logger.info("Tarea %s (%s) encolada por %s", tarea.id, tarea.tipo, request.user.username)
+            messages.success(request, f'Tarea #{tarea.id} encolada.')
+            return redirect('lista_tareas')
+    else:
+        form = TareaForm()
+    recientes = list(Tarea.objects.select_related('creada_por')[:50])
+    for tarea in recientes:
+        tarea.descripcion = tareas.TIPOS.get(tarea.tipo, (tarea.tipo, None))[0]
+    return render(request, 'mercapp/tareas.html', {
+        'form': form,
+        'tareas': recientes,
+        'hay_activas': any(t.activa for t in recientes),
+    })
+
+
+@login_required
+@user_passes_test(es_admin)
+def estado_tarea(request, tarea_id):
+    tarea = get_object_or_404(Tarea, id=tarea_id)
+    return JsonResponse({
+        'id': tarea.id,
+        'estado': tarea.estado,
+        'progreso': tarea.progreso,
+        'mensaje': tarea.mensaje,
+    })
+
+
+@login_required
+@user_passes_test(es_admin)
+def descargar_tarea(request, tarea_id):
+    tarea = get_object_or_404(Tarea, id=tarea_id, tipo='exportar_ventas', estado=Tarea.COMPLETADA)
+    ruta = os.path.realpath(tarea.resultado)
+    # Sólo archivos generados en la carpeta de exportaciones
+    if os.path.dirname(ruta) != os.path.realpath(settings.EXPORTS_DIR) or not os.path.exists(ruta):
+        raise Http404("Archivo no disponible")
+    return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=os.path.basename(ruta))
+
+
 # ================================================
 # EJECUTAR crear_grupos.py (solo para Railway)
 # ================================================